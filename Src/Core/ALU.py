@@ -1,79 +1,83 @@
-from typing import Dict, Tuple
+from typing import Tuple
+
+# Flag bits in 8085 PSW layout: S Z 0 AC 0 P 0 C
+FLAG_S = 0x80
+FLAG_Z = 0x40
+FLAG_AC = 0x10
+FLAG_P = 0x04
+FLAG_C = 0x01
+
+FLAG_BITS = {'S': FLAG_S, 'Z': FLAG_Z, 'AC': FLAG_AC, 'P': FLAG_P, 'C': FLAG_C}
+
+
+def _build_szp() -> bytes:
+    """S, Z and P flags for every result byte"""
+    table = bytearray(256)
+    for value in range(256):
+        flags = value & FLAG_S
+        if value == 0:
+            flags |= FLAG_Z
+        if bin(value).count('1') % 2 == 0:
+            flags |= FLAG_P
+        table[value] = flags
+    return bytes(table)
+
+
+# S/Z/P indexed by result byte
+SZP = _build_szp()
+# S/Z/P/C indexed by a 9-bit sum or difference (bit 8 is the carry or borrow)
+SZPC = bytes(SZP[value & 0xFF] | (value >> 8) for value in range(512))
+# S/Z/AC/P after INR/DCR, indexed by the result (carry is left to the caller)
+INR_FLAGS = bytes(SZP[value] | (FLAG_AC if value & 0x0F == 0x00 else 0) for value in range(256))
+DCR_FLAGS = bytes(SZP[value] | (FLAG_AC if value & 0x0F == 0x0F else 0) for value in range(256))
+
 
 class ALU:
-    """8085 Arithmetic Logic Unit"""
-    
+    """8085 Arithmetic Logic Unit
+
+    Operands must already be bytes (0-255). Every operation returns the 8-bit
+    result and the packed flag byte (see the FLAG_* bits) built from the
+    precomputed tables above.
+    """
+
     @staticmethod
-    def add(a: int, b: int, carry: bool = False) -> Tuple[int, Dict[str, bool]]:
+    def add(a: int, b: int, carry: int = 0) -> Tuple[int, int]:
         """8-bit addition with flags"""
-        if not (0 <= a <= 0xFF and 0 <= b <= 0xFF):
-            raise ValueError(f"Invalid operands for addition: a={a:02X}, b={b:02X}")
-            
-        result = a + b + (1 if carry else 0)
-        flags = {
-            'C': result > 0xFF,
-            'Z': (result & 0xFF) == 0,
-            'S': (result & 0x80) != 0,
-            'P': bin(result & 0xFF).count('1') % 2 == 0,
-            'AC': (a & 0x0F) + (b & 0x0F) + (1 if carry else 0) > 0x0F
-        }
-        return result & 0xFF, flags
-    
+        result = a + b + carry
+        return result & 0xFF, SZPC[result] | ((a ^ b ^ result) & FLAG_AC)
+
+    @staticmethod
+    def sub(a: int, b: int, borrow: int = 0) -> Tuple[int, int]:
+        """8-bit subtraction with flags (C is set on borrow)"""
+        result = (a - b - borrow) & 0x1FF
+        return result & 0xFF, SZPC[result] | ((a ^ b ^ result) & FLAG_AC)
+
+    @staticmethod
+    def inr(value: int) -> Tuple[int, int]:
+        """Increment; the flags exclude C, which INR leaves unchanged"""
+        result = (value + 1) & 0xFF
+        return result, INR_FLAGS[result]
+
     @staticmethod
-    def sub(a: int, b: int, borrow: bool = False) -> Tuple[int, Dict[str, bool]]:
-        """8-bit subtraction with flags"""
-        if not (0 <= a <= 0xFF and 0 <= b <= 0xFF):
-            raise ValueError(f"Invalid operands for subtraction: a={a:02X}, b={b:02X}")
-            
-        # Calculate result with borrow
-        result = a - b - (1 if borrow else 0)
-        
-        # Calculate flags
-        flags = {
-            'C': a < (b + (1 if borrow else 0)),  # Set carry if there's a borrow
-            'Z': (result & 0xFF) == 0,
-            'S': (result & 0x80) != 0,
-            'P': bin(result & 0xFF).count('1') % 2 == 0,
-            'AC': (a & 0x0F) < (b & 0x0F) + (1 if borrow else 0)
-        }
-        
-        return result & 0xFF, flags
-    
+    def dcr(value: int) -> Tuple[int, int]:
+        """Decrement; the flags exclude C, which DCR leaves unchanged"""
+        result = (value - 1) & 0xFF
+        return result, DCR_FLAGS[result]
+
     @staticmethod
-    def logical_and(a: int, b: int) -> Tuple[int, Dict[str, bool]]:
+    def logical_and(a: int, b: int) -> Tuple[int, int]:
         """Logical AND operation"""
         result = a & b
-        flags = {
-            'C': False,
-            'Z': result == 0,
-            'S': (result & 0x80) != 0,
-            'P': bin(result).count('1') % 2 == 0,
-            'AC': True  # Always set for logical operations
-        }
-        return result, flags
-    
+        return result, SZP[result] | FLAG_AC  # AC always set for logical AND
+
     @staticmethod
-    def logical_or(a: int, b: int) -> Tuple[int, Dict[str, bool]]:
+    def logical_or(a: int, b: int) -> Tuple[int, int]:
         """Logical OR operation"""
         result = a | b
-        flags = {
-            'C': False,
-            'Z': result == 0,
-            'S': (result & 0x80) != 0,
-            'P': bin(result).count('1') % 2 == 0,
-            'AC': False
-        }
-        return result, flags
-    
+        return result, SZP[result]
+
     @staticmethod
-    def logical_xor(a: int, b: int) -> Tuple[int, Dict[str, bool]]:
+    def logical_xor(a: int, b: int) -> Tuple[int, int]:
         """Logical XOR operation"""
         result = a ^ b
-        flags = {
-            'C': False,
-            'Z': result == 0,
-            'S': (result & 0x80) != 0,
-            'P': bin(result).count('1') % 2 == 0,
-            'AC': False
-        }
-        return result, flags
\ No newline at end of file
+        return result, SZP[result]
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from Src.Utils.Logger import logger
 
 class Assembler:
@@ -6,6 +6,8 @@ class Assembler:
     
     def __init__(self):
         logger.info("Initializing 8085 Assembler")
+        # Offset of each instruction in the last assembled code -> 1-based source line
+        self.source_map: Dict[int, int] = {}
         self.opcodes = {
             # Data Transfer
             'MOV A,A': 0x7F, 'MOV A,B': 0x78, 'MOV A,C': 0x79, 'MOV A,D': 0x7A,
@@ -117,13 +119,20 @@ class Assembler:
             'DI': 0xF3,   # Disable interrupts
             'RIM': 0x20,  # Read interrupt mask
             'SIM': 0x30,  # Set interrupt mask
+            
+            # Restart (call to 8 * n)
+            'RST 0': 0xC7, 'RST 1': 0xCF, 'RST 2': 0xD7, 'RST 3': 0xDF,
+            'RST 4': 0xE7, 'RST 5': 0xEF, 'RST 6': 0xF7, 'RST 7': 0xFF,
         }
     
     def assemble(self, assembly_code: str) -> List[int]:
         """Convert assembly code to machine code with robust label support"""
         logger.info("Starting assembly process")
         machine_code = []
+        # Line numbers count the blank lines strip() removes from the top
+        first_line = 1 + assembly_code[:len(assembly_code) - len(assembly_code.lstrip())].count('\n')
         lines = assembly_code.strip().split('\n')
+        source_map = {}
         labels = {}
         label_case_map = {}  # For case-insensitive lookup
         org_address = 0x0000
@@ -131,7 +140,7 @@ class Assembler:
         processed_lines = []
         
         # First pass: collect labels and remove comments, handle ORG
-        for line in lines:
+        for number, line in enumerate(lines, start=first_line):
             # Remove comments
             if ';' in line:
                 line = line.split(';')[0]
@@ -156,7 +165,7 @@ class Assembler:
                 label_case_map[label_key] = label  # For error messages
                 line = line.split(':', 1)[1].strip()
             if line:
-                processed_lines.append(line)
+                processed_lines.append((number, line))
                 # Estimate instruction size
                 parts = line.split()
                 if parts[0].upper() in ['MVI', 'ADI', 'CPI', 'SUI']:
@@ -168,8 +177,9 @@ class Assembler:
         logger.debug(f"First pass complete. Labels: {labels}")
         # Second pass: generate machine code
         address = org_address
-        for line in processed_lines:
+        for number, line in processed_lines:
             logger.debug(f"Processing instruction: {line}")
+            source_map[len(machine_code)] = number
             parts = line.split()
             mnemonic = parts[0].upper()
             if len(parts) == 1:
@@ -254,5 +264,10 @@ class Assembler:
                         raise ValueError(f"Unknown instruction: {full_mnemonic}")
             else:
                 raise ValueError(f"Invalid instruction format: {line}")
+        self.source_map = source_map
         logger.info(f"Assembly complete - Generated {len(machine_code)} bytes of machine code")
         return machine_code
+
+    def mnemonics(self) -> Dict[int, str]:
+        """Mnemonic of each opcode this assembler knows, e.g. 0x05 -> 'DCR B'"""
+        return {opcode: mnemonic for mnemonic, opcode in self.opcodes.items()}
@@ -0,0 +1,538 @@
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from Src.Core.ALU import FLAG_S, FLAG_Z, FLAG_AC, FLAG_P, FLAG_C, SZP, SZPC, INR_FLAGS, DCR_FLAGS
+from Src.Core.CPU import (CPU, CYCLES, PSW_FLAG_MASK, JUMP_TAKEN_CYCLES, CALL_TAKEN_CYCLES,
+                          RETURN_TAKEN_CYCLES)
+from Src.Core.BulkLoops import BulkLoop, match_bulk_loop
+from Src.Core.Memory import NO_ADDRESSES
+from Src.Utils.Logger import logger
+
+# Longest straight-line run compiled into one block
+MAX_BLOCK_INSTRUCTIONS = 32
+
+# 8085 register field encoding; 6 selects M, the byte at (HL)
+REGISTER_FIELD = ('b', 'c', 'd', 'e', 'h', 'l', None, 'a')
+# Block locals and the CPU attributes they mirror
+CPU_ATTRIBUTES = {'a': 'A', 'b': 'B', 'c': 'C', 'd': 'D', 'e': 'E', 'h': 'H', 'l': 'L', 'f': 'F', 'sp': 'SP'}
+# Flags as (packed F byte, Z, C, P, S) expressions once they are stored in the f
+# local; each flag expression is truthy when the flag is set, and the C one is 0 or 1
+MATERIALIZED = ('f', f'f & {FLAG_Z:#04x}', f'f & {FLAG_C:#04x}', f'f & {FLAG_P:#04x}', f'f & {FLAG_S:#04x}')
+# Register pairs in bits 4-5 of LXI/INX/DCX/PUSH/POP (3 is SP, or PSW for PUSH/POP)
+REGISTER_PAIRS = (('b', 'c'), ('d', 'e'), ('h', 'l'))
+
+HL = '((h << 8) | l)'
+
+
+class _Decoded:
+    """One instruction translated into block source"""
+
+    __slots__ = ('pc', 'next_pc', 'cycles', 'lines', 'reads', 'writes', 'guard', 'store', 'branch', 'flags')
+
+    def __init__(self, pc: int, length: int, opcode: int):
+        self.pc = pc
+        self.next_pc = pc + length
+        self.cycles = CYCLES[opcode]
+        self.lines: List[str] = []
+        self.reads: Set[str] = set()
+        self.writes: Set[str] = set()
+        self.guard: Optional[str] = None          # Condition under which the interpreter must run it
+        self.store: Optional[Tuple[str, List[str]]] = None  # (address local, byte expressions) written last
+        self.branch: Optional[Tuple] = None               # Control transfer ending the block
+        self.flags: Optional[Tuple] = None                # Flag-setting operation, evaluated lazily
+
+    def uses(self, reads: str = '', writes: str = '') -> '_Decoded':
+        self.reads.update(reads.split())
+        self.writes.update(writes.split())
+        return self
+
+
+class _LazyFlags:
+    """Flags of the code generated so far, kept as expressions until F is needed
+
+    A flag-setting instruction only saves its result (and for ADD/SUB/CMP the
+    operand XOR that gives AC) in locals. Conditions and carry-in read single
+    flags straight from those; the packed byte is only built for PUSH PSW, DAA,
+    the rotates, STC/CMC and when the block writes its state back.
+    """
+
+    __slots__ = ('state', 'assigned', 'loaded')
+
+    def __init__(self):
+        self.state = MATERIALIZED
+        self.assigned = False  # f holds a value computed in the block
+        self.loaded = False    # f must be read from cpu.F on entry
+
+    def flag(self, index: int) -> str:
+        if self.state is MATERIALIZED and not self.assigned:
+            self.loaded = True
+        return self.state[index]
+
+    def carry(self) -> str:
+        return self.flag(2)
+
+    def condition(self, code: int) -> str:
+        """Expression for the Jcc/Ccc/Rcc condition in bits 3-5 (NZ, Z, NC, C, PO, PE, P, M)"""
+        expression = self.flag(1 + (code >> 1))
+        if code & 1:
+            return expression
+        return expression[4:] if expression.startswith('not ') else f'not {expression}'
+
+    def materialize(self) -> List[str]:
+        """Lines that store the pending flags in f for an instruction that reads all of F"""
+        if self.state is MATERIALIZED:
+            self.flag(0)
+            return []
+        line = f'f = {self.state[0]}'
+        self.state = MATERIALIZED
+        self.assigned = True
+        return [line]
+
+    def assign(self) -> None:
+        """An instruction stored new flags in f"""
+        self.state = MATERIALIZED
+        self.assigned = True
+
+    def record(self, operation: Tuple) -> None:
+        """Make an instruction's flag-setting operation the pending flags"""
+        kind = operation[0]
+        if kind == 'arith':
+            t, h = operation[1:]
+            self.state = (f'SZPC[{t}] | (({h} ^ {t}) & {FLAG_AC:#04x})', f'not {t} & 0xFF',
+                          f'{t} >> 8', f'SZP[{t} & 0xFF] & {FLAG_P:#04x}', f'{t} & {FLAG_S:#04x}')
+            return
+        if kind == 'logic':
+            r, extra = operation[1:]
+            table, carry = 'SZP', '0'
+        else:  # INR/DCR keep the carry of whatever set the flags before them
+            table, r = operation[1:]
+            extra, carry = 0, self.carry()
+        packed = f'{table}[{r}]'
+        if extra:
+            packed += f' | {extra:#04x}'
+        if carry != '0':
+            packed += f' | ({carry})'
+        self.state = (packed, f'not {r}', carry, f'SZP[{r}] & {FLAG_P:#04x}', f'{r} & {FLAG_S:#04x}')
+
+    def sync(self) -> List[str]:
+        """Lines writing the flags back to the CPU"""
+        if self.state is not MATERIALIZED:
+            return [f'cpu.F = {self.state[0]}']
+        return ['cpu.F = f'] if self.assigned else []
+
+
+class BlockCache:
+    """Basic-block translation cache for one CPU
+
+    Straight-line code from a start address up to the next control transfer is
+    decoded once, turned into Python source that keeps the registers in locals
+    and compiled into a single function, cached by start address. The bytes a
+    block was decoded from are marked in Memory.code_marks; a write to any of
+    them drops every block covering it, so self-modifying code stays correct.
+
+    A block function takes the CPU, writes back the registers it changed, PC and
+    T-states, and returns how many instructions it executed. It returns early
+    (possibly 0) when an instruction must be left to the interpreter, e.g. a
+    stack access that would fault, and right after a store into compiled code.
+    """
+
+    def __init__(self, cpu: CPU):
+        self.cpu = cpu
+        self.memory = cpu.memory
+        self.blocks: Dict[int, Tuple[Optional[Callable[[CPU], int]], int, int]] = {}
+        self._ranges: Dict[int, Tuple[int, int]] = {}
+        self._by_page: Dict[int, Set[int]] = {}
+        self.stats = {'compiled': 0, 'invalidated': 0, 'bulk_loops': 0}
+        self.memory.on_code_write = self.invalidate
+
+    def clear(self) -> None:
+        """Drop every compiled block"""
+        for start in list(self._ranges):
+            self._drop(start)
+
+    def invalidate(self, address: int, length: int = 1) -> None:
+        """Drop the blocks decoded from any byte in address..address+length-1"""
+        end = address + length
+        for page in range((address >> 8) - 1, ((end - 1) >> 8) + 1):
+            for start in list(self._by_page.get(page, ())):
+                block_start, block_end = self._ranges[start]
+                if block_start < end and address < block_end:
+                    self._drop(start)
+                    self.stats['invalidated'] += 1
+
+    def _drop(self, start: int) -> None:
+        block_start, block_end = self._ranges.pop(start)
+        del self.blocks[start]
+        marks = self.memory.code_marks
+        for address in range(block_start, block_end):
+            marks[address] -= 1
+        for page in range(block_start >> 8, ((block_end - 1) >> 8) + 1):
+            self._by_page[page].discard(start)
+
+    def compile(self, start: int) -> Tuple[Optional[Callable[[CPU], int]], int, int, Optional[BulkLoop]]:
+        """Translate and cache the block at start; n == 0 means interpret one instruction
+
+        When start begins a recognized memory loop the entry also carries its bulk
+        function, tried before the block itself.
+        """
+        if self.memory.code_marks is NO_ADDRESSES:
+            # First block on this memory; blocks must see the writable marks from the start
+            self.memory.code_marks = bytearray(NO_ADDRESSES)
+        decoded = self._decode(start)
+        bulk = match_bulk_loop(self.memory.memory, start)
+        if decoded:
+            source = self._generate(start, decoded)
+            namespace = {
+                'mem': self.memory.memory, 'marks': self.memory.code_marks, 'memory': self.memory,
+                'code_write': self.invalidate, 'SZP': SZP, 'SZPC': SZPC,
+                'INR_FLAGS': INR_FLAGS, 'DCR_FLAGS': DCR_FLAGS,
+            }
+            exec(compile(source, f'<block {start:04X}>', 'exec'), namespace)
+            max_cycles = sum(instr.cycles for instr in decoded) + self._taken_cycles(decoded[-1])
+            block = (namespace['block'], len(decoded), max_cycles, bulk and bulk[0])
+            end = decoded[-1].next_pc
+        else:
+            block = (None, 0, 0, bulk and bulk[0])
+            end = start + 1
+        if bulk:
+            # The loop may extend past the first block; its bytes must invalidate it too
+            end = max(end, bulk[1])
+            self.stats['bulk_loops'] += 1
+        self.blocks[start] = block
+        self._ranges[start] = (start, end)
+        marks = self.memory.code_marks
+        for address in range(start, end):
+            marks[address] += 1
+        for page in range(start >> 8, ((end - 1) >> 8) + 1):
+            self._by_page.setdefault(page, set()).add(start)
+        self.stats['compiled'] += 1
+        logger.debug(f"Compiled block {start:04X}-{end - 1:04X} ({len(decoded)} instructions)")
+        return block
+
+    @staticmethod
+    def _taken_cycles(instr: _Decoded) -> int:
+        kind = instr.branch[0] if instr.branch else None
+        return {'jcc': JUMP_TAKEN_CYCLES, 'ccc': CALL_TAKEN_CYCLES, 'rcc': RETURN_TAKEN_CYCLES}.get(kind, 0)
+
+    def _decode(self, start: int) -> List[_Decoded]:
+        """Decode supported instructions from start up to and including a control transfer"""
+        mem = self.memory.memory
+        implemented = CPU.instruction_set
+        decoded = []
+        pc = start
+        while len(decoded) < MAX_BLOCK_INSTRUCTIONS:
+            opcode = mem[pc]
+            if implemented[opcode] is CPU._illegal_opcode:
+                break
+            instr = _translate(opcode, pc, mem)
+            if instr is None or instr.next_pc > 0x10000:
+                break
+            decoded.append(instr)
+            if instr.branch or instr.next_pc > 0xFFFF:
+                break
+            pc = instr.next_pc
+        return decoded
+
+    def _generate(self, start: int, decoded: List[_Decoded]) -> str:
+        """Python source of the block function"""
+        names = set()
+        written = set()
+        for instr in decoded:
+            names |= instr.reads | instr.writes
+            written |= instr.writes
+        # F is loaded and written back by _LazyFlags, only where the block needs it
+        order = [name for name in CPU_ATTRIBUTES if name in names and name != 'f']
+        sync = [f'cpu.{CPU_ATTRIBUTES[name]} = {name}' for name in order if name in written]
+        flags = _LazyFlags()
+
+        def leave(pc: str, count: int, cycles: int) -> List[str]:
+            lines = sync + flags.sync() + [f'cpu.PC = {pc}']
+            if cycles:
+                lines.append(f'cpu.cycles += {cycles}')
+            return lines + [f'return {count}']
+
+        body = []
+        if any(instr.store for instr in decoded):
+            body.append('on_write = memory.on_memory_write')
+        cycles = 0
+        for count, instr in enumerate(decoded):
+            body.append(f'# {instr.pc:04X}')
+            if instr.guard:
+                body.append(f'if {instr.guard}:')
+                body += ['    ' + line for line in leave(f'{instr.pc:#06x}', count, cycles)]
+            if 'f' in instr.reads:
+                body += flags.materialize()
+            # Locals named with '$' are unique to the instruction, so pending flags can refer to them
+            suffix = f'_{count}'
+            lines = [line.replace('$carry', f'({flags.carry()})') if '$carry' in line else line
+                     for line in instr.lines]
+            lines = [line.replace('$', suffix) for line in lines]
+            if instr.flags:
+                flags.record(tuple(part.replace('$', suffix) if isinstance(part, str) else part
+                                   for part in instr.flags))
+            elif 'f' in instr.writes:
+                flags.assign()
+            branch = instr.branch
+            done = count + 1
+            fallthrough = f'{instr.next_pc & 0xFFFF:#06x}'
+            if branch and branch[0] in ('ccc', 'rcc'):
+                # Conditional stack access: the guard and transfer only apply when taken
+                body.append(f'if {flags.condition(branch[1])}:')
+                taken = []
+                if branch[2]:
+                    taken.append(f'if {branch[2]}:')
+                    taken += ['    ' + line for line in leave(f'{instr.pc:#06x}', count, cycles)]
+                taken += lines
+                taken_cycles = cycles + instr.cycles + self._taken_cycles(instr)
+                taken += self._store(instr, leave, done, taken_cycles, branch[3])
+                taken += leave(branch[3], done, taken_cycles)
+                body += ['    ' + line for line in taken]
+                body += leave(fallthrough, done, cycles + instr.cycles)
+                break
+            body += lines
+            cycles += instr.cycles
+            target = branch[1] if branch and branch[0] in ('jmp', 'call', 'ret') else fallthrough
+            body += self._store(instr, leave, done, cycles, target)
+            if branch is None:
+                continue
+            if branch[0] == 'jcc':
+                body.append(f'if {flags.condition(branch[1])}:')
+                body += ['    ' + line for line in leave(branch[2], done, cycles + JUMP_TAKEN_CYCLES)]
+                body += leave(fallthrough, done, cycles)
+            else:
+                body += leave(target, done, cycles)
+            break
+        else:
+            body += leave(f'{decoded[-1].next_pc & 0xFFFF:#06x}', len(decoded), cycles)
+        load = [f'{name} = cpu.{CPU_ATTRIBUTES[name]}' for name in order]
+        if flags.loaded:
+            load.append('f = cpu.F')
+        return '\n'.join(['def block(cpu):'] + ['    ' + line for line in load + body]) + '\n'
+
+    @staticmethod
+    def _store(instr: _Decoded, leave, count: int, cycles: int, next_pc: str) -> List[str]:
+        """Memory stores of an instruction, after its register effects"""
+        if not instr.store:
+            return []
+        address, values = instr.store
+        lines = []
+        for offset, value in enumerate(values):
+            target = address if not offset else f'{address} + {offset}'
+            lines.append(f'mem[{target}] = {value}')
+        lines.append('if on_write:')
+        for offset, value in enumerate(values):
+            target = address if not offset else f'{address} + {offset}'
+            lines.append(f'    on_write({target}, {value})')
+        touched = ' or '.join(f'marks[{address if not offset else f"{address} + {offset}"}]'
+                              for offset in range(len(values)))
+        lines.append(f'if {touched}:')
+        # A store into compiled code ends the block; the rest may no longer be valid
+        exit_lines = leave(next_pc, count, cycles)
+        lines += ['    ' + line for line in exit_lines[:-1]]
+        lines.append(f'    code_write({address}, {len(values)})')
+        lines.append('    ' + exit_lines[-1])
+        return lines
+
+
+def _source_operand(field: int, instr: _Decoded) -> str:
+    """Expression for a register or M source operand"""
+    reg = REGISTER_FIELD[field]
+    if reg is None:
+        instr.uses('h l')
+        return f'mem[{HL}]'
+    instr.uses(reg)
+    return reg
+
+
+def _alu(group: int, operand: str, instr: _Decoded) -> None:
+    """ADD/ADC/SUB/SBB/ANA/XRA/ORA/CMP with an operand expression"""
+    instr.uses('a', '' if group == 7 else 'a')
+    if not operand.isidentifier():
+        instr.lines.append(f'v = {operand}')
+        operand = 'v'
+    if group in (0, 1, 2, 3, 7):
+        carry = ' + ($carry)' if group == 1 else ' - ($carry)' if group == 3 else ''
+        if group < 2:
+            result = f'a + {operand}{carry}'
+        else:
+            result = f'(a - {operand}{carry}) & 0x1FF'
+        instr.lines += [f'h$ = a ^ {operand}', f't$ = {result}']
+        if group != 7:
+            instr.lines.append('a = t$ & 0xFF')
+        instr.flags = ('arith', 't$', 'h$')
+    else:
+        op = {4: '&', 5: '^', 6: '|'}[group]
+        instr.lines.append(f'a = r$ = a {op} {operand}')
+        instr.flags = ('logic', 'r$', FLAG_AC if group == 4 else 0)
+
+
+def _translate(opcode: int, pc: int, mem: bytearray) -> Optional[_Decoded]:
+    """Translate one instruction, or None if blocks leave it to the interpreter"""
+    high, mid, low = opcode >> 6, (opcode >> 3) & 7, opcode & 7
+
+    if high == 1:
+        if opcode == 0x76:
+            return None  # HLT ends the run through the interpreter
+        instr = _Decoded(pc, 1, opcode)
+        dest = REGISTER_FIELD[mid]
+        if dest is None:
+            instr.uses('h l')
+            instr.lines.append(f't = {HL}')
+            instr.store = ('t', [_source_operand(low, instr)])
+        else:
+            instr.lines.append(f'{dest} = {_source_operand(low, instr)}')
+            instr.uses(writes=dest)
+        return instr
+
+    if high == 2:
+        instr = _Decoded(pc, 1, opcode)
+        _alu(mid, _source_operand(low, instr), instr)
+        return instr
+
+    if pc + 2 <= 0xFFFF:
+        byte = mem[pc + 1]
+        word = mem[pc + 1] | (mem[pc + 2] << 8)
+    else:
+        byte = mem[pc + 1] if pc < 0xFFFF else None
+        word = None
+
+    if high == 0:
+        reg = REGISTER_FIELD[mid]
+        if low == 4 or low == 5:  # INR/DCR
+            table = 'INR_FLAGS' if low == 4 else 'DCR_FLAGS'
+            step = '+ 1' if low == 4 else '- 1'
+            instr = _Decoded(pc, 1, opcode)
+            if reg is None:
+                instr.uses('h l')
+                instr.lines += ['t = ' + HL, f'v = r$ = (mem[t] {step}) & 0xFF']
+                instr.store = ('t', ['v'])
+            else:
+                instr.uses(reg, reg)
+                instr.lines.append(f'{reg} = r$ = ({reg} {step}) & 0xFF')
+            instr.flags = ('incdec', table, 'r$')
+            return instr
+        if low == 6:  # MVI
+            if byte is None:
+                return None
+            instr = _Decoded(pc, 2, opcode)
+            if reg is None:
+                instr.uses('h l')
+                instr.lines.append(f't = {HL}')
+                instr.store = ('t', [f'{byte:#04x}'])
+            else:
+                instr.uses(writes=reg)
+                instr.lines.append(f'{reg} = {byte:#04x}')
+            return instr
+        pair = mid >> 1
+        if low == 1 and not mid & 1:  # LXI
+            if word is None:
+                return None
+            instr = _Decoded(pc, 3, opcode)
+            if pair == 3:
+                instr.uses(writes='sp').lines.append(f'sp = {word:#06x}')
+            else:
+                hi, lo = REGISTER_PAIRS[pair]
+                instr.uses(writes=f'{hi} {lo}').lines += [f'{lo} = {word & 0xFF:#04x}', f'{hi} = {word >> 8:#04x}']
+            return instr
+        if low == 3:  # INX/DCX
+            instr = _Decoded(pc, 1, opcode)
+            step = '+ 1' if not mid & 1 else '- 1'
+            if pair == 3:
+                instr.uses('sp', 'sp').lines.append(f'sp = (sp {step}) & 0xFFFF')
+            else:
+                hi, lo = REGISTER_PAIRS[pair]
+                instr.uses(f'{hi} {lo}', f'{hi} {lo}')
+                instr.lines += [f't = ((({hi} << 8) | {lo}) {step}) & 0xFFFF', f'{hi} = t >> 8', f'{lo} = t & 0xFF']
+            return instr
+        if opcode in (0x22, 0x2A, 0x32, 0x3A):  # SHLD, LHLD, STA, LDA
+            if word is None or (opcode in (0x22, 0x2A) and word == 0xFFFF):
+                return None
+            instr = _Decoded(pc, 3, opcode)
+            if opcode == 0x22:
+                instr.uses('h l').lines.append(f't = {word:#06x}')
+                instr.store = ('t', ['l', 'h'])
+            elif opcode == 0x2A:
+                instr.uses(writes='h l').lines += [f'l = mem[{word:#06x}]', f'h = mem[{word + 1:#06x}]']
+            elif opcode == 0x32:
+                instr.uses('a').lines.append(f't = {word:#06x}')
+                instr.store = ('t', ['a'])
+            else:
+                instr.uses(writes='a').lines.append(f'a = mem[{word:#06x}]')
+            return instr
+        instr = _Decoded(pc, 1, opcode)
+        simple = {
+            0x00: ('', '', []),
+            0x07: ('a f', 'a f', ['f = (f & 0xFE) | (a >> 7)', 'a = ((a << 1) | (a >> 7)) & 0xFF']),
+            0x0F: ('a f', 'a f', ['f = (f & 0xFE) | (a & 1)', 'a = ((a >> 1) | (a << 7)) & 0xFF']),
+            0x17: ('a f', 'a f', ['t = f & 1', 'f = (f & 0xFE) | (a >> 7)', 'a = ((a << 1) | t) & 0xFF']),
+            0x1F: ('a f', 'a f', ['t = f & 1', 'f = (f & 0xFE) | (a & 1)', 'a = ((a >> 1) | (t << 7)) & 0xFF']),
+            0x27: ('a f', 'a f', [
+                't = a', 'v = f',
+                f'if (a & 0x0F) > 9 or v & {FLAG_AC:#04x}:', '    t += 6', f'    v |= {FLAG_AC:#04x}',
+                f'if (a >> 4) > 9 or v & 1:', '    t += 0x60', '    v |= 1',
+                'a = t & 0xFF', f'f = (v & {FLAG_AC | FLAG_C:#04x}) | SZP[a]',
+            ]),
+            0x2F: ('a', 'a', ['a ^= 0xFF']),
+            0x37: ('f', 'f', ['f |= 1']),
+            0x3F: ('f', 'f', ['f ^= 1']),
+        }
+        if opcode not in simple:
+            return None
+        reads, writes, lines = simple[opcode]
+        instr.uses(reads, writes).lines += lines
+        return instr
+
+    # high == 3: immediates, branches and stack operations
+    if low == 6:  # ADI, SUI, CPI, ...
+        if byte is None:
+            return None
+        instr = _Decoded(pc, 2, opcode)
+        _alu(mid, f'{byte:#04x}', instr)
+        return instr
+    if opcode in (0xC3, 0xCD) or low in (2, 4):
+        if word is None:
+            return None
+        instr = _Decoded(pc, 3, opcode)
+        if opcode == 0xC3:
+            instr.branch = ('jmp', f'{word:#06x}')
+        elif low == 2:
+            instr.branch = ('jcc', mid, f'{word:#06x}')
+        else:
+            instr.uses('sp', 'sp')
+            instr.lines.append('sp -= 2')
+            instr.store = ('sp', [f'{(pc + 3) & 0xFF:#04x}', f'{((pc + 3) >> 8) & 0xFF:#04x}'])
+            guard = 'sp < 2 or sp > 0x10000'
+            if opcode == 0xCD:
+                instr.guard = guard
+                instr.branch = ('call', f'{word:#06x}')
+            else:
+                instr.branch = ('ccc', mid, guard, f'{word:#06x}')
+        return instr
+    if opcode == 0xC9 or low == 0:
+        instr = _Decoded(pc, 1, opcode).uses('sp', 'sp')
+        instr.lines += ['w = mem[sp] | (mem[sp + 1] << 8)', 'sp += 2']
+        guard = 'sp < 0 or sp > 0xFFFE'
+        if opcode == 0xC9:
+            instr.guard = guard
+            instr.branch = ('ret', 'w')
+        else:
+            instr.branch = ('rcc', mid, guard, 'w')
+        return instr
+    if low in (1, 5) and not mid & 1:  # POP/PUSH
+        pair = mid >> 1
+        instr = _Decoded(pc, 1, opcode).uses('sp', 'sp')
+        hi, lo = ('a', 'f') if pair == 3 else REGISTER_PAIRS[pair]
+        if low == 5:
+            instr.uses(f'{hi} {lo}')
+            instr.guard = 'sp < 2 or sp > 0x10000'
+            instr.lines.append('sp -= 2')
+            instr.store = ('sp', [lo, hi])
+        else:
+            instr.uses(writes=f'{hi} {lo}')
+            instr.guard = 'sp < 0 or sp > 0xFFFE'
+            low_byte = f'mem[sp] & {PSW_FLAG_MASK:#04x}' if pair == 3 else 'mem[sp]'
+            instr.lines += [f'{lo} = {low_byte}', f'{hi} = mem[sp + 1]', 'sp += 2']
+        return instr
+    if opcode in (0xFB, 0xF3):  # EI/DI
+        instr = _Decoded(pc, 1, opcode)
+        instr.lines.append(f'cpu.interrupt_enabled = {opcode == 0xFB}')
+        return instr
+    return None
@@ -0,0 +1,259 @@
+from typing import Callable, Optional, Tuple
+from Src.Core.ALU import FLAG_AC, FLAG_C, SZP, SZPC, INR_FLAGS, DCR_FLAGS
+from Src.Core.CPU import CPU, CYCLES, JUMP_TAKEN_CYCLES, REGISTER_MNEMONICS
+
+# bulk(cpu, steps_left, cycles_left) runs whole loop iterations within both budgets
+# and returns how many instructions they were; 0 leaves the loop to the block code
+BulkLoop = Callable[[CPU, int, int], int]
+
+# Registers a loop may count with; H and L are the pointer, A holds data
+COUNTERS = ('B', 'C', 'D', 'E')
+INX_H = 0x23
+JNZ, JZ, JMP = 0xC2, 0xCA, 0xC3
+
+
+def match_bulk_loop(mem: bytearray, start: int) -> Optional[Tuple[BulkLoop, int]]:
+    """Recognize a memory-walking loop at start; returns its bulk function and end address
+
+    Only loops over HL made of implemented opcodes are recognized (the 8085
+    STAX/LDAX/XCHG forms of block copy are not implemented by the CPU):
+
+    - fill: MOV M,r or MVI M,data; INX H and DCR c in either order; JNZ start
+    - fill with a 16-bit count: MOV M,r or MVI M,data; INX H; DCX B|D;
+      MOV A,x; ORA y (x, y the count's halves); JNZ start
+    - sum: ADD M; INX H and DCR c in either order; JNZ start
+    - scan: MOV A,M; CPI data, ORA A or ANA A; JZ end; INX H, optionally
+      with INR c before or after it; JMP start
+    """
+    if start > 0xFFF0:
+        return None
+    return _match_fill(mem, start) or _match_sum(mem, start) or _match_scan(mem, start)
+
+
+def _word(mem: bytearray, address: int) -> int:
+    return mem[address] | (mem[address + 1] << 8)
+
+
+def _register(field: int) -> Optional[str]:
+    """Register name for an 8085 register field, None for M"""
+    return None if field == 6 else REGISTER_MNEMONICS[field]
+
+
+def _step_pair(mem: bytearray, at: int, increment: bool = False) -> Optional[str]:
+    """Counter register of INX H plus DCR c (or INR c) in either order"""
+    base = 0x04 if increment else 0x05
+    if mem[at] == INX_H:
+        other = mem[at + 1]
+    elif mem[at + 1] == INX_H:
+        other = mem[at]
+    else:
+        return None
+    if other & 0xC7 != base:
+        return None
+    counter = _register(other >> 3)
+    return counter if counter in COUNTERS else None
+
+
+def _store(mem: bytearray, start: int) -> Optional[Tuple[Optional[str], int, int]]:
+    """MOV M,r or MVI M,data at start: (source register or None, immediate, length)"""
+    opcode = mem[start]
+    if 0x70 <= opcode <= 0x77 and opcode != 0x76:
+        source = _register(opcode & 7)
+        return (source, 0, 1) if source not in ('H', 'L') else None
+    if opcode == 0x36:
+        return None, mem[start + 1], 2
+    return None
+
+
+def _fill(memory, hl: int, length: int, value: int) -> bool:
+    """Store value at hl..hl+length-1 unless that overwrites compiled code"""
+    if memory.code_marks.count(0, hl, hl + length) != length:
+        return False
+    memory.memory[hl:hl + length] = bytes((value,)) * length
+    if memory.on_memory_write:
+        for address in range(hl, hl + length):
+            memory.on_memory_write(address, value)
+    return True
+
+
+def _match_fill(mem: bytearray, start: int) -> Optional[Tuple[BulkLoop, int]]:
+    store = _store(mem, start)
+    if store is None:
+        return None
+    source, immediate, length = store
+    at = start + length
+    store_cycles = CYCLES[mem[start]]
+    counter = _step_pair(mem, at)
+    if counter is not None and counter != source and mem[at + 2] == JNZ and _word(mem, at + 3) == start:
+        return _fill_loop(start, at + 5, source, immediate, counter, store_cycles), at + 5
+
+    # 16-bit count: INX H; DCX rp; MOV A,x; ORA y; JNZ start
+    dcx, mov, ora = mem[at + 1], mem[at + 2], mem[at + 3]
+    if mem[at] != INX_H or dcx not in (0x0B, 0x1B) or mov & 0xF8 != 0x78 or ora & 0xF8 != 0xB0:
+        return None
+    high, low = ('B', 'C') if dcx == 0x0B else ('D', 'E')
+    if {_register(mov & 7), _register(ora & 7)} != {high, low} or source in (high, low, 'A'):
+        return None
+    if mem[at + 4] != JNZ or _word(mem, at + 5) != start:
+        return None
+    return _fill_loop16(start, at + 7, source, immediate, high, low, store_cycles), at + 7
+
+
+def _fill_loop(start: int, end: int, source: Optional[str], immediate: int, counter: str,
+               store_cycles: int) -> BulkLoop:
+    iteration = store_cycles + CYCLES[INX_H] + CYCLES[0x05] + CYCLES[JNZ] + JUMP_TAKEN_CYCLES
+
+    def bulk(cpu: CPU, steps: int, cycles: int) -> int:
+        hl = (cpu.H << 8) | cpu.L
+        count = getattr(cpu, counter) or 0x100
+        done = min(count, steps // 4, cycles // iteration, 0x10000 - hl)
+        value = immediate if source is None else getattr(cpu, source)
+        if done <= 0 or not _fill(cpu.memory, hl, done, value):
+            return 0
+        hl = (hl + done) & 0xFFFF
+        cpu.H, cpu.L = hl >> 8, hl & 0xFF
+        left = (count - done) & 0xFF
+        setattr(cpu, counter, left)
+        cpu.F = DCR_FLAGS[left] | (cpu.F & FLAG_C)
+        cpu.cycles += done * iteration
+        if left:
+            cpu.PC = start
+        else:
+            cpu.PC = end
+            cpu.cycles -= JUMP_TAKEN_CYCLES
+        return 4 * done
+    return bulk
+
+
+def _fill_loop16(start: int, end: int, source: Optional[str], immediate: int, high: str, low: str,
+                 store_cycles: int) -> BulkLoop:
+    iteration = (store_cycles + CYCLES[INX_H] + CYCLES[0x0B] + CYCLES[0x78] + CYCLES[0xB0]
+                 + CYCLES[JNZ] + JUMP_TAKEN_CYCLES)
+
+    def bulk(cpu: CPU, steps: int, cycles: int) -> int:
+        hl = (cpu.H << 8) | cpu.L
+        count = ((getattr(cpu, high) << 8) | getattr(cpu, low)) or 0x10000
+        done = min(count, steps // 6, cycles // iteration, 0x10000 - hl)
+        value = immediate if source is None else getattr(cpu, source)
+        if done <= 0 or not _fill(cpu.memory, hl, done, value):
+            return 0
+        hl = (hl + done) & 0xFFFF
+        cpu.H, cpu.L = hl >> 8, hl & 0xFF
+        left = (count - done) & 0xFFFF
+        setattr(cpu, high, left >> 8)
+        setattr(cpu, low, left & 0xFF)
+        cpu.A = (left >> 8) | (left & 0xFF)
+        cpu.F = SZP[cpu.A]
+        cpu.cycles += done * iteration
+        if left:
+            cpu.PC = start
+        else:
+            cpu.PC = end
+            cpu.cycles -= JUMP_TAKEN_CYCLES
+        return 6 * done
+    return bulk
+
+
+def _match_sum(mem: bytearray, start: int) -> Optional[Tuple[BulkLoop, int]]:
+    if mem[start] != 0x86:  # ADD M
+        return None
+    counter = _step_pair(mem, start + 1)
+    if counter is None or mem[start + 3] != JNZ or _word(mem, start + 4) != start:
+        return None
+    end = start + 6
+    iteration = CYCLES[0x86] + CYCLES[INX_H] + CYCLES[0x05] + CYCLES[JNZ] + JUMP_TAKEN_CYCLES
+
+    def bulk(cpu: CPU, steps: int, cycles: int) -> int:
+        hl = (cpu.H << 8) | cpu.L
+        count = getattr(cpu, counter) or 0x100
+        done = min(count, steps // 4, cycles // iteration, 0x10000 - hl)
+        if done <= 0:
+            return 0
+        data = cpu.memory.memory[hl:hl + done]
+        # Flags come from the last addition, so add everything before it first
+        before = (cpu.A + sum(data[:-1])) & 0xFF
+        total = before + data[-1]
+        cpu.A = total & 0xFF
+        hl = (hl + done) & 0xFFFF
+        cpu.H, cpu.L = hl >> 8, hl & 0xFF
+        left = (count - done) & 0xFF
+        setattr(cpu, counter, left)
+        cpu.F = DCR_FLAGS[left] | (total >> 8)
+        cpu.cycles += done * iteration
+        if left:
+            cpu.PC = start
+        else:
+            cpu.PC = end
+            cpu.cycles -= JUMP_TAKEN_CYCLES
+        return 4 * done
+    return bulk, end
+
+
+def _match_scan(mem: bytearray, start: int) -> Optional[Tuple[BulkLoop, int]]:
+    if mem[start] != 0x7E:  # MOV A,M
+        return None
+    test = mem[start + 1]
+    if test == 0xFE:  # CPI data
+        terminator, test_length = mem[start + 2], 2
+    elif test in (0xB7, 0xA7):  # ORA A / ANA A
+        terminator, test_length = 0, 1
+    else:
+        return None
+    at = start + 1 + test_length
+    if mem[at] != JZ:
+        return None
+    exit_address = _word(mem, at + 1)
+    at += 3
+    counter = _step_pair(mem, at, increment=True)
+    if counter is not None:
+        at += 2
+    elif mem[at] == INX_H:
+        at += 1
+    else:
+        return None
+    if mem[at] != JMP or _word(mem, at + 1) != start:
+        return None
+    end = at + 3
+    instructions = 6 if counter else 5
+    head = CYCLES[0x7E] + CYCLES[test]
+    iteration = head + CYCLES[JZ] + CYCLES[INX_H] + CYCLES[JMP] + (CYCLES[0x04] if counter else 0)
+    last = head + CYCLES[JZ] + JUMP_TAKEN_CYCLES
+
+    def flags_for(value: int) -> int:
+        """Flags after the test instruction for a loaded byte"""
+        if test == 0xFE:
+            result = (value - terminator) & 0x1FF
+            return SZPC[result] | ((value ^ terminator ^ result) & FLAG_AC)
+        return SZP[value] | (FLAG_AC if test == 0xA7 else 0)
+
+    def bulk(cpu: CPU, steps: int, cycles: int) -> int:
+        mem = cpu.memory.memory
+        hl = (cpu.H << 8) | cpu.L
+        fit = min(steps // instructions, cycles // iteration)
+        if fit < 0:
+            return 0
+        # Bytes the loop can load within the budgets: fit full passes and the exit
+        found = mem.find(terminator, hl, min(hl + fit + 1, 0x10000))
+        passes = (min(hl + fit, 0x10000) if found < 0 else found) - hl
+        exits = found >= 0 and passes * instructions + 3 <= steps and passes * iteration + last <= cycles
+        if not passes and not exits:
+            return 0
+        if passes:
+            value = mem[hl + passes - 1]
+            cpu.A, cpu.F = value, flags_for(value)
+            if counter:
+                count = (getattr(cpu, counter) + passes) & 0xFF
+                setattr(cpu, counter, count)
+                cpu.F = INR_FLAGS[count] | (cpu.F & FLAG_C)
+            hl = (hl + passes) & 0xFFFF
+            cpu.H, cpu.L = hl >> 8, hl & 0xFF
+        cpu.cycles += passes * iteration
+        cpu.PC = start
+        executed = passes * instructions
+        if exits:
+            cpu.A, cpu.F = terminator, flags_for(terminator)
+            cpu.cycles += last
+            cpu.PC = exit_address
+            executed += 3
+        return executed
+    return bulk, end
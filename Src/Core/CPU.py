@@ -1,57 +1,386 @@
-from typing import Dict, List
+import sys
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
 from Src.Core.Memory import Memory
-from Src.Core.ALU import ALU
-from Src.Utils.Logger import logger
+from Src.Core.Journal import UndoJournal, DEFAULT_JOURNAL_CAPACITY
+from Src.Core.Trace import TraceRecorder
+from Src.Core.Profiler import Profiler
+from Src.Core.Interrupts import (EventScheduler, pending_bit, PENDING_INTR, PENDING_INTR_VECTOR,
+                                 PENDING_RST_7_5, PENDING_TRAP, RESTART_ADDRESSES, MASK_ALL, SERIAL_OUTPUT,
+                                 INTERRUPT_CYCLES, NEVER)
+from Src.Core.ALU import ALU, FLAG_BITS, FLAG_S, FLAG_Z, FLAG_AC, FLAG_P, FLAG_C, SZP, SZPC, DCR_FLAGS
+from Src.Utils.Logger import logger, INSTRUMENT_OFF, INSTRUMENT_TRACE, check_instrumentation
+
+# Reasons reported by CPU.run() for ending a run
+STOP_HALT = 'halt'
+STOP_STEP_LIMIT = 'max_steps'
+STOP_BREAKPOINT = 'breakpoint'
+STOP_CYCLE_LIMIT = 'max_cycles'
+STOP_WATCHPOINT = 'watchpoint'
+
+# Execution engines used by CPU.run()
+ENGINE_INTERPRETER = 'interpreter'  # One table dispatch per instruction
+ENGINE_BLOCKS = 'blocks'            # Compiled basic blocks (see BlockCache.py)
+ENGINES = (ENGINE_INTERPRETER, ENGINE_BLOCKS)
+
+REGISTER_NAMES = ('A', 'B', 'C', 'D', 'E', 'H', 'L')
+# Flag bits that exist in the 8085 PSW; the unused bits read back as zero
+PSW_FLAG_MASK = FLAG_S | FLAG_Z | FLAG_AC | FLAG_P | FLAG_C
+
+# Extra T-states a conditional branch takes when its condition holds
+JUMP_TAKEN_CYCLES = 3     # Jcc: 7 not taken, 10 taken
+CALL_TAKEN_CYCLES = 9     # Ccc: 9 not taken, 18 taken
+RETURN_TAKEN_CYCLES = 6   # Rcc: 6 not taken, 12 taken
+
+def _build_cycle_table() -> bytes:
+    """8085 T-states per opcode; conditional branches hold their not-taken count"""
+    table = bytearray([4]) * 256  # NOP, rotates, DAA, CMA, STC, CMC, EI, DI, RIM, SIM, XCHG
+    for opcode in range(0x40, 0xC0):
+        # MOV r,M, MOV M,r and the ALU operations on M
+        if opcode & 0x07 == 0x06 or 0x70 <= opcode <= 0x77:
+            table[opcode] = 7
+    table[0x76] = 5  # HLT
+    for r in range(8):
+        base = r << 3
+        table[0x04 | base] = table[0x05 | base] = 10 if r == 6 else 4  # INR/DCR
+        table[0x06 | base] = 10 if r == 6 else 7  # MVI
+        table[0xC0 | base] = 6   # Rcc
+        table[0xC2 | base] = 7   # Jcc
+        table[0xC4 | base] = 9   # Ccc
+        table[0xC6 | base] = 7   # ADI, ACI, SUI, SBI, ANI, XRI, ORI, CPI
+        table[0xC7 | base] = 12  # RST
+    for rp in range(4):
+        base = rp << 4
+        table[0x01 | base] = 10  # LXI
+        table[0x03 | base] = table[0x0B | base] = 6  # INX/DCX
+        table[0x09 | base] = 10  # DAD
+        table[0xC1 | base] = 10  # POP
+        table[0xC5 | base] = 12  # PUSH
+    table[0x02] = table[0x12] = table[0x0A] = table[0x1A] = 7  # STAX/LDAX
+    table[0x22] = table[0x2A] = 16  # SHLD/LHLD
+    table[0x32] = table[0x3A] = 13  # STA/LDA
+    table[0xC3] = 10  # JMP
+    table[0xCD] = 18  # CALL
+    table[0xC9] = 10  # RET
+    table[0xD3] = table[0xDB] = 10  # OUT/IN
+    table[0xE3] = 16  # XTHL
+    table[0xE9] = table[0xF9] = 6  # PCHL/SPHL
+    return bytes(table)
+
+# T-states indexed by opcode
+CYCLES = _build_cycle_table()
+
+class _HaltSignal(Exception):
+    """Raised by the HLT handler used inside CPU.run() to leave the loop"""
+
+class _BudgetSpent(Exception):
+    """Raised by a loop fast-forward that stopped on its step allowance, to end the run() chunk"""
+
+class RegisterView(Mapping):
+    """Read-only dictionary view ('A'..'L') of the CPU register file"""
+    
+    __slots__ = ('_cpu',)
+    
+    def __init__(self, cpu: 'CPU'):
+        self._cpu = cpu
+    
+    def __getitem__(self, name: str) -> int:
+        if name not in REGISTER_NAMES:
+            raise KeyError(name)
+        return getattr(self._cpu, name)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(REGISTER_NAMES)
+    
+    def __len__(self) -> int:
+        return len(REGISTER_NAMES)
+    
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+class FlagView(Mapping):
+    """Read-only dictionary view ('S', 'Z', 'AC', 'P', 'C') of the packed flag byte"""
+    
+    __slots__ = ('_cpu',)
+    
+    def __init__(self, cpu: 'CPU'):
+        self._cpu = cpu
+    
+    def __getitem__(self, name: str) -> bool:
+        return bool(self._cpu.F & FLAG_BITS[name])
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(FLAG_BITS)
+    
+    def __len__(self) -> int:
+        return len(FLAG_BITS)
+    
+    def __repr__(self) -> str:
+        return repr(dict(self))
 
 class CPU:
     """Intel 8085 CPU Core"""
     
-    def __init__(self, memory: Memory):
+    # Register file, packed flags (PSW layout) and control state
+    __slots__ = (
+        'memory', 'alu', 'registers', 'flags',
+        'A', 'B', 'C', 'D', 'E', 'H', 'L', 'F', 'PC', 'SP',
+        'halted', 'interrupt_enabled', 'interrupt_mask', 'interrupt_pending', 'interrupt_due', 'cycles',
+        'serial_input', 'events', 'instrumentation', '_dispatch', '_run_dispatch', '_fused_dispatch', 'engine', 'blocks',
+        'fusion_counts', 'fast_forward_steps', 'fast_forward_budget', 'journal', 'tracer', 'profiler',
+    )
+    
+    def __init__(self, memory: Memory, instrumentation: Optional[str] = None, engine: str = ENGINE_INTERPRETER):
         self.memory = memory
         self.alu = ALU()
+        # Dictionary-style views for the GUI and other readers
+        self.registers = RegisterView(self)
+        self.flags = FlagView(self)
+        self.set_instrumentation(instrumentation or memory.instrumentation)
+        self.blocks = None
+        self.journal = None
+        self.tracer = None
+        self.profiler = None
+        self.events = EventScheduler(self)
+        self.serial_input = 0  # Level of the SID pin, read by RIM
+        self.set_engine(engine)
+        self.reset()
         logger.info("CPU initialized")
+    
+    def set_engine(self, engine: str) -> None:
+        """Select the run() engine: 'interpreter' or 'blocks'
         
+        The block engine is used for runs without breakpoints, watchpoints or
+        tracing; other
+        runs, and single steps, always go through the interpreter.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Invalid engine: {engine} (expected one of {', '.join(ENGINES)})")
+        self.engine = engine
+        if engine == ENGINE_BLOCKS and self.blocks is None:
+            from Src.Core.BlockCache import BlockCache  # BlockCache imports this module
+            self.blocks = BlockCache(self)
+    
+    def set_instrumentation(self, level: str) -> None:
+        """Select off/summary/trace for this CPU and its memory
+        
+        Trace swaps in opcode tables whose handlers log each instruction;
+        off and summary dispatch straight to the non-logging handlers.
+        """
+        self.instrumentation = check_instrumentation(level)
+        self.memory.set_instrumentation(level)
+        if level == INSTRUMENT_TRACE:
+            self._dispatch, self._run_dispatch = self.trace_instruction_set, self.trace_run_instruction_set
+            self._fused_dispatch = None  # Every instruction is logged on its own
+        else:
+            self._dispatch, self._run_dispatch = self.instruction_set, self.run_instruction_set
+            self._fused_dispatch = self.fused_run_instruction_set
+    
+    def reset(self) -> None:
+        """Reset registers, flags and control state in place (the instruction set is shared)"""
         # 8-bit registers
-        self.registers = {
-            'A': 0x00,  # Accumulator
-            'B': 0x00, 'C': 0x00,  # BC register pair
-            'D': 0x00, 'E': 0x00,  # DE register pair
-            'H': 0x00, 'L': 0x00   # HL register pair
-        }
+        self.A = 0x00  # Accumulator
+        self.B = self.C = 0x00  # BC register pair
+        self.D = self.E = 0x00  # DE register pair
+        self.H = self.L = 0x00  # HL register pair
         
         # 16-bit registers
         self.PC = 0x8000  # Program Counter
         self.SP = 0xFFFF  # Stack Pointer
         
-        # Status flags
-        self.flags = {
-            'S': False,  # Sign flag
-            'Z': False,  # Zero flag
-            'AC': False, # Auxiliary Carry
-            'P': False,  # Parity flag
-            'C': False   # Carry flag
-        }
+        # Status flags: S Z 0 AC 0 P 0 C
+        self.F = 0x00
         
         # Control flags
         self.halted = False
         self.interrupt_enabled = False
         
-        # Instruction set
-        self.instruction_set = self._build_instruction_set()
-        logger.info("CPU instruction set initialized")
+        # RST 7.5/6.5/5.5 masked and nothing pending, as after RESET IN
+        self.interrupt_mask = MASK_ALL
+        self.interrupt_pending = 0
+        # Cycle count at which run loops next fire events or look for an interrupt
+        self.interrupt_due = NEVER
+        self.events.clear()
+        
+        # T-states executed since reset
+        self.cycles = 0
+        
+        # Times each superinstruction (see FUSIONS) ran since reset
+        self.fusion_counts = [0] * len(FUSIONS)
+        # Instructions skipped by delay/poll loop fast-forward since reset, and how
+        # many more the current run() chunk may skip
+        self.fast_forward_steps = 0
+        self.fast_forward_budget = 0
+    
+    def get_state(self) -> tuple:
+        """Registers, flags, PC, SP, halted and interrupt-enable state, cycle count, interrupt masks and pending interrupts"""
+        return (self.A, self.B, self.C, self.D, self.E, self.H, self.L, self.F, self.PC, self.SP,
+                int(self.halted), int(self.interrupt_enabled), self.cycles, self.interrupt_mask,
+                self.interrupt_pending)
+    
+    def set_state(self, state: tuple) -> None:
+        """Load a tuple returned by get_state()"""
+        (self.A, self.B, self.C, self.D, self.E, self.H, self.L, self.F, self.PC, self.SP,
+         halted, interrupt_enabled, self.cycles, self.interrupt_mask, self.interrupt_pending) = state
+        self.halted = bool(halted)
+        self.interrupt_enabled = bool(interrupt_enabled)
+        # Pending interrupts are looked at again at once, events when the earliest is due
+        self.interrupt_due = self.cycles if self.interrupt_pending else self.events.next_due()
+    
+    def enable_journal(self, capacity: int = DEFAULT_JOURNAL_CAPACITY) -> None:
+        """Record an undo entry for each executed instruction, keeping the last capacity
+        
+        While recording, run() steps through the interpreter one instruction at
+        a time (no blocks, superinstructions or loop fast-forward).
+        """
+        self.journal = UndoJournal(capacity)
+        self.memory.set_journal(self.journal)
+    
+    def disable_journal(self) -> None:
+        """Stop recording and drop the journal"""
+        self.journal = None
+        self.memory.set_journal(None)
+    
+    def set_tracer(self, tracer: Optional[TraceRecorder]) -> None:
+        """Stream a binary record of every executed instruction to tracer (None stops)
+        
+        Like the journal, tracing makes run() step through the interpreter one
+        instruction at a time; without a tracer run() is unaffected.
+        """
+        if self.tracer is not None and tracer is not self.tracer:
+            self.tracer.flush()
+        self.tracer = tracer
+    
+    def set_profiler(self, profiler: Optional[Profiler]) -> None:
+        """Count executions and T-states per address and opcode into profiler (None stops)"""
+        self.profiler = profiler
+    
+    def step_back(self, count: int = 1) -> int:
+        """Undo up to count instructions from the journal; returns how many were undone"""
+        if self.journal is None:
+            raise ValueError("Reverse stepping needs the undo journal (enable_journal())")
+        write = self.memory._write_unjournaled
+        undone = 0
+        while undone < count:
+            entry = self.journal.pop()
+            if entry is None:
+                break
+            # Later writes first, so a byte written twice gets its original value
+            for index in range(len(entry) - 2, 0, -2):
+                write(entry[index], entry[index + 1])
+            self.set_state(entry[0])
+            undone += 1
+        return undone
+    
+    def reverse_to_write(self, address: int) -> bool:
+        """Step back to just before the most recent recorded write to address
+        
+        Returns False, without moving, when the journal holds no such write.
+        """
+        if self.journal is None:
+            raise ValueError("Reverse stepping needs the undo journal (enable_journal())")
+        back = self.journal.last_write(address)
+        if back:
+            self.step_back(back)
+        return bool(back)
+    
+    def set_register(self, name: str, value: int) -> None:
+        """Set an 8-bit register by name"""
+        if name not in REGISTER_NAMES or not 0 <= value <= 0xFF:
+            raise ValueError(f"Invalid register write: {name}={value}")
+        setattr(self, name, value)
+    
+    def set_flag(self, name: str, value: bool) -> None:
+        """Set or clear a status flag by name"""
+        bit = FLAG_BITS[name]
+        self.F = (self.F | bit) if value else (self.F & ~bit)
+    
+    def get_psw(self) -> int:
+        """Processor status word: accumulator in the high byte, flags in the low byte"""
+        return (self.A << 8) | self.F
+    
+    def set_psw(self, value: int) -> None:
+        """Load the accumulator and flags from a processor status word"""
+        self.A = (value >> 8) & 0xFF
+        self.F = value & PSW_FLAG_MASK
     
     def get_register_pair(self, high: str, low: str) -> int:
         """Get 16-bit register pair value"""
-        return (self.registers[high] << 8) | self.registers[low]
+        return (getattr(self, high) << 8) | getattr(self, low)
     
     def set_register_pair(self, high: str, low: str, value: int) -> None:
         """Set 16-bit register pair value"""
-        self.registers[high] = (value >> 8) & 0xFF
-        self.registers[low] = value & 0xFF
+        setattr(self, high, (value >> 8) & 0xFF)
+        setattr(self, low, value & 0xFF)
     
-    def update_flags(self, flags: Dict[str, bool]) -> None:
-        """Update CPU flags"""
-        self.flags.update(flags)
+    @property
+    def serial_output(self) -> int:
+        """Level of the SOD pin, last set by SIM"""
+        return self.interrupt_mask >> 7
+    
+    def raise_interrupt(self, line: str, restart: int = 7) -> None:
+        """Signal an interrupt: 'TRAP', 'RST7.5', 'RST6.5', 'RST5.5' or 'INTR'
+        
+        It stays pending until taken, cleared by clear_interrupt() or, for
+        RST 7.5, reset by SIM; an INTR device supplies RST restart (0-7).
+        Runs take it at the next instruction boundary the masks allow.
+        """
+        bit = pending_bit(line)
+        if bit == PENDING_INTR:
+            if not 0 <= restart <= 7:
+                raise ValueError(f"INTR restart must be 0-7: {restart}")
+            self.interrupt_pending = (self.interrupt_pending & ~PENDING_INTR_VECTOR) | restart
+        self.interrupt_pending |= bit
+        self.interrupt_due = min(self.interrupt_due, self.cycles)
+    
+    def clear_interrupt(self, line: str) -> None:
+        """Withdraw a pending interrupt that has not been taken yet"""
+        bit = pending_bit(line)
+        self.interrupt_pending &= ~(bit | PENDING_INTR_VECTOR if bit == PENDING_INTR else bit)
+    
+    def _service_interrupts(self) -> bool:
+        """Fire due events, then take the highest-priority interrupt the masks let through
+        
+        TRAP is always taken; the others need interrupts enabled and, for RST
+        7.5/6.5/5.5, their SIM mask bit clear. Taking one disables interrupts,
+        wakes a halted CPU and pushes PC before jumping to the restart address.
+        Returns whether an interrupt was taken.
+        """
+        events = self.events
+        if events.queue and events.queue[0][0] <= self.cycles:
+            events.run_due()
+        self.interrupt_due = events.queue[0][0] if events.queue else NEVER
+        pending = self.interrupt_pending
+        if pending & PENDING_TRAP:
+            bit = PENDING_TRAP
+        elif self.interrupt_enabled and pending & ~(self.interrupt_mask << 4) & 0x78:
+            bit = 1 << ((pending & ~(self.interrupt_mask << 4) & 0x78).bit_length() - 1)
+        else:
+            return False
+        if bit == PENDING_INTR:
+            self.interrupt_pending = pending & ~(PENDING_INTR | PENDING_INTR_VECTOR)
+            address = (pending & PENDING_INTR_VECTOR) << 3
+        else:
+            self.interrupt_pending = pending & ~bit
+            address = RESTART_ADDRESSES[bit]
+        if self.instrumentation == INSTRUMENT_TRACE:
+            logger.debug(f"Interrupt taken at PC={self.PC:04X}, restarting at {address:04X}")
+        self.interrupt_enabled = False
+        self.halted = False
+        self.push_stack(self.PC)
+        self.PC = address
+        self.cycles += INTERRUPT_CYCLES
+        return True
+    
+    def _service_interrupts_recorded(self) -> None:
+        """_service_interrupts() in a journal entry of its own, so step_back() takes an interrupt back"""
+        journal = self.journal
+        before = self.get_state()
+        journal.record(before)
+        entry = journal.current
+        if not self._service_interrupts() and len(entry) == 1 and self.get_state() == before:
+            journal.pop()  # Nothing changed, so there is no step to undo
     
     def push_stack(self, value: int) -> None:
         """Push 16-bit value onto stack"""
@@ -66,698 +395,986 @@ class CPU:
     
     def fetch_instruction(self) -> int:
         """Fetch instruction from memory"""
-        opcode = self.memory.read(self.PC)
+        opcode = self.memory.fetch(self.PC)
         self.PC = (self.PC + 1) & 0xFFFF
         return opcode
     
     def fetch_byte(self) -> int:
         """Fetch immediate byte"""
-        byte = self.memory.read(self.PC)
+        byte = self.memory.fetch(self.PC)
         self.PC = (self.PC + 1) & 0xFFFF
         return byte
     
     def fetch_word(self) -> int:
         """Fetch immediate word"""
-        word = self.memory.read_word(self.PC)
+        fetch = self.memory.fetch
+        word = fetch(self.PC) | fetch((self.PC + 1) & 0xFFFF) << 8
         self.PC = (self.PC + 2) & 0xFFFF
         return word
     
     def execute_instruction(self) -> bool:
         """Execute single instruction, return True if should continue"""
+        if self.cycles >= self.interrupt_due:
+            if self.journal is not None:
+                self._service_interrupts_recorded()
+            else:
+                self._service_interrupts()
         if self.halted:
             logger.info("CPU is halted")
             return False
         
+        if self.journal is not None:
+            self.journal.record(self.get_state())
+        if self.tracer is not None:
+            self.tracer.record(self, self.PC)
+        pc, before = self.PC, self.cycles
         opcode = self.fetch_instruction()
-        logger.debug(f"Executing instruction at PC={self.PC-1:04X}, Opcode={opcode:02X}")
+        self.cycles += CYCLES[opcode]
+        self._dispatch[opcode](self)
+        if self.profiler is not None:
+            self.profiler.count(pc, opcode, self.cycles - before)
+        return True
+    
+    def run(self, max_steps: Optional[int] = None, max_cycles: Optional[int] = None,
+            log_summary: bool = True) -> Dict[str, Any]:
+        """Run until HLT, a step or cycle budget, a breakpoint or a watchpoint and return a run summary
+        
+        The cycle budget is checked between instructions, so a run stops on the
+        first instruction boundary at or past max_cycles T-states. Watchpoints
+        stop the run after the instruction that hit them. Callers that run many
+        short slices pass log_summary=False and report once themselves.
+        
+        While events are scheduled or an interrupt is pending the run goes
+        through _run_interrupts() instead of the faster engines.
+        """
+        start = time.perf_counter()
+        start_cycles = self.cycles
+        self.memory.watch_hit = None  # Left over from single steps
+        limit = sys.maxsize if max_steps is None else max_steps
+        cycle_limit = sys.maxsize if max_cycles is None else start_cycles + max_cycles
+        if self.interrupt_pending or self.events.queue:
+            executed, reason = self._run_interrupts(limit, cycle_limit)
+            return self._run_summary(reason, executed, start, start_cycles, log_summary)
+        if self.halted:
+            return self._run_summary(STOP_HALT, 0, start, start_cycles, log_summary)
         
-        if opcode in self.instruction_set:
-            self.instruction_set[opcode]()
-            return True
+        # Runs with nothing armed skip the breakpoint and watchpoint checks entirely
+        armed = bool(self.memory.breakpoints) or bool(self.memory.watchpoints)
+        if self.journal is not None or self.tracer is not None or self.profiler is not None:
+            executed, reason = self._run_recorded(limit, cycle_limit)
+        elif armed:
+            executed, reason = self._run_checked(limit, cycle_limit)
+        elif self.engine == ENGINE_BLOCKS and self.instrumentation != INSTRUMENT_TRACE:
+            executed, reason = self._run_blocks(limit, cycle_limit)
+        elif max_cycles is not None:
+            executed, reason = self._run_budgeted(limit, cycle_limit)
         else:
-            logger.error(f"Unknown opcode: {opcode:02X} at PC: {self.PC-1:04X}")
-            raise ValueError(f"Unknown opcode: {opcode:02X} at PC: {self.PC-1:04X}")
+            executed, reason = self._run_fast(limit)
+        return self._run_summary(reason, executed, start, start_cycles, log_summary)
     
-    def _build_instruction_set(self) -> Dict[int, callable]:
-        """Build instruction set mapping"""
-        instructions = {}
+    def _run_fast(self, limit: int):
+        """Tight loop with no per-instruction checks besides the step budget
+        
+        Common instruction pairs run as one fused handler (see FUSIONS), and
+        delay and polling loops are fast-forwarded. A dispatch executes at most
+        two instructions plus whatever fast_forward_budget allows, so the loop
+        runs in chunks of a quarter of the remaining budget, lets fast-forwards
+        use up to half of it, and still stops on exactly the last step.
+        """
+        memory = self.memory.memory
+        dispatch = self._run_dispatch
+        fused = self._fused_dispatch
+        counts = self.fusion_counts
+        cycles = CYCLES
+        extra_before = sum(counts) + self.fast_forward_steps
+        dispatched = 0
+        step = 0
+        # Table T-states are summed locally; taken branches add theirs to self.cycles
+        total = 0
+        try:
+            while True:
+                remaining = limit - dispatched - (sum(counts) + self.fast_forward_steps - extra_before)
+                if remaining <= 0:
+                    return limit, STOP_STEP_LIMIT
+                if fused is not None and remaining > 3:
+                    table, chunk = fused, remaining >> 2
+                    self.fast_forward_budget = remaining - 2 * chunk
+                else:
+                    table, chunk = dispatch, remaining
+                try:
+                    for step in range(1, chunk + 1):
+                        pc = self.PC
+                        self.PC = (pc + 1) & 0xFFFF
+                        opcode = memory[pc]
+                        total += cycles[opcode]
+                        table[opcode](self)
+                except _BudgetSpent:
+                    chunk = step
+                dispatched += chunk
+        except _HaltSignal:
+            return dispatched + step + sum(counts) + self.fast_forward_steps - extra_before, STOP_HALT
+        finally:
+            self.fast_forward_budget = 0
+            self.cycles += total
+    
+    def _run_interrupts(self, limit: int, cycle_limit: int):
+        """Run while interrupts can fire, letting a halted CPU wait for them
+        
+        Superinstructions, loop fast-forward and compiled blocks assume nothing
+        but the program changes the machine between two of its instructions,
+        which an interrupt breaks, so the interpreter loops run here; each
+        compares the cycle count with interrupt_due once per instruction and
+        only then fires events and looks at the pending interrupts.
+        
+        A halted CPU skips ahead to the next event while one could wake it;
+        each such wait counts as one step, so a step budget also ends runs
+        whose interrupts stay masked. Once nothing scheduled can (with
+        interrupts disabled, only TRAP and function events can), HLT ends
+        the run as usual.
+        """
+        if self.journal is not None or self.tracer is not None or self.profiler is not None:
+            loop = self._run_recorded
+        elif self.memory.breakpoints or self.memory.watchpoints:
+            loop = self._run_checked
+        else:
+            loop = self._run_interruptible
+        executed = 0
+        while True:
+            if self.halted:
+                if self.cycles >= self.interrupt_due:
+                    self._service_interrupts()
+                if self.halted:
+                    if not self.events.can_wake(self.interrupt_enabled):
+                        return executed, STOP_HALT
+                    if executed >= limit:
+                        return executed, STOP_STEP_LIMIT
+                    if self.interrupt_due >= cycle_limit:
+                        self.cycles = max(self.cycles, cycle_limit)
+                        return executed, STOP_CYCLE_LIMIT
+                    self.cycles = self.interrupt_due
+                    executed += 1
+                    continue
+            done, reason = loop(limit - executed, cycle_limit)
+            executed += done
+            if reason != STOP_HALT:
+                return executed, reason
+    
+    def _run_interruptible(self, limit: int, cycle_limit: int):
+        """_run_budgeted that also fires events and takes interrupts once interrupt_due is reached"""
+        memory = self.memory.memory
+        dispatch = self._run_dispatch
+        cycles = CYCLES
+        executed = 0
+        try:
+            while True:
+                pc = self.PC
+                if executed >= limit:
+                    return executed, STOP_STEP_LIMIT
+                if self.cycles >= cycle_limit:
+                    return executed, STOP_CYCLE_LIMIT
+                if self.cycles >= self.interrupt_due:
+                    self._service_interrupts()
+                    continue
+                self.PC = (pc + 1) & 0xFFFF
+                executed += 1
+                opcode = memory[pc]
+                self.cycles += cycles[opcode]
+                dispatch[opcode](self)
+        except _HaltSignal:
+            return executed, STOP_HALT
+    
+    def fusion_stats(self) -> Dict[str, int]:
+        """How often each superinstruction ran since reset(), for the pairs that did"""
+        return {name: count for name, count in zip(FUSIONS, self.fusion_counts) if count}
+    
+    def _run_budgeted(self, limit: int, cycle_limit: int):
+        """Loop that also stops at the cycle budget"""
+        memory = self.memory.memory
+        dispatch = self._run_dispatch
+        cycles = CYCLES
+        executed = 0
+        try:
+            while True:
+                pc = self.PC
+                if executed >= limit:
+                    return executed, STOP_STEP_LIMIT
+                if self.cycles >= cycle_limit:
+                    return executed, STOP_CYCLE_LIMIT
+                self.PC = (pc + 1) & 0xFFFF
+                executed += 1
+                opcode = memory[pc]
+                self.cycles += cycles[opcode]
+                dispatch[opcode](self)
+        except _HaltSignal:
+            return executed, STOP_HALT
+    
+    def _run_checked(self, limit: int, cycle_limit: int):
+        """_run_budgeted that also stops at breakpoints and after watchpoint hits
+        
+        Events and interrupts are serviced once interrupt_due is reached, as in
+        _run_interruptible(), so breakpoints work inside interrupt handlers.
+        """
+        memory = self.memory.memory
+        watched = self.memory
+        breaks = self.memory.breakpoints.bitmap
+        conditions = self.memory.conditions
+        dispatch = self._run_dispatch
+        cycles = CYCLES
+        executed = 0
+        try:
+            while True:
+                if self.cycles >= self.interrupt_due:
+                    self._service_interrupts()
+                pc = self.PC
+                # The instruction the run starts on never re-triggers its breakpoint;
+                # a breakpoint wins over a budget that runs out at the same address.
+                # Conditions only run when the bitmap says there is a breakpoint
+                if executed and breaks[pc] and (pc not in conditions or conditions[pc](self, memory)):
+                    return executed, STOP_BREAKPOINT
+                if executed >= limit:
+                    return executed, STOP_STEP_LIMIT
+                if self.cycles >= cycle_limit:
+                    return executed, STOP_CYCLE_LIMIT
+                self.PC = (pc + 1) & 0xFFFF
+                executed += 1
+                opcode = memory[pc]
+                self.cycles += cycles[opcode]
+                dispatch[opcode](self)
+                if watched.watch_hit is not None:
+                    watched.watch_hit['pc'] = pc
+                    return executed, STOP_WATCHPOINT
+        except _HaltSignal:
+            return executed, STOP_HALT
+    
+    def _run_recorded(self, limit: int, cycle_limit: int):
+        """_run_checked that also feeds the undo journal, trace recorder and profiler"""
+        memory = self.memory.memory
+        watched = self.memory
+        breaks = self.memory.breakpoints.bitmap
+        conditions = self.memory.conditions
+        dispatch = self._run_dispatch
+        cycles = CYCLES
+        record = self.journal.record if self.journal is not None else None
+        state = self.get_state
+        tracer = self.tracer
+        if tracer is not None:
+            buffer, pack, chunk_bytes = tracer.buffer, tracer.pack, tracer.chunk_bytes
+        profile = self.profiler.count if self.profiler is not None else None
+        executed = 0
+        pc = opcode = before = 0
+        try:
+            while True:
+                if self.cycles >= self.interrupt_due:
+                    if record is not None:
+                        self._service_interrupts_recorded()
+                    else:
+                        self._service_interrupts()
+                pc = self.PC
+                if executed and breaks[pc] and (pc not in conditions or conditions[pc](self, memory)):
+                    return executed, STOP_BREAKPOINT
+                if executed >= limit:
+                    return executed, STOP_STEP_LIMIT
+                if self.cycles >= cycle_limit:
+                    return executed, STOP_CYCLE_LIMIT
+                opcode = memory[pc]
+                if record is not None:
+                    record(state())
+                if tracer is not None:
+                    buffer += pack(pc, opcode, memory[(pc + 1) & 0xFFFF], memory[(pc + 2) & 0xFFFF],
+                                   self.A, self.F, self.SP, self.cycles)
+                    if len(buffer) >= chunk_bytes:
+                        tracer.flush()
+                self.PC = (pc + 1) & 0xFFFF
+                executed += 1
+                before = self.cycles
+                self.cycles += cycles[opcode]
+                dispatch[opcode](self)
+                if profile is not None:
+                    profile(pc, opcode, self.cycles - before)
+                if watched.watch_hit is not None:
+                    watched.watch_hit['pc'] = pc
+                    return executed, STOP_WATCHPOINT
+        except _HaltSignal:
+            if profile is not None:
+                profile(pc, opcode, self.cycles - before)
+            return executed, STOP_HALT
+    
+    def _run_blocks(self, limit: int, cycle_limit: int):
+        """Run compiled blocks, interpreting single instructions near the budgets
+        
+        A block only runs when it fits in both budgets, so they stop on exactly
+        the instruction the interpreter would stop on.
+        """
+        memory = self.memory.memory
+        dispatch = self._run_dispatch
+        cycles = CYCLES
+        cache = self.blocks.blocks
+        compile_block = self.blocks.compile
+        executed = 0
+        try:
+            while True:
+                pc = self.PC
+                block = cache.get(pc)
+                if block is None:
+                    block = compile_block(pc)
+                run_block, count, block_cycles, bulk = block
+                if bulk is not None:
+                    done = bulk(self, limit - executed, cycle_limit - self.cycles)
+                    if done:
+                        executed += done
+                        continue
+                if count and executed + count <= limit and self.cycles + block_cycles <= cycle_limit:
+                    done = run_block(self)
+                    if done:
+                        executed += done
+                        continue
+                    pc = self.PC
+                # Interpret one instruction: unsupported by blocks, or close to a budget
+                if executed >= limit:
+                    return executed, STOP_STEP_LIMIT
+                if self.cycles >= cycle_limit:
+                    return executed, STOP_CYCLE_LIMIT
+                self.PC = (pc + 1) & 0xFFFF
+                executed += 1
+                opcode = memory[pc]
+                self.cycles += cycles[opcode]
+                dispatch[opcode](self)
+        except _HaltSignal:
+            return executed, STOP_HALT
+    
+    def _run_summary(self, reason: str, executed: int, start: float, start_cycles: int,
+                     log_summary: bool = True) -> Dict[str, Any]:
+        """Build the dictionary returned by run()
+        
+        'hit' describes the breakpoint or watchpoint that stopped the run (None
+        for other stops): its kind ('breakpoint', 'read', 'write' or 'change'),
+        the address, the condition and hit count of a conditional breakpoint,
+        and for watchpoints the value read or written, the old value of a
+        write, and the pc of the instruction that made the access.
+        """
+        elapsed = time.perf_counter() - start
+        cycles = self.cycles - start_cycles
+        hit = None
+        if reason == STOP_BREAKPOINT:
+            hit = {'kind': 'breakpoint', 'address': self.PC}
+            condition = self.memory.conditions.get(self.PC)
+            if condition is not None:
+                hit.update(condition=condition.text, hits=condition.hits)
+        elif reason == STOP_WATCHPOINT:
+            hit = self.memory.watch_hit
+            self.memory.watch_hit = None
+        if log_summary and self.instrumentation != INSTRUMENT_OFF:
+            logger.info(f"Run stopped ({reason}) after {executed} instructions ({cycles} T-states) in {elapsed:.6f}s")
+        return {
+            'instructions': executed,
+            'cycles': cycles,
+            'stop_reason': reason,
+            'elapsed': elapsed,
+            'pc': self.PC,
+            'hit': hit,
+        }
+    
+    def _hlt_signal(self):
+        """HLT as executed by run()"""
+        self.halted = True
+        raise _HaltSignal()
+    
+    @classmethod
+    def _build_instruction_set(cls) -> List[callable]:
+        """Build the 256-entry opcode table of unbound handlers (shared by all CPUs)"""
+        instructions = [cls._illegal_opcode] * 256
         
         # Data Transfer Instructions
-        instructions[0x7F] = self._mov_a_a  # MOV A,A
-        instructions[0x78] = self._mov_a_b  # MOV A,B
-        instructions[0x79] = self._mov_a_c  # MOV A,C
-        instructions[0x7A] = self._mov_a_d  # MOV A,D
-        instructions[0x7B] = self._mov_a_e  # MOV A,E
-        instructions[0x7C] = self._mov_a_h  # MOV A,H
-        instructions[0x7D] = self._mov_a_l  # MOV A,L
-        instructions[0x7E] = self._mov_a_m  # MOV A,M
+        instructions[0x7F] = cls._mov_a_a  # MOV A,A
+        instructions[0x78] = cls._mov_a_b  # MOV A,B
+        instructions[0x79] = cls._mov_a_c  # MOV A,C
+        instructions[0x7A] = cls._mov_a_d  # MOV A,D
+        instructions[0x7B] = cls._mov_a_e  # MOV A,E
+        instructions[0x7C] = cls._mov_a_h  # MOV A,H
+        instructions[0x7D] = cls._mov_a_l  # MOV A,L
+        instructions[0x7E] = cls._mov_a_m  # MOV A,M
         
-        instructions[0x47] = self._mov_b_a  # MOV B,A
-        instructions[0x40] = self._mov_b_b  # MOV B,B
-        instructions[0x41] = self._mov_b_c  # MOV B,C
-        instructions[0x42] = self._mov_b_d  # MOV B,D
-        instructions[0x43] = self._mov_b_e  # MOV B,E
-        instructions[0x44] = self._mov_b_h  # MOV B,H
-        instructions[0x45] = self._mov_b_l  # MOV B,L
-        instructions[0x46] = self._mov_b_m  # MOV B,M
+        instructions[0x47] = cls._mov_b_a  # MOV B,A
+        instructions[0x40] = cls._mov_b_b  # MOV B,B
+        instructions[0x41] = cls._mov_b_c  # MOV B,C
+        instructions[0x42] = cls._mov_b_d  # MOV B,D
+        instructions[0x43] = cls._mov_b_e  # MOV B,E
+        instructions[0x44] = cls._mov_b_h  # MOV B,H
+        instructions[0x45] = cls._mov_b_l  # MOV B,L
+        instructions[0x46] = cls._mov_b_m  # MOV B,M
         
-        instructions[0x4F] = self._mov_c_a  # MOV C,A
-        instructions[0x48] = self._mov_c_b  # MOV C,B
-        instructions[0x49] = self._mov_c_c  # MOV C,C
-        instructions[0x4A] = self._mov_c_d  # MOV C,D
-        instructions[0x4B] = self._mov_c_e  # MOV C,E
-        instructions[0x4C] = self._mov_c_h  # MOV C,H
-        instructions[0x4D] = self._mov_c_l  # MOV C,L
-        instructions[0x4E] = self._mov_c_m  # MOV C,M
+        instructions[0x4F] = cls._mov_c_a  # MOV C,A
+        instructions[0x48] = cls._mov_c_b  # MOV C,B
+        instructions[0x49] = cls._mov_c_c  # MOV C,C
+        instructions[0x4A] = cls._mov_c_d  # MOV C,D
+        instructions[0x4B] = cls._mov_c_e  # MOV C,E
+        instructions[0x4C] = cls._mov_c_h  # MOV C,H
+        instructions[0x4D] = cls._mov_c_l  # MOV C,L
+        instructions[0x4E] = cls._mov_c_m  # MOV C,M
         
         # Add D register MOV instructions
-        instructions[0x57] = self._mov_d_a  # MOV D,A
-        instructions[0x50] = self._mov_d_b  # MOV D,B
-        instructions[0x51] = self._mov_d_c  # MOV D,C
-        instructions[0x52] = self._mov_d_d  # MOV D,D
-        instructions[0x53] = self._mov_d_e  # MOV D,E
-        instructions[0x54] = self._mov_d_h  # MOV D,H
-        instructions[0x55] = self._mov_d_l  # MOV D,L
-        instructions[0x56] = self._mov_d_m  # MOV D,M
+        instructions[0x57] = cls._mov_d_a  # MOV D,A
+        instructions[0x50] = cls._mov_d_b  # MOV D,B
+        instructions[0x51] = cls._mov_d_c  # MOV D,C
+        instructions[0x52] = cls._mov_d_d  # MOV D,D
+        instructions[0x53] = cls._mov_d_e  # MOV D,E
+        instructions[0x54] = cls._mov_d_h  # MOV D,H
+        instructions[0x55] = cls._mov_d_l  # MOV D,L
+        instructions[0x56] = cls._mov_d_m  # MOV D,M
 
         # Add E register MOV instructions
-        instructions[0x5F] = self._mov_e_a  # MOV E,A
-        instructions[0x58] = self._mov_e_b  # MOV E,B
-        instructions[0x59] = self._mov_e_c  # MOV E,C
-        instructions[0x5A] = self._mov_e_d  # MOV E,D
-        instructions[0x5B] = self._mov_e_e  # MOV E,E
-        instructions[0x5C] = self._mov_e_h  # MOV E,H
-        instructions[0x5D] = self._mov_e_l  # MOV E,L
-        instructions[0x5E] = self._mov_e_m  # MOV E,M
+        instructions[0x5F] = cls._mov_e_a  # MOV E,A
+        instructions[0x58] = cls._mov_e_b  # MOV E,B
+        instructions[0x59] = cls._mov_e_c  # MOV E,C
+        instructions[0x5A] = cls._mov_e_d  # MOV E,D
+        instructions[0x5B] = cls._mov_e_e  # MOV E,E
+        instructions[0x5C] = cls._mov_e_h  # MOV E,H
+        instructions[0x5D] = cls._mov_e_l  # MOV E,L
+        instructions[0x5E] = cls._mov_e_m  # MOV E,M
 
         # Add H register MOV instructions
-        instructions[0x67] = self._mov_h_a  # MOV H,A
-        instructions[0x60] = self._mov_h_b  # MOV H,B
-        instructions[0x61] = self._mov_h_c  # MOV H,C
-        instructions[0x62] = self._mov_h_d  # MOV H,D
-        instructions[0x63] = self._mov_h_e  # MOV H,E
-        instructions[0x64] = self._mov_h_h  # MOV H,H
-        instructions[0x65] = self._mov_h_l  # MOV H,L
-        instructions[0x66] = self._mov_h_m  # MOV H,M
+        instructions[0x67] = cls._mov_h_a  # MOV H,A
+        instructions[0x60] = cls._mov_h_b  # MOV H,B
+        instructions[0x61] = cls._mov_h_c  # MOV H,C
+        instructions[0x62] = cls._mov_h_d  # MOV H,D
+        instructions[0x63] = cls._mov_h_e  # MOV H,E
+        instructions[0x64] = cls._mov_h_h  # MOV H,H
+        instructions[0x65] = cls._mov_h_l  # MOV H,L
+        instructions[0x66] = cls._mov_h_m  # MOV H,M
 
         # Add L register MOV instructions
-        instructions[0x6F] = self._mov_l_a  # MOV L,A
-        instructions[0x68] = self._mov_l_b  # MOV L,B
-        instructions[0x69] = self._mov_l_c  # MOV L,C
-        instructions[0x6A] = self._mov_l_d  # MOV L,D
-        instructions[0x6B] = self._mov_l_e  # MOV L,E
-        instructions[0x6C] = self._mov_l_h  # MOV L,H
-        instructions[0x6D] = self._mov_l_l  # MOV L,L
-        instructions[0x6E] = self._mov_l_m  # MOV L,M
+        instructions[0x6F] = cls._mov_l_a  # MOV L,A
+        instructions[0x68] = cls._mov_l_b  # MOV L,B
+        instructions[0x69] = cls._mov_l_c  # MOV L,C
+        instructions[0x6A] = cls._mov_l_d  # MOV L,D
+        instructions[0x6B] = cls._mov_l_e  # MOV L,E
+        instructions[0x6C] = cls._mov_l_h  # MOV L,H
+        instructions[0x6D] = cls._mov_l_l  # MOV L,L
+        instructions[0x6E] = cls._mov_l_m  # MOV L,M
 
         # Add M register MOV instructions
-        instructions[0x77] = self._mov_m_a  # MOV M,A
-        instructions[0x70] = self._mov_m_b  # MOV M,B
-        instructions[0x71] = self._mov_m_c  # MOV M,C
-        instructions[0x72] = self._mov_m_d  # MOV M,D
-        instructions[0x73] = self._mov_m_e  # MOV M,E
-        instructions[0x74] = self._mov_m_h  # MOV M,H
-        instructions[0x75] = self._mov_m_l  # MOV M,L
+        instructions[0x77] = cls._mov_m_a  # MOV M,A
+        instructions[0x70] = cls._mov_m_b  # MOV M,B
+        instructions[0x71] = cls._mov_m_c  # MOV M,C
+        instructions[0x72] = cls._mov_m_d  # MOV M,D
+        instructions[0x73] = cls._mov_m_e  # MOV M,E
+        instructions[0x74] = cls._mov_m_h  # MOV M,H
+        instructions[0x75] = cls._mov_m_l  # MOV M,L
         
         # Immediate load instructions
-        instructions[0x3E] = self._mvi_a   # MVI A,data
-        instructions[0x06] = self._mvi_b   # MVI B,data
-        instructions[0x0E] = self._mvi_c   # MVI C,data
-        instructions[0x16] = self._mvi_d   # MVI D,data
-        instructions[0x1E] = self._mvi_e   # MVI E,data
-        instructions[0x26] = self._mvi_h   # MVI H,data
-        instructions[0x2E] = self._mvi_l   # MVI L,data
-        instructions[0x36] = self._mvi_m   # MVI M,data
+        instructions[0x3E] = cls._mvi_a   # MVI A,data
+        instructions[0x06] = cls._mvi_b   # MVI B,data
+        instructions[0x0E] = cls._mvi_c   # MVI C,data
+        instructions[0x16] = cls._mvi_d   # MVI D,data
+        instructions[0x1E] = cls._mvi_e   # MVI E,data
+        instructions[0x26] = cls._mvi_h   # MVI H,data
+        instructions[0x2E] = cls._mvi_l   # MVI L,data
+        instructions[0x36] = cls._mvi_m   # MVI M,data
         
         # Load register pairs
-        instructions[0x01] = self._lxi_b   # LXI B,data16
-        instructions[0x11] = self._lxi_d   # LXI D,data16
-        instructions[0x21] = self._lxi_h   # LXI H,data16
-        instructions[0x31] = self._lxi_sp  # LXI SP,data16
+        instructions[0x01] = cls._lxi_b   # LXI B,data16
+        instructions[0x11] = cls._lxi_d   # LXI D,data16
+        instructions[0x21] = cls._lxi_h   # LXI H,data16
+        instructions[0x31] = cls._lxi_sp  # LXI SP,data16
         
         # Memory operations
-        instructions[0x3A] = self._lda     # LDA addr
-        instructions[0x32] = self._sta     # STA addr
-        instructions[0x2A] = self._lhld    # LHLD addr
-        instructions[0x22] = self._shld    # SHLD addr
+        instructions[0x3A] = cls._lda     # LDA addr
+        instructions[0x32] = cls._sta     # STA addr
+        instructions[0x2A] = cls._lhld    # LHLD addr
+        instructions[0x22] = cls._shld    # SHLD addr
         
         # Arithmetic Instructions
-        instructions[0x87] = self._add_a   # ADD A
-        instructions[0x80] = self._add_b   # ADD B
-        instructions[0x81] = self._add_c   # ADD C
-        instructions[0x82] = self._add_d   # ADD D
-        instructions[0x83] = self._add_e   # ADD E
-        instructions[0x84] = self._add_h   # ADD H
-        instructions[0x85] = self._add_l   # ADD L
-        instructions[0x86] = self._add_m   # ADD M
-        instructions[0xC6] = self._adi     # ADI data
+        instructions[0x87] = cls._add_a   # ADD A
+        instructions[0x80] = cls._add_b   # ADD B
+        instructions[0x81] = cls._add_c   # ADD C
+        instructions[0x82] = cls._add_d   # ADD D
+        instructions[0x83] = cls._add_e   # ADD E
+        instructions[0x84] = cls._add_h   # ADD H
+        instructions[0x85] = cls._add_l   # ADD L
+        instructions[0x86] = cls._add_m   # ADD M
+        instructions[0xC6] = cls._adi     # ADI data
         
-        instructions[0x8F] = self._adc_a   # ADC A
-        instructions[0x88] = self._adc_b   # ADC B
-        instructions[0x89] = self._adc_c   # ADC C
-        instructions[0x8A] = self._adc_d   # ADC D
-        instructions[0x8B] = self._adc_e   # ADC E
-        instructions[0x8C] = self._adc_h   # ADC H
-        instructions[0x8D] = self._adc_l   # ADC L
-        instructions[0x8E] = self._adc_m   # ADC M
+        instructions[0x8F] = cls._adc_a   # ADC A
+        instructions[0x88] = cls._adc_b   # ADC B
+        instructions[0x89] = cls._adc_c   # ADC C
+        instructions[0x8A] = cls._adc_d   # ADC D
+        instructions[0x8B] = cls._adc_e   # ADC E
+        instructions[0x8C] = cls._adc_h   # ADC H
+        instructions[0x8D] = cls._adc_l   # ADC L
+        instructions[0x8E] = cls._adc_m   # ADC M
         
-        instructions[0x97] = self._sub_a   # SUB A
-        instructions[0x90] = self._sub_b   # SUB B
-        instructions[0x91] = self._sub_c   # SUB C
-        instructions[0x92] = self._sub_d   # SUB D
-        instructions[0x93] = self._sub_e   # SUB E
-        instructions[0x94] = self._sub_h   # SUB H
-        instructions[0x95] = self._sub_l   # SUB L
-        instructions[0x96] = self._sub_m   # SUB M
+        instructions[0x97] = cls._sub_a   # SUB A
+        instructions[0x90] = cls._sub_b   # SUB B
+        instructions[0x91] = cls._sub_c   # SUB C
+        instructions[0x92] = cls._sub_d   # SUB D
+        instructions[0x93] = cls._sub_e   # SUB E
+        instructions[0x94] = cls._sub_h   # SUB H
+        instructions[0x95] = cls._sub_l   # SUB L
+        instructions[0x96] = cls._sub_m   # SUB M
         
-        instructions[0xD6] = self._sui     # SUI data
+        instructions[0xD6] = cls._sui     # SUI data
         
-        instructions[0x9F] = self._sbb_a   # SBB A
-        instructions[0x98] = self._sbb_b   # SBB B
-        instructions[0x99] = self._sbb_c   # SBB C
-        instructions[0x9A] = self._sbb_d   # SBB D
-        instructions[0x9B] = self._sbb_e   # SBB E
-        instructions[0x9C] = self._sbb_h   # SBB H
-        instructions[0x9D] = self._sbb_l   # SBB L
-        instructions[0x9E] = self._sbb_m   # SBB M
+        instructions[0x9F] = cls._sbb_a   # SBB A
+        instructions[0x98] = cls._sbb_b   # SBB B
+        instructions[0x99] = cls._sbb_c   # SBB C
+        instructions[0x9A] = cls._sbb_d   # SBB D
+        instructions[0x9B] = cls._sbb_e   # SBB E
+        instructions[0x9C] = cls._sbb_h   # SBB H
+        instructions[0x9D] = cls._sbb_l   # SBB L
+        instructions[0x9E] = cls._sbb_m   # SBB M
         
         # Logical Instructions
-        instructions[0xA7] = self._ana_a   # ANA A
-        instructions[0xA0] = self._ana_b   # ANA B
-        instructions[0xA1] = self._ana_c   # ANA C
-        instructions[0xA2] = self._ana_d   # ANA D
-        instructions[0xA3] = self._ana_e   # ANA E
-        instructions[0xA4] = self._ana_h   # ANA H
-        instructions[0xA5] = self._ana_l   # ANA L
-        instructions[0xA6] = self._ana_m   # ANA M
+        instructions[0xA7] = cls._ana_a   # ANA A
+        instructions[0xA0] = cls._ana_b   # ANA B
+        instructions[0xA1] = cls._ana_c   # ANA C
+        instructions[0xA2] = cls._ana_d   # ANA D
+        instructions[0xA3] = cls._ana_e   # ANA E
+        instructions[0xA4] = cls._ana_h   # ANA H
+        instructions[0xA5] = cls._ana_l   # ANA L
+        instructions[0xA6] = cls._ana_m   # ANA M
         
-        instructions[0xAF] = self._xra_a   # XRA A
-        instructions[0xA8] = self._xra_b   # XRA B
-        instructions[0xA9] = self._xra_c   # XRA C
-        instructions[0xAA] = self._xra_d   # XRA D
-        instructions[0xAB] = self._xra_e   # XRA E
-        instructions[0xAC] = self._xra_h   # XRA H
-        instructions[0xAD] = self._xra_l   # XRA L
-        instructions[0xAE] = self._xra_m   # XRA M
+        instructions[0xAF] = cls._xra_a   # XRA A
+        instructions[0xA8] = cls._xra_b   # XRA B
+        instructions[0xA9] = cls._xra_c   # XRA C
+        instructions[0xAA] = cls._xra_d   # XRA D
+        instructions[0xAB] = cls._xra_e   # XRA E
+        instructions[0xAC] = cls._xra_h   # XRA H
+        instructions[0xAD] = cls._xra_l   # XRA L
+        instructions[0xAE] = cls._xra_m   # XRA M
         
-        instructions[0xB7] = self._ora_a   # ORA A
-        instructions[0xB0] = self._ora_b   # ORA B
-        instructions[0xB1] = self._ora_c   # ORA C
-        instructions[0xB2] = self._ora_d   # ORA D
-        instructions[0xB3] = self._ora_e   # ORA E
-        instructions[0xB4] = self._ora_h   # ORA H
-        instructions[0xB5] = self._ora_l   # ORA L
-        instructions[0xB6] = self._ora_m   # ORA M
+        instructions[0xB7] = cls._ora_a   # ORA A
+        instructions[0xB0] = cls._ora_b   # ORA B
+        instructions[0xB1] = cls._ora_c   # ORA C
+        instructions[0xB2] = cls._ora_d   # ORA D
+        instructions[0xB3] = cls._ora_e   # ORA E
+        instructions[0xB4] = cls._ora_h   # ORA H
+        instructions[0xB5] = cls._ora_l   # ORA L
+        instructions[0xB6] = cls._ora_m   # ORA M
         
         # Increment/Decrement
-        instructions[0x3C] = self._inr_a   # INR A
-        instructions[0x04] = self._inr_b   # INR B
-        instructions[0x0C] = self._inr_c   # INR C
-        instructions[0x14] = self._inr_d   # INR D
-        instructions[0x1C] = self._inr_e   # INR E
-        instructions[0x24] = self._inr_h   # INR H
-        instructions[0x2C] = self._inr_l   # INR L
-        instructions[0x34] = self._inr_m   # INR M
+        instructions[0x3C] = cls._inr_a   # INR A
+        instructions[0x04] = cls._inr_b   # INR B
+        instructions[0x0C] = cls._inr_c   # INR C
+        instructions[0x14] = cls._inr_d   # INR D
+        instructions[0x1C] = cls._inr_e   # INR E
+        instructions[0x24] = cls._inr_h   # INR H
+        instructions[0x2C] = cls._inr_l   # INR L
+        instructions[0x34] = cls._inr_m   # INR M
         
-        instructions[0x03] = self._inx_b   # INX B
-        instructions[0x13] = self._inx_d   # INX D
-        instructions[0x23] = self._inx_h   # INX H
-        instructions[0x33] = self._inx_sp  # INX SP
+        instructions[0x03] = cls._inx_b   # INX B
+        instructions[0x13] = cls._inx_d   # INX D
+        instructions[0x23] = cls._inx_h   # INX H
+        instructions[0x33] = cls._inx_sp  # INX SP
         
-        instructions[0x3D] = self._dcr_a   # DCR A
-        instructions[0x05] = self._dcr_b   # DCR B
-        instructions[0x0D] = self._dcr_c   # DCR C
-        instructions[0x15] = self._dcr_d   # DCR D
-        instructions[0x1D] = self._dcr_e   # DCR E
-        instructions[0x25] = self._dcr_h   # DCR H
-        instructions[0x2D] = self._dcr_l   # DCR L
-        instructions[0x35] = self._dcr_m   # DCR M
+        instructions[0x3D] = cls._dcr_a   # DCR A
+        instructions[0x05] = cls._dcr_b   # DCR B
+        instructions[0x0D] = cls._dcr_c   # DCR C
+        instructions[0x15] = cls._dcr_d   # DCR D
+        instructions[0x1D] = cls._dcr_e   # DCR E
+        instructions[0x25] = cls._dcr_h   # DCR H
+        instructions[0x2D] = cls._dcr_l   # DCR L
+        instructions[0x35] = cls._dcr_m   # DCR M
 
-        instructions[0x0B] = self._dcx_b   # DCX B
-        instructions[0x1B] = self._dcx_d   # DCX B
-        instructions[0x2B] = self._dcx_h   # DCX B
-        instructions[0x3B] = self._dcx_sp   # DCX B
+        instructions[0x0B] = cls._dcx_b   # DCX B
+        instructions[0x1B] = cls._dcx_d   # DCX B
+        instructions[0x2B] = cls._dcx_h   # DCX B
+        instructions[0x3B] = cls._dcx_sp   # DCX B
         
         # Jump Instructions
-        instructions[0xC3] = self._jmp     # JMP addr
-        instructions[0xCA] = self._jz      # JZ addr
-        instructions[0xC2] = self._jnz     # JNZ addr
-        instructions[0xDA] = self._jc      # JC addr
-        instructions[0xD2] = self._jnc     # JNC addr
+        instructions[0xC3] = cls._jmp     # JMP addr
+        instructions[0xCA] = cls._jz      # JZ addr
+        instructions[0xC2] = cls._jnz     # JNZ addr
+        instructions[0xDA] = cls._jc      # JC addr
+        instructions[0xD2] = cls._jnc     # JNC addr
+        instructions[0xEA] = cls._jpe     # JPE addr
+        instructions[0xE2] = cls._jpo     # JPO addr
+        instructions[0xF2] = cls._jp      # JP addr
+        instructions[0xFA] = cls._jm      # JM addr
         
         # Call and Return
-        instructions[0xCD] = self._call    # CALL addr
-        instructions[0xC9] = self._ret     # RET
+        instructions[0xCD] = cls._call    # CALL addr
+        instructions[0xC9] = cls._ret     # RET
+        instructions[0xCC] = cls._cz     # CZ addr
+        instructions[0xC4] = cls._cnz    # CNZ addr
+        instructions[0xDC] = cls._cc     # CC addr
+        instructions[0xD4] = cls._cnc    # CNC addr
+        instructions[0xEC] = cls._cpe    # CPE addr
+        instructions[0xE4] = cls._cpo    # CPO addr
+        instructions[0xF4] = cls._cp     # CP addr
+        instructions[0xFC] = cls._cm     # CM addr
+        instructions[0xC8] = cls._rz     # RZ
+        instructions[0xC0] = cls._rnz    # RNZ
+        instructions[0xD8] = cls._rc     # RC
+        instructions[0xD0] = cls._rnc    # RNC
+        instructions[0xE8] = cls._rpe    # RPE
+        instructions[0xE0] = cls._rpo    # RPO
+        instructions[0xF0] = cls._rp     # RP
+        instructions[0xF8] = cls._rm     # RM
         
         # Stack Operations
-        instructions[0xC5] = self._push_b  # PUSH B
-        instructions[0xD5] = self._push_d  # PUSH D
-        instructions[0xE5] = self._push_h  # PUSH H
-        instructions[0xF5] = self._push_psw # PUSH PSW
+        instructions[0xC5] = cls._push_b  # PUSH B
+        instructions[0xD5] = cls._push_d  # PUSH D
+        instructions[0xE5] = cls._push_h  # PUSH H
+        instructions[0xF5] = cls._push_psw # PUSH PSW
         
-        instructions[0xC1] = self._pop_b   # POP B
-        instructions[0xD1] = self._pop_d   # POP D
-        instructions[0xE1] = self._pop_h   # POP H
-        instructions[0xF1] = self._pop_psw # POP PSW
+        instructions[0xC1] = cls._pop_b   # POP B
+        instructions[0xD1] = cls._pop_d   # POP D
+        instructions[0xE1] = cls._pop_h   # POP H
+        instructions[0xF1] = cls._pop_psw # POP PSW
         
         # Compare and rotate
-        instructions[0xBF] = self._cmp_a   # CMP A
-        instructions[0xB8] = self._cmp_b   # CMP B
-        instructions[0xB9] = self._cmp_c   # CMP C
-        instructions[0xBA] = self._cmp_d   # CMP D
-        instructions[0xBB] = self._cmp_e   # CMP E
-        instructions[0xBC] = self._cmp_h   # CMP H
-        instructions[0xBD] = self._cmp_l   # CMP L
-        instructions[0xBE] = self._cmp_m   # CMP M
-        instructions[0xFE] = self._cpi     # CPI data
+        instructions[0xBF] = cls._cmp_a   # CMP A
+        instructions[0xB8] = cls._cmp_b   # CMP B
+        instructions[0xB9] = cls._cmp_c   # CMP C
+        instructions[0xBA] = cls._cmp_d   # CMP D
+        instructions[0xBB] = cls._cmp_e   # CMP E
+        instructions[0xBC] = cls._cmp_h   # CMP H
+        instructions[0xBD] = cls._cmp_l   # CMP L
+        instructions[0xBE] = cls._cmp_m   # CMP M
+        instructions[0xFE] = cls._cpi     # CPI data
         
         # Control
-        instructions[0x76] = self._hlt     # HLT
-        instructions[0x00] = self._nop     # NOP
+        instructions[0x76] = cls._hlt     # HLT
+        instructions[0x00] = cls._nop     # NOP
         
         # Rotate Instructions
-        instructions[0x07] = self._rlc     # RLC
-        instructions[0x0F] = self._rrc     # RRC
-        instructions[0x17] = self._ral     # RAL
-        instructions[0x1F] = self._rar     # RAR
+        instructions[0x07] = cls._rlc     # RLC
+        instructions[0x0F] = cls._rrc     # RRC
+        instructions[0x17] = cls._ral     # RAL
+        instructions[0x1F] = cls._rar     # RAR
         
         # Special Instructions
-        instructions[0x27] = self._daa     # DAA
-        instructions[0x2F] = self._cma     # CMA
-        instructions[0x37] = self._stc     # STC
-        instructions[0x3F] = self._cmc     # CMC
-        instructions[0xFB] = self._ei      # EI
-        instructions[0xF3] = self._di      # DI
-        instructions[0x20] = self._rim     # RIM
-        instructions[0x30] = self._sim     # SIM
+        instructions[0x27] = cls._daa     # DAA
+        instructions[0x2F] = cls._cma     # CMA
+        instructions[0x37] = cls._stc     # STC
+        instructions[0x3F] = cls._cmc     # CMC
+        instructions[0xFB] = cls._ei      # EI
+        instructions[0xF3] = cls._di      # DI
+        instructions[0x20] = cls._rim     # RIM
+        instructions[0x30] = cls._sim     # SIM
+        for n in range(8):
+            instructions[0xC7 | (n << 3)] = cls._rst  # RST n
         
         return instructions
     
     # Instruction implementations
-    def _mov_a_a(self): self.registers['A'] = self.registers['A']
-    def _mov_a_b(self): self.registers['A'] = self.registers['B']
-    def _mov_a_c(self): self.registers['A'] = self.registers['C']
-    def _mov_a_d(self): self.registers['A'] = self.registers['D']
-    def _mov_a_e(self): self.registers['A'] = self.registers['E']
-    def _mov_a_h(self): self.registers['A'] = self.registers['H']
-    def _mov_a_l(self): self.registers['A'] = self.registers['L']
+    def _mov_a_a(self): self.A = self.A
+    def _mov_a_b(self): self.A = self.B
+    def _mov_a_c(self): self.A = self.C
+    def _mov_a_d(self): self.A = self.D
+    def _mov_a_e(self): self.A = self.E
+    def _mov_a_h(self): self.A = self.H
+    def _mov_a_l(self): self.A = self.L
     def _mov_a_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.registers['A'] = self.memory.read(addr)
-        logger.debug(f"MOV A,M: Reading from address {addr:04X}")
-    
-    def _mov_b_a(self): self.registers['B'] = self.registers['A']
-    def _mov_b_b(self): self.registers['B'] = self.registers['B']
-    def _mov_b_c(self): self.registers['B'] = self.registers['C']
-    def _mov_b_d(self): self.registers['B'] = self.registers['D']
-    def _mov_b_e(self): self.registers['B'] = self.registers['E']
-    def _mov_b_h(self): self.registers['B'] = self.registers['H']
-    def _mov_b_l(self): self.registers['B'] = self.registers['L']
+        addr = (self.H << 8) | self.L
+        self.A = self.memory.read(addr)
+    
+    def _mov_b_a(self): self.B = self.A
+    def _mov_b_b(self): self.B = self.B
+    def _mov_b_c(self): self.B = self.C
+    def _mov_b_d(self): self.B = self.D
+    def _mov_b_e(self): self.B = self.E
+    def _mov_b_h(self): self.B = self.H
+    def _mov_b_l(self): self.B = self.L
     def _mov_b_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.registers['B'] = self.memory.read(addr)
-        logger.debug(f"MOV B,M: Reading from address {addr:04X}")
-    
-    def _mov_c_a(self): self.registers['C'] = self.registers['A']
-    def _mov_c_b(self): self.registers['C'] = self.registers['B']
-    def _mov_c_c(self): self.registers['C'] = self.registers['C']
-    def _mov_c_d(self): self.registers['C'] = self.registers['D']
-    def _mov_c_e(self): self.registers['C'] = self.registers['E']
-    def _mov_c_h(self): self.registers['C'] = self.registers['H']
-    def _mov_c_l(self): self.registers['C'] = self.registers['L']
+        addr = (self.H << 8) | self.L
+        self.B = self.memory.read(addr)
+    
+    def _mov_c_a(self): self.C = self.A
+    def _mov_c_b(self): self.C = self.B
+    def _mov_c_c(self): self.C = self.C
+    def _mov_c_d(self): self.C = self.D
+    def _mov_c_e(self): self.C = self.E
+    def _mov_c_h(self): self.C = self.H
+    def _mov_c_l(self): self.C = self.L
     def _mov_c_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.registers['C'] = self.memory.read(addr)
-        logger.debug(f"MOV C,M: Reading from address {addr:04X}")
-    
-    def _mvi_a(self): self.registers['A'] = self.fetch_byte()
-    def _mvi_b(self): self.registers['B'] = self.fetch_byte()
-    def _mvi_c(self): self.registers['C'] = self.fetch_byte()
-    def _mvi_d(self): self.registers['D'] = self.fetch_byte()
-    def _mvi_e(self): self.registers['E'] = self.fetch_byte()
-    def _mvi_h(self): self.registers['H'] = self.fetch_byte()
-    def _mvi_l(self): self.registers['L'] = self.fetch_byte()
+        addr = (self.H << 8) | self.L
+        self.C = self.memory.read(addr)
+    
+    def _mvi_a(self): self.A = self.fetch_byte()
+    def _mvi_b(self): self.B = self.fetch_byte()
+    def _mvi_c(self): self.C = self.fetch_byte()
+    def _mvi_d(self): self.D = self.fetch_byte()
+    def _mvi_e(self): self.E = self.fetch_byte()
+    def _mvi_h(self): self.H = self.fetch_byte()
+    def _mvi_l(self): self.L = self.fetch_byte()
     def _mvi_m(self): 
-        addr = self.get_register_pair('H', 'L')
+        addr = (self.H << 8) | self.L
         self.memory.write(addr, self.fetch_byte())
     
-    def _lxi_b(self): self.set_register_pair('B', 'C', self.fetch_word())
-    def _lxi_d(self): self.set_register_pair('D', 'E', self.fetch_word())
-    def _lxi_h(self): self.set_register_pair('H', 'L', self.fetch_word())
+    def _lxi_b(self): self.C, self.B = self.fetch_byte(), self.fetch_byte()
+    def _lxi_d(self): self.E, self.D = self.fetch_byte(), self.fetch_byte()
+    def _lxi_h(self): self.L, self.H = self.fetch_byte(), self.fetch_byte()
     def _lxi_sp(self): self.SP = self.fetch_word()
     
     def _lda(self): 
         addr = self.fetch_word()
-        self.registers['A'] = self.memory.read(addr)
+        self.A = self.memory.read(addr)
     
     def _sta(self): 
         addr = self.fetch_word()
-        self.memory.write(addr, self.registers['A'])
+        self.memory.write(addr, self.A)
     
     def _lhld(self): 
         addr = self.fetch_word()
-        self.set_register_pair('H', 'L', self.memory.read_word(addr))
+        value = self.memory.read_word(addr)
+        self.H, self.L = value >> 8, value & 0xFF
     
     def _shld(self): 
         addr = self.fetch_word()
-        self.memory.write_word(addr, self.get_register_pair('H', 'L'))
+        self.memory.write_word(addr, (self.H << 8) | self.L)
     
     def _add_a(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['A'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.A)
     
     def _add_b(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['B'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.B)
     
     def _add_c(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.C)
     
     def _add_d(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['D'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.D)
     
     def _add_e(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['E'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.E)
     
     def _add_h(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['H'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.H)
     
     def _add_l(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['L'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.L)
     
     def _add_m(self): 
         """Add memory location pointed by HL to accumulator"""
-        addr = self.get_register_pair('H', 'L')
+        addr = (self.H << 8) | self.L
         memory_value = self.memory.read(addr)
-        result, flags = self.alu.add(self.registers['A'], memory_value)
-        self.registers['A'] = result
-        self.update_flags(flags)
-        logger.debug(f"ADD M: A={self.registers['A']:02X} + M[{addr:04X}]={memory_value:02X} = {result:02X}")
+        self.A, self.F = self.alu.add(self.A, memory_value)
     
     def _adi(self): 
         data = self.fetch_byte()
-        result, flags = self.alu.add(self.registers['A'], data)
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, data)
     
     def _adc_a(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['A'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.A, self.F & FLAG_C)
     
     def _adc_b(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['B'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.B, self.F & FLAG_C)
     
     def _adc_c(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['C'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.C, self.F & FLAG_C)
     
     def _adc_d(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['D'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.D, self.F & FLAG_C)
     
     def _adc_e(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['E'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.E, self.F & FLAG_C)
     
     def _adc_h(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['H'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.H, self.F & FLAG_C)
     
     def _adc_l(self): 
-        result, flags = self.alu.add(self.registers['A'], self.registers['L'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.add(self.A, self.L, self.F & FLAG_C)
     
     def _adc_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        result, flags = self.alu.add(self.registers['A'], self.memory.read(addr), self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        addr = (self.H << 8) | self.L
+        self.A, self.F = self.alu.add(self.A, self.memory.read(addr), self.F & FLAG_C)
     
     def _sub_a(self): 
-        result, flags = self.alu.sub(self.registers['A'], self.registers['A'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.A)
     
     def _sub_b(self): 
-        result, flags = self.alu.sub(self.registers['A'], self.registers['B'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.B)
     
     def _sub_c(self): 
-        result, flags = self.alu.sub(self.registers['A'], self.registers['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.C)
     
     def _sub_d(self): 
-        result, flags = self.alu.sub(self.registers['A'], self.registers['D'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.D)
     
     def _sub_e(self): 
-        result, flags = self.alu.sub(self.registers['A'], self.registers['E'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.E)
     
     def _sub_h(self): 
-        result, flags = self.alu.sub(self.registers['A'], self.registers['H'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.H)
     
     def _sub_l(self): 
-        result, flags = self.alu.sub(self.registers['A'], self.registers['L'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.L)
     
     def _sub_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        result, flags = self.alu.sub(self.registers['A'], self.memory.read(addr))
-        self.registers['A'] = result
-        self.update_flags(flags)
+        addr = (self.H << 8) | self.L
+        self.A, self.F = self.alu.sub(self.A, self.memory.read(addr))
     
     def _ana_a(self): 
-        result, flags = self.alu.logical_and(self.registers['A'], self.registers['A'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_and(self.A, self.A)
     
     def _ana_b(self): 
-        result, flags = self.alu.logical_and(self.registers['A'], self.registers['B'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_and(self.A, self.B)
     
     def _ana_c(self): 
-        result, flags = self.alu.logical_and(self.registers['A'], self.registers['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_and(self.A, self.C)
     
     def _ana_d(self): 
-        result, flags = self.alu.logical_and(self.registers['A'], self.registers['D'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_and(self.A, self.D)
     
     def _ana_e(self): 
-        result, flags = self.alu.logical_and(self.registers['A'], self.registers['E'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_and(self.A, self.E)
     
     def _ana_h(self): 
-        result, flags = self.alu.logical_and(self.registers['A'], self.registers['H'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_and(self.A, self.H)
     
     def _ana_l(self): 
-        result, flags = self.alu.logical_and(self.registers['A'], self.registers['L'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_and(self.A, self.L)
     
     def _ana_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        result, flags = self.alu.logical_and(self.registers['A'], self.memory.read(addr))
-        self.registers['A'] = result
-        self.update_flags(flags)
+        addr = (self.H << 8) | self.L
+        self.A, self.F = self.alu.logical_and(self.A, self.memory.read(addr))
     
     def _ora_a(self): 
-        result, flags = self.alu.logical_or(self.registers['A'], self.registers['A'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_or(self.A, self.A)
     
     def _ora_b(self): 
-        result, flags = self.alu.logical_or(self.registers['A'], self.registers['B'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_or(self.A, self.B)
     
     def _ora_c(self): 
-        result, flags = self.alu.logical_or(self.registers['A'], self.registers['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_or(self.A, self.C)
     
     def _ora_d(self): 
-        result, flags = self.alu.logical_or(self.registers['A'], self.registers['D'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_or(self.A, self.D)
     
     def _ora_e(self): 
-        result, flags = self.alu.logical_or(self.registers['A'], self.registers['E'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_or(self.A, self.E)
     
     def _ora_h(self): 
-        result, flags = self.alu.logical_or(self.registers['A'], self.registers['H'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_or(self.A, self.H)
     
     def _ora_l(self): 
-        result, flags = self.alu.logical_or(self.registers['A'], self.registers['L'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_or(self.A, self.L)
     
     def _ora_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        result, flags = self.alu.logical_or(self.registers['A'], self.memory.read(addr))
-        self.registers['A'] = result
-        self.update_flags(flags)
+        addr = (self.H << 8) | self.L
+        self.A, self.F = self.alu.logical_or(self.A, self.memory.read(addr))
     
     def _inr_a(self): 
-        result, flags = self.alu.add(self.registers['A'], 1)
-        self.registers['A'] = result
-        flags['C'] = self.flags['C']  # Preserve carry flag
-        self.update_flags(flags)
+        self.A, flags = self.alu.inr(self.A)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _inr_b(self): 
-        result, flags = self.alu.add(self.registers['B'], 1)
-        self.registers['B'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.B, flags = self.alu.inr(self.B)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _inr_c(self): 
-        result, flags = self.alu.add(self.registers['C'], 1)
-        self.registers['C'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.C, flags = self.alu.inr(self.C)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _inr_d(self): 
-        result, flags = self.alu.add(self.registers['D'], 1)
-        self.registers['D'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.D, flags = self.alu.inr(self.D)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _inr_e(self): 
-        result, flags = self.alu.add(self.registers['E'], 1)
-        self.registers['E'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.E, flags = self.alu.inr(self.E)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _inr_h(self): 
-        result, flags = self.alu.add(self.registers['H'], 1)
-        self.registers['H'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.H, flags = self.alu.inr(self.H)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _inr_l(self): 
-        result, flags = self.alu.add(self.registers['L'], 1)
-        self.registers['L'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.L, flags = self.alu.inr(self.L)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _inr_m(self): 
-        addr = self.get_register_pair('H', 'L')
+        addr = (self.H << 8) | self.L
         value = self.memory.read(addr)
-        result, flags = self.alu.add(value, 1)
+        result, flags = self.alu.inr(value)
         self.memory.write(addr, result)
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_a(self): 
-        result, flags = self.alu.sub(self.registers['A'], 1)
-        self.registers['A'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.A, flags = self.alu.dcr(self.A)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_b(self): 
-        result, flags = self.alu.sub(self.registers['B'], 1)
-        self.registers['B'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.B, flags = self.alu.dcr(self.B)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_c(self): 
-        result, flags = self.alu.sub(self.registers['C'], 1)
-        self.registers['C'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.C, flags = self.alu.dcr(self.C)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_d(self): 
-        result, flags = self.alu.sub(self.registers['D'], 1)
-        self.registers['D'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.D, flags = self.alu.dcr(self.D)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_e(self): 
-        result, flags = self.alu.sub(self.registers['E'], 1)
-        self.registers['E'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.E, flags = self.alu.dcr(self.E)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_h(self): 
-        result, flags = self.alu.sub(self.registers['H'], 1)
-        self.registers['H'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.H, flags = self.alu.dcr(self.H)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_l(self): 
-        result, flags = self.alu.sub(self.registers['L'], 1)
-        self.registers['L'] = result
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.L, flags = self.alu.dcr(self.L)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _dcr_m(self): 
-        addr = self.get_register_pair('H', 'L')
+        addr = (self.H << 8) | self.L
         value = self.memory.read(addr)
-        result, flags = self.alu.sub(value, 1)
+        result, flags = self.alu.dcr(value)
         self.memory.write(addr, result)
-        flags['C'] = self.flags['C']
-        self.update_flags(flags)
+        self.F = flags | (self.F & FLAG_C)  # Preserve carry flag
     
     def _jmp(self): 
         self.PC = self.fetch_word()
     
     def _jz(self): 
         addr = self.fetch_word()
-        if self.flags['Z']:
+        if self.F & FLAG_Z:
             self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
     
     def _jnz(self): 
         addr = self.fetch_word()
-        if not self.flags['Z']:
+        if not self.F & FLAG_Z:
             self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
     
     def _jc(self): 
         addr = self.fetch_word()
-        if self.flags['C']:
+        if self.F & FLAG_C:
             self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
     
     def _jnc(self): 
         addr = self.fetch_word()
-        if not self.flags['C']:
+        if not self.F & FLAG_C:
             self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
+    
+    def _jpe(self): 
+        addr = self.fetch_word()
+        if self.F & FLAG_P:
+            self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
+    
+    def _jpo(self): 
+        addr = self.fetch_word()
+        if not self.F & FLAG_P:
+            self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
+    
+    def _jp(self): 
+        addr = self.fetch_word()
+        if not self.F & FLAG_S:
+            self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
+    
+    def _jm(self): 
+        addr = self.fetch_word()
+        if self.F & FLAG_S:
+            self.PC = addr
+            self.cycles += JUMP_TAKEN_CYCLES
     
     def _call(self): 
         addr = self.fetch_word()
@@ -767,436 +1384,779 @@ class CPU:
     def _ret(self): 
         self.PC = self.pop_stack()
     
+    def _cz(self): 
+        addr = self.fetch_word()
+        if self.F & FLAG_Z:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _cnz(self): 
+        addr = self.fetch_word()
+        if not self.F & FLAG_Z:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _cc(self): 
+        addr = self.fetch_word()
+        if self.F & FLAG_C:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _cnc(self): 
+        addr = self.fetch_word()
+        if not self.F & FLAG_C:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _cpe(self): 
+        addr = self.fetch_word()
+        if self.F & FLAG_P:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _cpo(self): 
+        addr = self.fetch_word()
+        if not self.F & FLAG_P:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _cp(self): 
+        addr = self.fetch_word()
+        if not self.F & FLAG_S:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _cm(self): 
+        addr = self.fetch_word()
+        if self.F & FLAG_S:
+            self.push_stack(self.PC)
+            self.PC = addr
+            self.cycles += CALL_TAKEN_CYCLES
+    
+    def _rz(self): 
+        if self.F & FLAG_Z:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+    
+    def _rnz(self): 
+        if not self.F & FLAG_Z:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+    
+    def _rc(self): 
+        if self.F & FLAG_C:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+    
+    def _rnc(self): 
+        if not self.F & FLAG_C:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+    
+    def _rpe(self): 
+        if self.F & FLAG_P:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+    
+    def _rpo(self): 
+        if not self.F & FLAG_P:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+    
+    def _rp(self): 
+        if not self.F & FLAG_S:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+    
+    def _rm(self): 
+        if self.F & FLAG_S:
+            self.PC = self.pop_stack()
+            self.cycles += RETURN_TAKEN_CYCLES
+
+    
     def _push_b(self): 
-        self.push_stack(self.get_register_pair('B', 'C'))
+        self.push_stack((self.B << 8) | self.C)
     
     def _push_d(self): 
-        self.push_stack(self.get_register_pair('D', 'E'))
+        self.push_stack((self.D << 8) | self.E)
     
     def _push_h(self): 
-        self.push_stack(self.get_register_pair('H', 'L'))
+        self.push_stack((self.H << 8) | self.L)
     
     def _push_psw(self): 
-        psw = self.registers['A'] << 8
-        if self.flags['S']: psw |= 0x80
-        if self.flags['Z']: psw |= 0x40
-        if self.flags['AC']: psw |= 0x10
-        if self.flags['P']: psw |= 0x04
-        if self.flags['C']: psw |= 0x01
-        self.push_stack(psw)
+        self.push_stack((self.A << 8) | self.F)
     
     def _pop_b(self): 
-        self.set_register_pair('B', 'C', self.pop_stack())
+        value = self.pop_stack()
+        self.B, self.C = value >> 8, value & 0xFF
     
     def _pop_d(self): 
-        self.set_register_pair('D', 'E', self.pop_stack())
+        value = self.pop_stack()
+        self.D, self.E = value >> 8, value & 0xFF
     
     def _pop_h(self): 
-        self.set_register_pair('H', 'L', self.pop_stack())
+        value = self.pop_stack()
+        self.H, self.L = value >> 8, value & 0xFF
     
     def _pop_psw(self): 
         psw = self.pop_stack()
-        self.registers['A'] = (psw >> 8) & 0xFF
-        self.flags['S'] = bool(psw & 0x80)
-        self.flags['Z'] = bool(psw & 0x40)
-        self.flags['AC'] = bool(psw & 0x10)
-        self.flags['P'] = bool(psw & 0x04)
-        self.flags['C'] = bool(psw & 0x01)
+        self.A = psw >> 8
+        self.F = psw & PSW_FLAG_MASK
     
     def _cmp_a(self): 
-        _, flags = self.alu.sub(self.registers['A'], self.registers['A'])
-        self.update_flags(flags)
+        self.F = self.alu.sub(self.A, self.A)[1]
     
     def _cmp_b(self): 
-        _, flags = self.alu.sub(self.registers['A'], self.registers['B'])
-        self.update_flags(flags)
+        self.F = self.alu.sub(self.A, self.B)[1]
     
     def _cmp_c(self): 
         """Compare register C with accumulator"""
-        _, flags = self.alu.sub(self.registers['A'], self.registers['C'])
-        self.update_flags(flags)
-        logger.debug(f"CMP C: A={self.registers['A']:02X} - C={self.registers['C']:02X}")
+        self.F = self.alu.sub(self.A, self.C)[1]
     
     def _cmp_d(self): 
         """Compare register D with accumulator"""
-        _, flags = self.alu.sub(self.registers['A'], self.registers['D'])
-        self.update_flags(flags)
-        logger.debug(f"CMP D: A={self.registers['A']:02X} - D={self.registers['D']:02X}")
+        self.F = self.alu.sub(self.A, self.D)[1]
     
     def _cmp_e(self): 
         """Compare register E with accumulator"""
-        _, flags = self.alu.sub(self.registers['A'], self.registers['E'])
-        self.update_flags(flags)
-        logger.debug(f"CMP E: A={self.registers['A']:02X} - E={self.registers['E']:02X}")
+        self.F = self.alu.sub(self.A, self.E)[1]
     
     def _cmp_h(self): 
         """Compare register H with accumulator"""
-        _, flags = self.alu.sub(self.registers['A'], self.registers['H'])
-        self.update_flags(flags)
-        logger.debug(f"CMP H: A={self.registers['A']:02X} - H={self.registers['H']:02X}")
+        self.F = self.alu.sub(self.A, self.H)[1]
     
     def _cmp_l(self): 
         """Compare register L with accumulator"""
-        _, flags = self.alu.sub(self.registers['A'], self.registers['L'])
-        self.update_flags(flags)
-        logger.debug(f"CMP L: A={self.registers['A']:02X} - L={self.registers['L']:02X}")
+        self.F = self.alu.sub(self.A, self.L)[1]
     
     def _cmp_m(self): 
         """Compare memory location pointed by HL with accumulator"""
-        addr = self.get_register_pair('H', 'L')
+        addr = (self.H << 8) | self.L
         memory_value = self.memory.read(addr)
-        _, flags = self.alu.sub(self.registers['A'], memory_value)
-        self.update_flags(flags)
-        logger.debug(f"CMP M: A={self.registers['A']:02X} - M[{addr:04X}]={memory_value:02X}")
+        self.F = self.alu.sub(self.A, memory_value)[1]
     
     def _cpi(self): 
         data = self.fetch_byte()
-        _, flags = self.alu.sub(self.registers['A'], data)
-        self.update_flags(flags)
+        self.F = self.alu.sub(self.A, data)[1]
     
     def _hlt(self): 
         self.halted = True
     
+    def _illegal_opcode(self):
+        """Handler for every opcode without an implementation"""
+        pc = (self.PC - 1) & 0xFFFF
+        opcode = self.memory.memory[pc]
+        logger.error(f"Unknown opcode: {opcode:02X} at PC: {pc:04X}")
+        raise ValueError(f"Unknown opcode: {opcode:02X} at PC: {pc:04X}")
+    
     def _nop(self): 
         pass  # No operation
 
     def _mov_m_a(self):
         """Move accumulator to memory location pointed by HL"""
-        addr = self.get_register_pair('H', 'L')
-        self.memory.write(addr, self.registers['A'])
-        logger.debug(f"MOV M,A: Writing {self.registers['A']:02X} to address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.memory.write(addr, self.A)
 
     def _inx_b(self):
         """Increment BC register pair"""
-        value = self.get_register_pair('B', 'C')
+        value = (self.B << 8) | self.C
         value = (value + 1) & 0xFFFF
-        self.set_register_pair('B', 'C', value)
-        logger.debug(f"INX B: BC={value:04X}")
+        self.B, self.C = value >> 8, value & 0xFF
 
     def _inx_d(self):
         """Increment DE register pair"""
-        value = self.get_register_pair('D', 'E')
+        value = (self.D << 8) | self.E
         value = (value + 1) & 0xFFFF
-        self.set_register_pair('D', 'E', value)
-        logger.debug(f"INX D: DE={value:04X}")
+        self.D, self.E = value >> 8, value & 0xFF
 
     def _inx_h(self):
         """Increment HL register pair"""
-        value = self.get_register_pair('H', 'L')
+        value = (self.H << 8) | self.L
         value = (value + 1) & 0xFFFF
-        self.set_register_pair('H', 'L', value)
-        logger.debug(f"INX H: HL={value:04X}")
+        self.H, self.L = value >> 8, value & 0xFF
 
     def _inx_sp(self):
         """Increment SP"""
         value = self.SP
         value = (value + 1) & 0xFFFF
         self.SP = value
-        logger.debug(f"INX SP: SP={value:04X}")
 
     def _dcx_b(self):
         """Decrement BC register pair"""
-        value = self.get_register_pair('B', 'C')
+        value = (self.B << 8) | self.C
         value = (value - 1) & 0xFFFF
-        self.set_register_pair('B', 'C', value)
-        logger.debug(f"DCX B: BC={value:04X}")
+        self.B, self.C = value >> 8, value & 0xFF
 
     def _dcx_d(self):
         """Decrement DE register pair"""
-        value = self.get_register_pair('D', 'E')
+        value = (self.D << 8) | self.E
         value = (value - 1) & 0xFFFF
-        self.set_register_pair('D', 'E', value)
-        logger.debug(f"DCX B: BC={value:04X}")
+        self.D, self.E = value >> 8, value & 0xFF
 
     def _dcx_h(self):
         """Decrement HL register pair"""
-        value = self.get_register_pair('H', 'L')
+        value = (self.H << 8) | self.L
         value = (value - 1) & 0xFFFF
-        self.set_register_pair('H', 'L', value)
-        logger.debug(f"DCX B: BC={value:04X}")
+        self.H, self.L = value >> 8, value & 0xFF
 
     def _dcx_sp(self):
         """Decrement SP register"""
         value = self.SP
         value = (value - 1) & 0xFFFF
         self.SP = value
-        logger.debug(f"DCX B: BC={value:04X}")
 
     # Add D register MOV implementations
-    def _mov_d_a(self): self.registers['D'] = self.registers['A']
-    def _mov_d_b(self): self.registers['D'] = self.registers['B']
-    def _mov_d_c(self): self.registers['D'] = self.registers['C']
-    def _mov_d_d(self): self.registers['D'] = self.registers['D']
-    def _mov_d_e(self): self.registers['D'] = self.registers['E']
-    def _mov_d_h(self): self.registers['D'] = self.registers['H']
-    def _mov_d_l(self): self.registers['D'] = self.registers['L']
+    def _mov_d_a(self): self.D = self.A
+    def _mov_d_b(self): self.D = self.B
+    def _mov_d_c(self): self.D = self.C
+    def _mov_d_d(self): self.D = self.D
+    def _mov_d_e(self): self.D = self.E
+    def _mov_d_h(self): self.D = self.H
+    def _mov_d_l(self): self.D = self.L
     def _mov_d_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.registers['D'] = self.memory.read(addr)
-        logger.debug(f"MOV D,M: Reading from address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.D = self.memory.read(addr)
 
     # Add E register MOV implementations
-    def _mov_e_a(self): self.registers['E'] = self.registers['A']
-    def _mov_e_b(self): self.registers['E'] = self.registers['B']
-    def _mov_e_c(self): self.registers['E'] = self.registers['C']
-    def _mov_e_d(self): self.registers['E'] = self.registers['D']
-    def _mov_e_e(self): self.registers['E'] = self.registers['E']
-    def _mov_e_h(self): self.registers['E'] = self.registers['H']
-    def _mov_e_l(self): self.registers['E'] = self.registers['L']
+    def _mov_e_a(self): self.E = self.A
+    def _mov_e_b(self): self.E = self.B
+    def _mov_e_c(self): self.E = self.C
+    def _mov_e_d(self): self.E = self.D
+    def _mov_e_e(self): self.E = self.E
+    def _mov_e_h(self): self.E = self.H
+    def _mov_e_l(self): self.E = self.L
     def _mov_e_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.registers['E'] = self.memory.read(addr)
-        logger.debug(f"MOV E,M: Reading from address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.E = self.memory.read(addr)
 
     # Add H register MOV implementations
-    def _mov_h_a(self): self.registers['H'] = self.registers['A']
-    def _mov_h_b(self): self.registers['H'] = self.registers['B']
-    def _mov_h_c(self): self.registers['H'] = self.registers['C']
-    def _mov_h_d(self): self.registers['H'] = self.registers['D']
-    def _mov_h_e(self): self.registers['H'] = self.registers['E']
-    def _mov_h_h(self): self.registers['H'] = self.registers['H']
-    def _mov_h_l(self): self.registers['H'] = self.registers['L']
+    def _mov_h_a(self): self.H = self.A
+    def _mov_h_b(self): self.H = self.B
+    def _mov_h_c(self): self.H = self.C
+    def _mov_h_d(self): self.H = self.D
+    def _mov_h_e(self): self.H = self.E
+    def _mov_h_h(self): self.H = self.H
+    def _mov_h_l(self): self.H = self.L
     def _mov_h_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.registers['H'] = self.memory.read(addr)
-        logger.debug(f"MOV H,M: Reading from address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.H = self.memory.read(addr)
 
     # Add L register MOV implementations
-    def _mov_l_a(self): self.registers['L'] = self.registers['A']
-    def _mov_l_b(self): self.registers['L'] = self.registers['B']
-    def _mov_l_c(self): self.registers['L'] = self.registers['C']
-    def _mov_l_d(self): self.registers['L'] = self.registers['D']
-    def _mov_l_e(self): self.registers['L'] = self.registers['E']
-    def _mov_l_h(self): self.registers['L'] = self.registers['H']
-    def _mov_l_l(self): self.registers['L'] = self.registers['L']
+    def _mov_l_a(self): self.L = self.A
+    def _mov_l_b(self): self.L = self.B
+    def _mov_l_c(self): self.L = self.C
+    def _mov_l_d(self): self.L = self.D
+    def _mov_l_e(self): self.L = self.E
+    def _mov_l_h(self): self.L = self.H
+    def _mov_l_l(self): self.L = self.L
     def _mov_l_m(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.registers['L'] = self.memory.read(addr)
-        logger.debug(f"MOV L,M: Reading from address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.L = self.memory.read(addr)
 
     # Add M register MOV implementations
     def _mov_m_b(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.memory.write(addr, self.registers['B'])
+        addr = (self.H << 8) | self.L
+        self.memory.write(addr, self.B)
     def _mov_m_c(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.memory.write(addr, self.registers['C'])
+        addr = (self.H << 8) | self.L
+        self.memory.write(addr, self.C)
     def _mov_m_d(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.memory.write(addr, self.registers['D'])
+        addr = (self.H << 8) | self.L
+        self.memory.write(addr, self.D)
     def _mov_m_e(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.memory.write(addr, self.registers['E'])
-        logger.debug(f"MOV M,E: Writing {self.registers['E']:02X} to address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.memory.write(addr, self.E)
     def _mov_m_h(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.memory.write(addr, self.registers['H'])
-        logger.debug(f"MOV M,H: Writing {self.registers['H']:02X} to address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.memory.write(addr, self.H)
     def _mov_m_l(self): 
-        addr = self.get_register_pair('H', 'L')
-        self.memory.write(addr, self.registers['L'])
-        logger.debug(f"MOV M,L: Writing {self.registers['L']:02X} to address {addr:04X}")
+        addr = (self.H << 8) | self.L
+        self.memory.write(addr, self.L)
 
     def _sui(self):
         """Subtract immediate data from accumulator"""
         data = self.fetch_byte()
-        logger.debug(f"SUI: Fetching immediate value: {data:02X}")
-        result, flags = self.alu.sub(self.registers['A'], data)
-        self.registers['A'] = result
-        self.update_flags(flags)
-        logger.debug(f"SUI: A={self.registers['A']:02X} - {data:02X} = {result:02X}")
+        self.A, self.F = self.alu.sub(self.A, data)
     
     def _sbb_a(self):
         """Subtract accumulator with borrow from accumulator"""
-        result, flags = self.alu.sub(self.registers['A'], self.registers['A'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.A, self.F & FLAG_C)
     
     def _sbb_b(self):
         """Subtract register B with borrow from accumulator"""
-        result, flags = self.alu.sub(self.registers['A'], self.registers['B'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.B, self.F & FLAG_C)
     
     def _sbb_c(self):
         """Subtract register C with borrow from accumulator"""
-        result, flags = self.alu.sub(self.registers['A'], self.registers['C'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.C, self.F & FLAG_C)
     
     def _sbb_d(self):
         """Subtract register D with borrow from accumulator"""
-        result, flags = self.alu.sub(self.registers['A'], self.registers['D'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.D, self.F & FLAG_C)
     
     def _sbb_e(self):
         """Subtract register E with borrow from accumulator"""
-        result, flags = self.alu.sub(self.registers['A'], self.registers['E'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.E, self.F & FLAG_C)
     
     def _sbb_h(self):
         """Subtract register H with borrow from accumulator"""
-        result, flags = self.alu.sub(self.registers['A'], self.registers['H'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.H, self.F & FLAG_C)
     
     def _sbb_l(self):
         """Subtract register L with borrow from accumulator"""
-        result, flags = self.alu.sub(self.registers['A'], self.registers['L'], self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, self.L, self.F & FLAG_C)
     
     def _sbb_m(self):
         """Subtract memory with borrow from accumulator"""
-        addr = self.get_register_pair('H', 'L')
+        addr = (self.H << 8) | self.L
         memory_value = self.memory.read(addr)
-        result, flags = self.alu.sub(self.registers['A'], memory_value, self.flags['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.sub(self.A, memory_value, self.F & FLAG_C)
     
     def _xra_a(self):
         """Exclusive OR accumulator with accumulator"""
-        result, flags = self.alu.xor(self.registers['A'], self.registers['A'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, self.A)
     
     def _xra_b(self):
         """Exclusive OR register B with accumulator"""
-        result, flags = self.alu.xor(self.registers['A'], self.registers['B'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, self.B)
     
     def _xra_c(self):
         """Exclusive OR register C with accumulator"""
-        result, flags = self.alu.xor(self.registers['A'], self.registers['C'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, self.C)
     
     def _xra_d(self):
         """Exclusive OR register D with accumulator"""
-        result, flags = self.alu.xor(self.registers['A'], self.registers['D'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, self.D)
     
     def _xra_e(self):
         """Exclusive OR register E with accumulator"""
-        result, flags = self.alu.xor(self.registers['A'], self.registers['E'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, self.E)
     
     def _xra_h(self):
         """Exclusive OR register H with accumulator"""
-        result, flags = self.alu.xor(self.registers['A'], self.registers['H'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, self.H)
     
     def _xra_l(self):
         """Exclusive OR register L with accumulator"""
-        result, flags = self.alu.xor(self.registers['A'], self.registers['L'])
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, self.L)
     
     def _xra_m(self):
         """Exclusive OR memory with accumulator"""
-        addr = self.get_register_pair('H', 'L')
+        addr = (self.H << 8) | self.L
         memory_value = self.memory.read(addr)
-        result, flags = self.alu.xor(self.registers['A'], memory_value)
-        self.registers['A'] = result
-        self.update_flags(flags)
+        self.A, self.F = self.alu.logical_xor(self.A, memory_value)
     
     def _rlc(self):
         """Rotate accumulator left"""
-        value = self.registers['A']
-        self.flags['C'] = bool(value & 0x80)
+        value = self.A
+        self.F = (self.F & ~FLAG_C) | (value >> 7)
         value = ((value << 1) | (value >> 7)) & 0xFF
-        self.registers['A'] = value
-        logger.debug(f"RLC: A={value:02X}")
+        self.A = value
     
     def _rrc(self):
         """Rotate accumulator right"""
-        value = self.registers['A']
-        self.flags['C'] = bool(value & 0x01)
+        value = self.A
+        self.F = (self.F & ~FLAG_C) | (value & 0x01)
         value = ((value >> 1) | (value << 7)) & 0xFF
-        self.registers['A'] = value
-        logger.debug(f"RRC: A={value:02X}")
+        self.A = value
     
     def _ral(self):
         """Rotate accumulator left through carry"""
-        value = self.registers['A']
-        old_carry = self.flags['C']
-        self.flags['C'] = bool(value & 0x80)
-        value = ((value << 1) | int(old_carry)) & 0xFF
-        self.registers['A'] = value
-        logger.debug(f"RAL: A={value:02X}")
+        value = self.A
+        old_carry = self.F & FLAG_C
+        self.F = (self.F & ~FLAG_C) | (value >> 7)
+        value = ((value << 1) | old_carry) & 0xFF
+        self.A = value
     
     def _rar(self):
         """Rotate accumulator right through carry"""
-        value = self.registers['A']
-        old_carry = self.flags['C']
-        self.flags['C'] = bool(value & 0x01)
-        value = ((value >> 1) | (int(old_carry) << 7)) & 0xFF
-        self.registers['A'] = value
-        logger.debug(f"RAR: A={value:02X}")
+        value = self.A
+        old_carry = self.F & FLAG_C
+        self.F = (self.F & ~FLAG_C) | (value & 0x01)
+        value = ((value >> 1) | (old_carry << 7)) & 0xFF
+        self.A = value
     
     def _daa(self):
         """Decimal adjust accumulator"""
-        value = self.registers['A']
+        value = self.A
         lsb = value & 0x0F
         msb = (value >> 4) & 0x0F
         
-        if lsb > 9 or self.flags['AC']:
+        flags = self.F
+        
+        if lsb > 9 or flags & FLAG_AC:
             value += 6
-            self.flags['AC'] = True
+            flags |= FLAG_AC
         
-        if msb > 9 or self.flags['C']:
+        if msb > 9 or flags & FLAG_C:
             value += 0x60
-            self.flags['C'] = True
+            flags |= FLAG_C
         
         value &= 0xFF
-        self.registers['A'] = value
+        self.A = value
         
         # Update other flags
-        self.flags['Z'] = (value == 0)
-        self.flags['S'] = bool(value & 0x80)
-        self.flags['P'] = not bool(sum(1 for b in bin(value)[2:].zfill(8) if b == '1') % 2)
-        logger.debug(f"DAA: A={value:02X}")
+        self.F = (flags & (FLAG_AC | FLAG_C)) | SZP[value]
     
     def _cma(self):
         """Complement accumulator"""
-        self.registers['A'] = ~self.registers['A'] & 0xFF
-        logger.debug(f"CMA: A={self.registers['A']:02X}")
+        self.A = ~self.A & 0xFF
     
     def _stc(self):
         """Set carry flag"""
-        self.flags['C'] = True
-        logger.debug("STC: Carry flag set")
+        self.F |= FLAG_C
     
     def _cmc(self):
         """Complement carry flag"""
-        self.flags['C'] = not self.flags['C']
-        logger.debug(f"CMC: Carry flag = {self.flags['C']}")
+        self.F ^= FLAG_C
     
     def _ei(self):
-        """Enable interrupts"""
+        """Enable interrupts once the next instruction has run"""
         self.interrupt_enabled = True
-        logger.debug("EI: Interrupts enabled")
+        if self.interrupt_pending:
+            # Every instruction takes at least 4 T-states, so this is the boundary after the next one
+            self.interrupt_due = min(self.interrupt_due, self.cycles + 1)
     
     def _di(self):
         """Disable interrupts"""
         self.interrupt_enabled = False
-        logger.debug("DI: Interrupts disabled")
     
     def _rim(self):
-        """Read interrupt mask"""
-        # In a real 8085, this would read the interrupt mask and pending interrupts
-        # For simplicity, we'll just set the accumulator to 0
-        self.registers['A'] = 0
-        logger.debug("RIM: Read interrupt mask")
+        """Read interrupt masks (bits 0-2), interrupt enable (3), pending RST 5.5-7.5 (4-6) and SID (7)"""
+        self.A = ((self.interrupt_mask & MASK_ALL) | (self.interrupt_enabled << 3)
+                  | (self.interrupt_pending & 0x70) | (self.serial_input << 7))
     
     def _sim(self):
-        """Set interrupt mask"""
-        # In a real 8085, this would set the interrupt mask
-        # For simplicity, we'll just ignore the value
-        logger.debug("SIM: Set interrupt mask")
\ No newline at end of file
+        """Set interrupt masks if bit 3 is set, reset RST 7.5 if bit 4 is, and SOD to bit 7 if bit 6 is"""
+        a = self.A
+        if a & 0x08:
+            self.interrupt_mask = (self.interrupt_mask & ~MASK_ALL) | (a & MASK_ALL)
+        if a & 0x10:
+            self.interrupt_pending &= ~PENDING_RST_7_5
+        if a & 0x40:
+            self.interrupt_mask = (self.interrupt_mask & ~SERIAL_OUTPUT) | (a & SERIAL_OUTPUT)
+        if self.interrupt_pending:
+            self.interrupt_due = min(self.interrupt_due, self.cycles)
+    
+    def _rst(self):
+        """RST n: call the restart address 8 * n"""
+        opcode = self.memory.memory[(self.PC - 1) & 0xFFFF]
+        self.push_stack(self.PC)
+        self.PC = opcode & 0x38
+
+
+# Opcode tables are built once and shared by every CPU instance
+CPU.instruction_set = CPU._build_instruction_set()
+# run() uses a copy whose HLT leaves the loop by exception, so the
+# per-instruction path carries no halted check
+CPU.run_instruction_set = list(CPU.instruction_set)
+CPU.run_instruction_set[0x76] = CPU._hlt_signal
+
+
+def _hl(cpu: CPU) -> int:
+    return (cpu.H << 8) | cpu.L
+
+def _m(cpu: CPU) -> int:
+    return cpu.memory.memory[(cpu.H << 8) | cpu.L]
+
+# Trace-level messages per opcode: (before, after). "before" receives the CPU
+# once the opcode has been fetched; "after" also receives A as it was before
+# the instruction.
+TRACE_MESSAGES = {
+    0x7E: (lambda cpu: f"MOV A,M: Reading from address {_hl(cpu):04X}", None),
+    0x46: (lambda cpu: f"MOV B,M: Reading from address {_hl(cpu):04X}", None),
+    0x4E: (lambda cpu: f"MOV C,M: Reading from address {_hl(cpu):04X}", None),
+    0x56: (lambda cpu: f"MOV D,M: Reading from address {_hl(cpu):04X}", None),
+    0x5E: (lambda cpu: f"MOV E,M: Reading from address {_hl(cpu):04X}", None),
+    0x66: (lambda cpu: f"MOV H,M: Reading from address {_hl(cpu):04X}", None),
+    0x6E: (lambda cpu: f"MOV L,M: Reading from address {_hl(cpu):04X}", None),
+    0x77: (None, lambda cpu, a: f"MOV M,A: Writing {cpu.A:02X} to address {_hl(cpu):04X}"),
+    0x73: (None, lambda cpu, a: f"MOV M,E: Writing {cpu.E:02X} to address {_hl(cpu):04X}"),
+    0x74: (None, lambda cpu, a: f"MOV M,H: Writing {cpu.H:02X} to address {_hl(cpu):04X}"),
+    0x75: (None, lambda cpu, a: f"MOV M,L: Writing {cpu.L:02X} to address {_hl(cpu):04X}"),
+    0x86: (None, lambda cpu, a: f"ADD M: A={a:02X} + M[{_hl(cpu):04X}]={_m(cpu):02X} = {cpu.A:02X}"),
+    0xB9: (None, lambda cpu, a: f"CMP C: A={cpu.A:02X} - C={cpu.C:02X}"),
+    0xBA: (None, lambda cpu, a: f"CMP D: A={cpu.A:02X} - D={cpu.D:02X}"),
+    0xBB: (None, lambda cpu, a: f"CMP E: A={cpu.A:02X} - E={cpu.E:02X}"),
+    0xBC: (None, lambda cpu, a: f"CMP H: A={cpu.A:02X} - H={cpu.H:02X}"),
+    0xBD: (None, lambda cpu, a: f"CMP L: A={cpu.A:02X} - L={cpu.L:02X}"),
+    0xBE: (None, lambda cpu, a: f"CMP M: A={cpu.A:02X} - M[{_hl(cpu):04X}]={_m(cpu):02X}"),
+    0x03: (None, lambda cpu, a: f"INX B: BC={(cpu.B << 8) | cpu.C:04X}"),
+    0x13: (None, lambda cpu, a: f"INX D: DE={(cpu.D << 8) | cpu.E:04X}"),
+    0x23: (None, lambda cpu, a: f"INX H: HL={_hl(cpu):04X}"),
+    0x33: (None, lambda cpu, a: f"INX SP: SP={cpu.SP:04X}"),
+    0x0B: (None, lambda cpu, a: f"DCX B: BC={(cpu.B << 8) | cpu.C:04X}"),
+    0x1B: (None, lambda cpu, a: f"DCX D: DE={(cpu.D << 8) | cpu.E:04X}"),
+    0x2B: (None, lambda cpu, a: f"DCX H: HL={_hl(cpu):04X}"),
+    0x3B: (None, lambda cpu, a: f"DCX SP: SP={cpu.SP:04X}"),
+    0xD6: (lambda cpu: f"SUI: Fetching immediate value: {cpu.memory.memory[cpu.PC]:02X}",
+           lambda cpu, a: f"SUI: A={a:02X} - {cpu.memory.memory[(cpu.PC - 1) & 0xFFFF]:02X} = {cpu.A:02X}"),
+    0x07: (None, lambda cpu, a: f"RLC: A={cpu.A:02X}"),
+    0x0F: (None, lambda cpu, a: f"RRC: A={cpu.A:02X}"),
+    0x17: (None, lambda cpu, a: f"RAL: A={cpu.A:02X}"),
+    0x1F: (None, lambda cpu, a: f"RAR: A={cpu.A:02X}"),
+    0x27: (None, lambda cpu, a: f"DAA: A={cpu.A:02X}"),
+    0x2F: (None, lambda cpu, a: f"CMA: A={cpu.A:02X}"),
+    0x37: (None, lambda cpu, a: "STC: Carry flag set"),
+    0x3F: (None, lambda cpu, a: f"CMC: Carry flag = {bool(cpu.F & FLAG_C)}"),
+    0xFB: (None, lambda cpu, a: "EI: Interrupts enabled"),
+    0xF3: (None, lambda cpu, a: "DI: Interrupts disabled"),
+    0x20: (None, lambda cpu, a: f"RIM: A={cpu.A:02X}"),
+    0x30: (None, lambda cpu, a: f"SIM: Interrupt mask {cpu.interrupt_mask & 0x07:03b}"),
+}
+
+def _traced(opcode: int, handler):
+    """Wrap a handler with the trace-level debug output for its opcode"""
+    before, after = TRACE_MESSAGES.get(opcode, (None, None))
+    def traced(cpu: CPU):
+        logger.debug(f"Executing instruction at PC={(cpu.PC - 1) & 0xFFFF:04X}, Opcode={opcode:02X}")
+        a = cpu.A
+        if before:
+            logger.debug(before(cpu))
+        handler(cpu)
+        if after:
+            logger.debug(after(cpu, a))
+    return traced
+
+# Logging variants of both tables, installed by set_instrumentation('trace')
+CPU.trace_instruction_set = [_traced(op, handler) for op, handler in enumerate(CPU.instruction_set)]
+CPU.trace_run_instruction_set = [_traced(op, handler) for op, handler in enumerate(CPU.run_instruction_set)]
+
+
+# Superinstructions: instruction pairs that run() dispatches as one handler when
+# the second opcode follows the first. The first opcode's handler checks the next
+# byte and falls back to the plain handler when it does not match.
+REGISTER_MNEMONICS = ('B', 'C', 'D', 'E', 'H', 'L', 'M', 'A')
+CONDITION_MNEMONICS = ('NZ', 'Z', 'NC', 'C', 'PO', 'PE', 'P', 'M')
+# Whether Jcc/Ccc/Rcc condition n (bits 3-5 of the opcode) holds, indexed by the flag byte
+CONDITION_TAKEN = tuple(
+    bytes(bool(flags & (FLAG_Z, FLAG_C, FLAG_P, FLAG_S)[code >> 1]) == bool(code & 1) for flags in range(256))
+    for code in range(8)
+)
+JCC_TAKEN = CYCLES[0xC2] + JUMP_TAKEN_CYCLES
+
+FUSIONS: List[str] = []
+
+def _fusion(name: str) -> int:
+    """Register a superinstruction for fusion_stats() and return its counter index"""
+    FUSIONS.append(name)
+    return len(FUSIONS) - 1
+
+def _fuse_dcr_jnz(register: str, plain):
+    """DCR r; JNZ addr, fast-forwarding the countdown loop 'loop: DCR r; JNZ loop'"""
+    index = _fusion(f"DCR {register}; JNZ")
+    dcr = 0x05 | (REGISTER_MNEMONICS.index(register) << 3)
+    iteration = CYCLES[dcr] + JCC_TAKEN
+    def fused(cpu: CPU):
+        pc = cpu.PC
+        memory = cpu.memory.memory
+        if memory[pc] != 0xC2 or pc > 0xFFFC:
+            return plain(cpu)
+        value = (getattr(cpu, register) - 1) & 0xFF
+        cpu.fusion_counts[index] += 1
+        if not value:
+            cpu.PC = pc + 3
+            cpu.cycles += CYCLES[0xC2]
+        else:
+            target = memory[pc + 1] | (memory[pc + 2] << 8)
+            cpu.PC = target
+            cpu.cycles += JCC_TAKEN
+            if target == pc - 1 and cpu.fast_forward_budget > 1:
+                # Run the remaining iterations at once, as far as the step budget allows
+                skip = min(value, cpu.fast_forward_budget >> 1)
+                value -= skip
+                cpu.fast_forward_budget -= 2 * skip
+                cpu.fast_forward_steps += 2 * skip
+                cpu.cycles += skip * iteration
+                if not value:
+                    cpu.PC = pc + 3
+                    cpu.cycles -= JUMP_TAKEN_CYCLES
+                else:
+                    setattr(cpu, register, value)
+                    cpu.F = DCR_FLAGS[value] | (cpu.F & FLAG_C)
+                    raise _BudgetSpent()
+        setattr(cpu, register, value)
+        cpu.F = DCR_FLAGS[value] | (cpu.F & FLAG_C)
+    return fused
+
+def _fuse_compare_jump(mnemonic: str, operand, length: int, plain):
+    """CMP r, CMP M or CPI data followed by any Jcc; operand(cpu, memory, pc) reads the value"""
+    base = len(FUSIONS)
+    for condition in CONDITION_MNEMONICS:
+        _fusion(f"{mnemonic}; J{condition}")
+    def fused(cpu: CPU):
+        pc = cpu.PC
+        memory = cpu.memory.memory
+        at = pc + length - 1  # Address of the jump
+        if at > 0xFFFC:
+            return plain(cpu)
+        opcode = memory[at]
+        if opcode & 0xC7 != 0xC2:
+            return plain(cpu)
+        a = cpu.A
+        value = operand(cpu, memory, pc)
+        result = (a - value) & 0x1FF
+        flags = cpu.F = SZPC[result] | ((a ^ value ^ result) & FLAG_AC)
+        code = (opcode >> 3) & 7
+        cpu.fusion_counts[base + code] += 1
+        if CONDITION_TAKEN[code][flags]:
+            cpu.PC = memory[at + 1] | (memory[at + 2] << 8)
+            cpu.cycles += JCC_TAKEN
+        else:
+            cpu.PC = at + 3
+            cpu.cycles += CYCLES[0xC2]
+    return fused
+
+def _fuse_mov_a_m_inx_h(plain):
+    """MOV A,M; INX H"""
+    index = _fusion("MOV A,M; INX H")
+    def fused(cpu: CPU):
+        pc = cpu.PC
+        memory = cpu.memory.memory
+        if memory[pc] != 0x23:
+            if not _fast_forward_poll(cpu, memory, pc - 1, pc, memory[(cpu.H << 8) | cpu.L], CYCLES[0x7E]):
+                plain(cpu)
+            return
+        hl = (cpu.H << 8) | cpu.L
+        cpu.A = memory[hl]
+        hl = (hl + 1) & 0xFFFF
+        cpu.H, cpu.L = hl >> 8, hl & 0xFF
+        cpu.fusion_counts[index] += 1
+        cpu.PC = (pc + 1) & 0xFFFF
+        cpu.cycles += CYCLES[0x23]
+    return fused
+
+def _fuse_inx_h_dcr(plain):
+    """INX H; DCR r (any register but M)"""
+    base = len(FUSIONS)
+    for register in REGISTER_MNEMONICS:
+        _fusion(f"INX H; DCR {register}")
+    def fused(cpu: CPU):
+        pc = cpu.PC
+        memory = cpu.memory.memory
+        opcode = memory[pc]
+        if opcode & 0xC7 != 0x05 or opcode == 0x35:
+            return plain(cpu)
+        hl = (((cpu.H << 8) | cpu.L) + 1) & 0xFFFF
+        cpu.H, cpu.L = hl >> 8, hl & 0xFF
+        field = opcode >> 3
+        register = REGISTER_MNEMONICS[field]
+        value = (getattr(cpu, register) - 1) & 0xFF
+        setattr(cpu, register, value)
+        cpu.F = DCR_FLAGS[value] | (cpu.F & FLAG_C)
+        cpu.fusion_counts[base + field] += 1
+        cpu.PC = (pc + 1) & 0xFFFF
+        cpu.cycles += CYCLES[opcode]
+    return fused
+
+def _fuse_dcx_delay(pair: int, plain):
+    """Fast-forward the 16-bit delay loop 'loop: DCX rp; MOV A,x; ORA y; JNZ loop' (x, y the pair halves)"""
+    high, low = (('B', 'C'), ('D', 'E'), ('H', 'L'))[pair]
+    fields = {REGISTER_MNEMONICS.index(high), REGISTER_MNEMONICS.index(low)}
+    dcx = 0x0B | (pair << 4)
+    iteration = CYCLES[dcx] + CYCLES[0x78] + CYCLES[0xB0] + JCC_TAKEN
+    def fused(cpu: CPU):
+        pc = cpu.PC
+        memory = cpu.memory.memory
+        if pc > 0xFFFA:
+            return plain(cpu)
+        mov, ora = memory[pc], memory[pc + 1]
+        if (mov & 0xF8 != 0x78 or ora & 0xF8 != 0xB0 or {mov & 7, ora & 7} != fields
+                or memory[pc + 2] != 0xC2 or memory[pc + 3] | (memory[pc + 4] << 8) != pc - 1):
+            return plain(cpu)
+        value = (getattr(cpu, high) << 8) | getattr(cpu, low)
+        iterations = min((cpu.fast_forward_budget + 1) >> 2, value or 0x10000)
+        if not iterations:
+            return plain(cpu)
+        value = (value - iterations) & 0xFFFF
+        setattr(cpu, high, value >> 8)
+        setattr(cpu, low, value & 0xFF)
+        cpu.A = (value >> 8) | (value & 0xFF)
+        cpu.F = SZP[cpu.A]
+        steps = 4 * iterations - 1
+        cpu.fast_forward_budget -= steps
+        cpu.fast_forward_steps += steps
+        cpu.cycles += iterations * iteration - CYCLES[dcx]
+        if value:
+            cpu.PC = pc - 1
+            raise _BudgetSpent()
+        cpu.PC = pc + 5
+        cpu.cycles -= JUMP_TAKEN_CYCLES
+    return fused
+
+def _fast_forward_poll(cpu: CPU, memory: bytearray, start: int, at: int, value: int, load_cycles: int) -> bool:
+    """Fast-forward 'start: LDA addr or MOV A,M; ANA A, ORA A or CPI data; Jcc start'
+    
+    Nothing but the CPU changes memory, so a poll whose branch is taken once
+    spins until the step budget runs out: whole iterations are skipped, the loop
+    is left at its start and _BudgetSpent ends the chunk. Returns False when the
+    code is not such a loop.
+    """
+    test = memory[at]
+    if test == 0xA7 or test == 0xB7:  # ANA A / ORA A
+        flags = SZP[value] | (FLAG_AC if test == 0xA7 else 0)
+        jump = at + 1
+    elif test == 0xFE and at < 0xFFFF:  # CPI data
+        data = memory[at + 1]
+        result = (value - data) & 0x1FF
+        flags = SZPC[result] | ((value ^ data ^ result) & FLAG_AC)
+        jump = at + 2
+    else:
+        return False
+    if jump > 0xFFFC or memory[jump] & 0xC7 != 0xC2 or memory[jump + 1] | (memory[jump + 2] << 8) != start:
+        return False
+    if not CONDITION_TAKEN[(memory[jump] >> 3) & 7][flags]:
+        return False
+    iterations = (cpu.fast_forward_budget + 1) // 3
+    if not iterations:
+        return False
+    steps = 3 * iterations - 1
+    cpu.fast_forward_budget -= steps
+    cpu.fast_forward_steps += steps
+    cpu.A, cpu.F, cpu.PC = value, flags, start
+    cpu.cycles += iterations * (load_cycles + CYCLES[test] + JCC_TAKEN) - load_cycles
+    raise _BudgetSpent()
+
+def _fuse_lda_poll(plain):
+    """LDA addr, fast-forwarding polls of an unchanging memory flag"""
+    def fused(cpu: CPU):
+        pc = cpu.PC
+        memory = cpu.memory.memory
+        if pc > 0xFFFD or not _fast_forward_poll(cpu, memory, pc - 1, pc + 2,
+                                                 memory[memory[pc] | (memory[pc + 1] << 8)], CYCLES[0x3A]):
+            plain(cpu)
+    return fused
+
+def _register_operand(register: str):
+    return lambda cpu, memory, pc: getattr(cpu, register)
+
+def _build_fused_instruction_set() -> List[callable]:
+    """run_instruction_set with the first opcode of each superinstruction replaced"""
+    instructions = list(CPU.run_instruction_set)
+    for field, register in enumerate(REGISTER_MNEMONICS):
+        if register == 'M':
+            continue
+        dcr = 0x05 | (field << 3)
+        instructions[dcr] = _fuse_dcr_jnz(register, instructions[dcr])
+        cmp = 0xB8 | field
+        instructions[cmp] = _fuse_compare_jump(f"CMP {register}", _register_operand(register), 1, instructions[cmp])
+    instructions[0xBE] = _fuse_compare_jump(
+        "CMP M", lambda cpu, memory, pc: memory[(cpu.H << 8) | cpu.L], 1, instructions[0xBE])
+    instructions[0xFE] = _fuse_compare_jump("CPI", lambda cpu, memory, pc: memory[pc], 2, instructions[0xFE])
+    instructions[0x7E] = _fuse_mov_a_m_inx_h(instructions[0x7E])
+    instructions[0x23] = _fuse_inx_h_dcr(instructions[0x23])
+    for pair in range(3):
+        dcx = 0x0B | (pair << 4)
+        instructions[dcx] = _fuse_dcx_delay(pair, instructions[dcx])
+    instructions[0x3A] = _fuse_lda_poll(instructions[0x3A])
+    return instructions
+
+# Table used by run()'s tight loop below the trace level
+CPU.fused_run_instruction_set = _build_fused_instruction_set()
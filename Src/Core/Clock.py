@@ -0,0 +1,138 @@
+import time
+from typing import Any, Callable, Dict, Optional
+from Src.Core.CPU import CPU, STOP_HALT, STOP_BREAKPOINT, STOP_WATCHPOINT, STOP_STEP_LIMIT, STOP_CYCLE_LIMIT
+from Src.Utils.Logger import logger, INSTRUMENT_OFF
+
+# Clock of the common 8085 trainer boards (6.144 MHz crystal divided by two)
+DEFAULT_CLOCK_HZ = 3_072_000
+# Wall time covered by one batch of instructions when throttled
+DEFAULT_SLICE_SECONDS = 0.01
+# Instructions per batch at max speed, so stop requests are still seen quickly
+MAX_SPEED_SLICE_STEPS = 50_000
+# A throttled run that falls this far behind restarts its schedule instead of bursting
+MAX_LAG_SECONDS = 0.25
+
+# Reason reported when should_continue() asks the run to stop
+STOP_REQUESTED = 'stopped'
+
+SPEED_MAX = None       # Run as fast as the host allows
+SPEED_REAL_TIME = 1.0  # Emulated clock rate
+
+
+def parse_speed(text: str) -> Optional[float]:
+    """Parse 'max', 'realtime' or an N× multiplier such as '2x' or '0.5'"""
+    text = text.strip().lower()
+    if text == 'max':
+        return SPEED_MAX
+    if text in ('realtime', 'real-time', 'real'):
+        return SPEED_REAL_TIME
+    try:
+        speed = float(text.rstrip('x×'))
+    except ValueError:
+        raise ValueError(f"Invalid speed: {text} (expected max, realtime or Nx)")
+    if speed <= 0:
+        raise ValueError(f"Speed must be positive: {text}")
+    return speed
+
+
+def describe_speed(speed: Optional[float]) -> str:
+    """Human-readable name of a speed setting"""
+    if speed is SPEED_MAX:
+        return "max speed"
+    if speed == SPEED_REAL_TIME:
+        return "real time"
+    return f"{speed:g}× real time"
+
+
+class ClockThrottle:
+    """Paces CPU.run() to an emulated clock frequency
+
+    Instructions run in batches worth one time slice of T-states, and the
+    thread sleeps only for whatever is left of the slice. Sleeps are scheduled
+    against the start of the run, so rounding in one slice does not add up to
+    drift over many.
+    """
+
+    def __init__(self, cpu: CPU, clock_hz: int = DEFAULT_CLOCK_HZ, speed: Optional[float] = SPEED_REAL_TIME,
+                 slice_seconds: float = DEFAULT_SLICE_SECONDS):
+        if clock_hz <= 0 or slice_seconds <= 0:
+            raise ValueError("Clock frequency and slice length must be positive")
+        if speed is not SPEED_MAX and speed <= 0:
+            raise ValueError(f"Speed must be positive: {speed}")
+        self.cpu = cpu
+        self.clock_hz = clock_hz
+        self.speed = speed
+        self.slice_seconds = slice_seconds
+
+    @property
+    def effective_hz(self) -> Optional[float]:
+        """T-states per wall-clock second, or None at max speed"""
+        return None if self.speed is SPEED_MAX else self.clock_hz * self.speed
+
+    def run(self, max_steps: Optional[int] = None, max_cycles: Optional[int] = None,
+            should_continue: Optional[Callable[[], bool]] = None,
+            on_slice: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Run in paced slices until HLT, a breakpoint or watchpoint, a budget or should_continue() is False
+
+        on_slice receives each slice's run() summary, e.g. to refresh a display.
+        """
+        cpu = self.cpu
+        hz = self.effective_hz
+        slice_cycles = max(1, int(hz * self.slice_seconds)) if hz else None
+        start = time.perf_counter()
+        start_cycles = cpu.cycles
+        cycle_limit = None if max_cycles is None else start_cycles + max_cycles
+        # Pacing schedule: wall time and cycle count the next sleep is measured from
+        epoch, epoch_cycles = start, start_cycles
+        executed = 0
+        slices = 0
+        reason = STOP_HALT if cpu.halted else None
+        hit = None
+
+        while reason is None:
+            if should_continue is not None and not should_continue():
+                reason = STOP_REQUESTED
+                break
+            steps = None if max_steps is None else max_steps - executed
+            if hz:
+                budget = slice_cycles if cycle_limit is None else min(slice_cycles, cycle_limit - cpu.cycles)
+                result = cpu.run(max_steps=steps, max_cycles=budget, log_summary=False)
+            else:
+                steps = MAX_SPEED_SLICE_STEPS if steps is None else min(steps, MAX_SPEED_SLICE_STEPS)
+                budget = None if cycle_limit is None else cycle_limit - cpu.cycles
+                result = cpu.run(max_steps=steps, max_cycles=budget, log_summary=False)
+            executed += result['instructions']
+            slices += 1
+
+            if result['stop_reason'] in (STOP_HALT, STOP_BREAKPOINT, STOP_WATCHPOINT):
+                reason, hit = result['stop_reason'], result['hit']
+            elif max_steps is not None and executed >= max_steps:
+                reason = STOP_STEP_LIMIT
+            elif cycle_limit is not None and cpu.cycles >= cycle_limit:
+                reason = STOP_CYCLE_LIMIT
+            if on_slice is not None:
+                on_slice(result)
+
+            if hz and reason is None:
+                delay = epoch + (cpu.cycles - epoch_cycles) / hz - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -MAX_LAG_SECONDS:
+                    # The host cannot keep up (or the run was paused); do not burst to catch up
+                    epoch, epoch_cycles = time.perf_counter(), cpu.cycles
+
+        elapsed = time.perf_counter() - start
+        cycles = cpu.cycles - start_cycles
+        if cpu.instrumentation != INSTRUMENT_OFF:
+            logger.info(f"Throttled run ({describe_speed(self.speed)}) stopped ({reason}) after "
+                        f"{executed} instructions ({cycles} T-states) in {elapsed:.6f}s")
+        return {
+            'instructions': executed,
+            'cycles': cycles,
+            'stop_reason': reason,
+            'elapsed': elapsed,
+            'pc': cpu.PC,
+            'hit': hit,
+            'emulated_seconds': cycles / self.clock_hz,
+            'slices': slices,
+        }
@@ -0,0 +1,141 @@
+import ast
+import re
+from typing import Callable
+from Src.Core.ALU import FLAG_BITS
+
+# Names a condition can use: 8-bit registers and F, 16-bit values, register
+# pairs, M (the byte at HL), flag.<S|Z|AC|P|C>, and hits, the number of times
+# the breakpoint's address has been reached including this one
+REGISTERS = ('A', 'B', 'C', 'D', 'E', 'H', 'L', 'F', 'SP', 'PC')
+REGISTER_PAIRS = {'BC': ('B', 'C'), 'DE': ('D', 'E'), 'HL': ('H', 'L')}
+
+# Numbers are hexadecimal like addresses everywhere else in the simulator
+# (8014, #8014, 0x8014, 80FFH); 0d10000 is decimal
+_NUMBER = re.compile(
+    r'(?<![\w.#])(?:0[xX]([0-9A-Fa-f]+)|0[dD]([0-9]+)|#([0-9A-Fa-f]+)|([0-9][0-9A-Fa-f]*)[hH]?)(?![\w.])'
+)
+
+_OPERATORS = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.Invert,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.Load,
+)
+
+
+def _hex_literals(text: str) -> str:
+    def value(match):
+        hex_prefixed, decimal, hash_prefixed, bare = match.groups()
+        if decimal is not None:
+            return str(int(decimal))
+        return str(int(hex_prefixed or hash_prefixed or bare, 16))
+    return _NUMBER.sub(value, text)
+
+
+def _register(name: str) -> ast.expr:
+    return ast.Attribute(value=ast.Name(id='cpu', ctx=ast.Load()), attr=name, ctx=ast.Load())
+
+
+def _pair(high: str, low: str) -> ast.expr:
+    return ast.BinOp(left=ast.BinOp(left=_register(high), op=ast.LShift(), right=ast.Constant(8)),
+                     op=ast.BitOr(), right=_register(low))
+
+
+def _byte_at(address: ast.expr) -> ast.expr:
+    return ast.Subscript(value=ast.Name(id='mem', ctx=ast.Load()), slice=address, ctx=ast.Load())
+
+
+class _Translate(ast.NodeTransformer):
+    """Checks a parsed condition and rewrites its names into CPU and memory accesses"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid breakpoint condition '{self.text}': {message}")
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, _OPERATORS):
+            raise self.error(f"unsupported syntax {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if type(node.value) not in (int, bool):
+            raise self.error(f"unsupported value {node.value!r}")
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        name = node.id
+        if name in REGISTERS:
+            return _register(name)
+        if name in REGISTER_PAIRS:
+            return _pair(*REGISTER_PAIRS[name])
+        if name == 'M':
+            return _byte_at(_pair('H', 'L'))
+        if name == 'hits':
+            return node
+        raise self.error(f"unknown name {name}")
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.AST:
+        # M[address]: the byte at address, wrapped to 16 bits
+        if not (isinstance(node.value, ast.Name) and node.value.id == 'M'):
+            raise self.error("only M[address] can be indexed")
+        address = self.visit(node.slice)
+        return _byte_at(ast.BinOp(left=address, op=ast.BitAnd(), right=ast.Constant(0xFFFF)))
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        # flag.C and friends read as 0 or 1
+        if not (isinstance(node.value, ast.Name) and node.value.id == 'flag' and node.attr in FLAG_BITS):
+            raise self.error(f"unknown attribute (expected flag.{', flag.'.join(FLAG_BITS)})")
+        bit = FLAG_BITS[node.attr].bit_length() - 1
+        shifted = ast.BinOp(left=_register('F'), op=ast.RShift(), right=ast.Constant(bit))
+        return ast.BinOp(left=shifted, op=ast.BitAnd(), right=ast.Constant(1))
+
+
+def compile_condition(text: str) -> Callable[[object, bytearray, int], object]:
+    """Compile a condition into a function of (cpu, memory bytearray, hits)
+
+    The text is parsed and checked once; the result is a plain Python function
+    reading registers off the CPU and bytes straight from the backing store.
+    """
+    try:
+        tree = ast.parse(_hex_literals(text.strip()), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid breakpoint condition '{text}': {e.msg}")
+    body = _Translate(text).visit(tree).body
+    arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=name) for name in ('cpu', 'mem', 'hits')],
+                              kwonlyargs=[], kw_defaults=[], defaults=[])
+    function = ast.Expression(body=ast.Lambda(args=arguments, body=body))
+    ast.fix_missing_locations(function)
+    return eval(compile(function, f"<condition {text}>", 'eval'), {'__builtins__': {}})
+
+
+class Condition:
+    """A breakpoint condition and how often its address has been reached
+
+    Calling it counts one more hit and returns whether the run should stop.
+    """
+
+    __slots__ = ('text', 'predicate', 'hits')
+
+    def __init__(self, text: str, hits: int = 0):
+        self.text = text
+        self.predicate = compile_condition(text)
+        self.hits = hits
+
+    def __call__(self, cpu, memory: bytearray) -> bool:
+        self.hits += 1
+        return bool(self.predicate(cpu, memory, self.hits))
+
+    def copy(self) -> 'Condition':
+        """Same condition and hit count, sharing the compiled predicate"""
+        condition = Condition.__new__(Condition)
+        condition.text, condition.predicate, condition.hits = self.text, self.predicate, self.hits
+        return condition
+
+    def __reduce__(self):
+        return Condition, (self.text, self.hits)
+
+    def __repr__(self) -> str:
+        return f"Condition({self.text!r}, hits={self.hits})"
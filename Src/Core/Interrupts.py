@@ -0,0 +1,137 @@
+import heapq
+import sys
+from typing import Callable, List, Optional, Tuple, Union
+
+# Interrupt inputs of the 8085, highest priority first
+TRAP = 'TRAP'
+RST_7_5 = 'RST7.5'
+RST_6_5 = 'RST6.5'
+RST_5_5 = 'RST5.5'
+INTR = 'INTR'
+INTERRUPT_LINES = (TRAP, RST_7_5, RST_6_5, RST_5_5, INTR)
+
+# Bits of CPU.interrupt_pending. I5.5-I7.5 sit where RIM reports them; bits
+# 0-2 hold the RST number an INTR device puts on the bus
+PENDING_INTR_VECTOR = 0x07
+PENDING_INTR = 0x08
+PENDING_RST_5_5 = 0x10
+PENDING_RST_6_5 = 0x20
+PENDING_RST_7_5 = 0x40
+PENDING_TRAP = 0x80
+PENDING_BITS = {TRAP: PENDING_TRAP, RST_7_5: PENDING_RST_7_5, RST_6_5: PENDING_RST_6_5,
+                RST_5_5: PENDING_RST_5_5, INTR: PENDING_INTR}
+# Restart address of each pending bit (INTR uses its RST number instead)
+RESTART_ADDRESSES = {PENDING_TRAP: 0x0024, PENDING_RST_7_5: 0x003C, PENDING_RST_6_5: 0x0034,
+                     PENDING_RST_5_5: 0x002C}
+
+# Bits of CPU.interrupt_mask: the SIM mask bits (set = masked) and the SOD latch
+MASK_RST_5_5 = 0x01
+MASK_RST_6_5 = 0x02
+MASK_RST_7_5 = 0x04
+MASK_ALL = MASK_RST_5_5 | MASK_RST_6_5 | MASK_RST_7_5
+SERIAL_OUTPUT = 0x80
+
+# T-states of the acknowledge, push and jump to the restart address (as RST n)
+INTERRUPT_CYCLES = 12
+# interrupt_due when nothing is scheduled or waiting to be taken
+NEVER = sys.maxsize
+
+EventAction = Union[str, Callable[[object], None]]
+
+
+def pending_bit(line: str) -> int:
+    """CPU.interrupt_pending bit of an interrupt line name"""
+    try:
+        return PENDING_BITS[line.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown interrupt line: {line} (expected one of {', '.join(INTERRUPT_LINES)})")
+
+
+class EventScheduler:
+    """Heap of events due at CPU cycle counts (timer ticks, device interrupts)
+
+    An event's action is an interrupt line name, raised on the CPU when the
+    event fires, or a function called with the CPU. Periodic events are put
+    back period T-states after their due cycle. Events fire at the first
+    instruction boundary at or past their cycle; the CPU keeps the earliest
+    due cycle in interrupt_due, so run loops compare one number per
+    instruction rather than looking at the heap.
+    """
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        # (due cycle, event id, period or None, action); ids keep equal cycles in scheduling order
+        self.queue: List[Tuple[int, int, Optional[int], EventAction]] = []
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def at(self, cycle: int, action: EventAction, period: Optional[int] = None) -> int:
+        """Schedule action at an absolute cycle count, every period T-states after if given; returns its id"""
+        if isinstance(action, str):
+            pending_bit(action)  # Unknown lines are reported when scheduled, not when they fire
+        elif not callable(action):
+            raise ValueError(f"Event action must be an interrupt line or a function: {action!r}")
+        if period is not None and period <= 0:
+            raise ValueError(f"Event period must be positive: {period}")
+        event_id = self._next_id
+        self._next_id += 1
+        heapq.heappush(self.queue, (cycle, event_id, period, action))
+        if cycle < self.cpu.interrupt_due:
+            self.cpu.interrupt_due = cycle
+        return event_id
+
+    def after(self, delay: int, action: EventAction, period: Optional[int] = None) -> int:
+        """Schedule action delay T-states from now"""
+        return self.at(self.cpu.cycles + delay, action, period)
+
+    def every(self, period: int, action: EventAction, start: Optional[int] = None) -> int:
+        """Schedule action every period T-states, first at start (default: one period from now)"""
+        return self.at(self.cpu.cycles + period if start is None else start, action, period)
+
+    def cancel(self, event_id: int) -> bool:
+        """Drop a scheduled event; False if it already fired (and was not periodic)"""
+        for index, event in enumerate(self.queue):
+            if event[1] == event_id:
+                self.queue[index] = self.queue[-1]
+                self.queue.pop()
+                heapq.heapify(self.queue)
+                return True
+        return False
+
+    def clear(self) -> None:
+        self.queue.clear()
+
+    def next_due(self) -> int:
+        """Cycle of the earliest event, NEVER without one"""
+        return self.queue[0][0] if self.queue else NEVER
+
+    def can_wake(self, interrupts_enabled: bool) -> bool:
+        """Whether a queued event could wake a halted CPU
+
+        With interrupts disabled only TRAP gets through, and a function
+        event may raise TRAP (or do anything else), so those still count.
+        """
+        if interrupts_enabled:
+            return bool(self.queue)
+        return any(not isinstance(action, str) or pending_bit(action) == PENDING_TRAP
+                   for _, _, _, action in self.queue)
+
+    def run_due(self) -> int:
+        """Fire every event due at the CPU's cycle count; returns how many fired"""
+        cpu = self.cpu
+        queue = self.queue
+        fired = 0
+        while queue and queue[0][0] <= cpu.cycles:
+            cycle, event_id, period, action = queue[0]
+            if period is None:
+                heapq.heappop(queue)
+            else:
+                heapq.heapreplace(queue, (cycle + period, event_id, period, action))
+            if isinstance(action, str):
+                cpu.raise_interrupt(action)
+            else:
+                action(cpu)
+            fired += 1
+        return fired
@@ -0,0 +1,52 @@
+from collections import deque
+from typing import Deque, List, Optional
+
+# Instructions kept by default; older entries fall off the front of the ring
+DEFAULT_JOURNAL_CAPACITY = 100_000
+
+
+class UndoJournal:
+    """Bounded ring of per-instruction undo records for reverse stepping
+
+    Each entry is a list holding the CPU state from before the instruction
+    (see CPU.get_state()) followed by address, old value pairs for every byte
+    it wrote, so memory cost grows with the bytes written rather than with
+    the 64 KB address space.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_JOURNAL_CAPACITY):
+        if capacity <= 0:
+            raise ValueError(f"Journal capacity must be positive: {capacity}")
+        self.capacity = capacity
+        self.entries: Deque[List] = deque(maxlen=capacity)
+        # Entry of the instruction being executed; memory writes are added to it
+        self.current: Optional[List] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def record(self, state: tuple) -> None:
+        """Start the entry of an instruction about to execute"""
+        self.current = [state]
+        self.entries.append(self.current)
+
+    def note_write(self, address: int, old_value: int) -> None:
+        """Remember the byte a write is about to overwrite"""
+        if self.current is not None:
+            self.current += (address, old_value)
+
+    def pop(self) -> Optional[List]:
+        """Remove and return the newest entry"""
+        self.current = None
+        return self.entries.pop() if self.entries else None
+
+    def last_write(self, address: int) -> int:
+        """How many entries back the newest write to address is, 0 if none is recorded"""
+        for back, entry in enumerate(reversed(self.entries), start=1):
+            if address in entry[1::2]:
+                return back
+        return 0
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.current = None
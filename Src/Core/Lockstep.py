@@ -0,0 +1,529 @@
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from Src.Core.ALU import ALU, FLAG_S, FLAG_Z, FLAG_P, FLAG_C
+from Src.Core.CPU import (CPU, CYCLES, PSW_FLAG_MASK, JUMP_TAKEN_CYCLES, CALL_TAKEN_CYCLES,
+                          RETURN_TAKEN_CYCLES)
+from Src.Core.Interrupts import MASK_ALL, SERIAL_OUTPUT
+from Src.Core.Memory import Memory
+from Src.Utils.Logger import logger, INSTRUMENT_OFF
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed by this engine
+    np = None
+
+# 8085 register field encoding; 6 selects M, the byte at (HL)
+REGISTER_FIELD = ('B', 'C', 'D', 'E', 'H', 'L', None, 'A')
+# Register pairs in bits 4-5 of LXI/INX/DCX/PUSH/POP (3 is SP, or PSW for PUSH/POP)
+REGISTER_PAIRS = (('B', 'C'), ('D', 'E'), ('H', 'L'))
+# Condition field of Jcc/Ccc/Rcc: the flag tested and whether it must be set
+CONDITIONS = ((FLAG_Z, False), (FLAG_Z, True), (FLAG_C, False), (FLAG_C, True),
+              (FLAG_P, False), (FLAG_P, True), (FLAG_S, False), (FLAG_S, True))
+# ALU operation in bits 3-5 of ADD..CMP and the immediates: ALU method, carry in, keep result
+ALU_GROUPS = (('add', False, True), ('add', True, True), ('sub', False, True), ('sub', True, True),
+              ('logical_and', False, True), ('logical_xor', False, True), ('logical_or', False, True),
+              ('sub', False, False))
+# Opcodes that only read and write A and F; their lane tables are built by running
+# the CPU's own handlers over every (A, F) pair
+ACCUMULATOR_OPCODES = (0x07, 0x0F, 0x17, 0x1F, 0x27, 0x2F, 0x37, 0x3F)
+
+# Lookup tables shared by every lockstep machine, built on first use
+_ALU_TABLES: Dict[str, tuple] = {}
+_ACCUMULATOR_TABLES: Dict[int, tuple] = {}
+
+
+def _alu_table(name: str) -> tuple:
+    """Result and flags of an ALU method, indexed by (a << 9) | (b << 1) | carry"""
+    table = _ALU_TABLES.get(name)
+    if table is None:
+        operation = getattr(ALU, name)
+        with_carry = name in ('add', 'sub')
+        results, flags = bytearray(1 << 17), bytearray(1 << 17)
+        for a in range(256):
+            for b in range(256):
+                for carry in (0, 1):
+                    index = (a << 9) | (b << 1) | carry
+                    results[index], flags[index] = operation(a, b, carry) if with_carry else operation(a, b)
+        table = _ALU_TABLES[name] = (np.frombuffer(bytes(results), np.uint8).astype(np.int32),
+                                     np.frombuffer(bytes(flags), np.uint8).astype(np.int32))
+    return table
+
+
+def _step_table(name: str) -> tuple:
+    """Result and flags of ALU.inr or ALU.dcr, indexed by the operand"""
+    table = _ALU_TABLES.get(name)
+    if table is None:
+        operation = getattr(ALU, name)
+        pairs = [operation(value) for value in range(256)]
+        table = _ALU_TABLES[name] = (np.array([result for result, _ in pairs], np.int32),
+                                     np.array([flags for _, flags in pairs], np.int32))
+    return table
+
+
+def _accumulator_table(opcode: int) -> tuple:
+    """A and F after the CPU's handler for opcode, indexed by (A << 8) | F"""
+    table = _ACCUMULATOR_TABLES.get(opcode)
+    if table is None:
+        cpu = CPU(Memory(INSTRUMENT_OFF))
+        handler = CPU.instruction_set[opcode]
+        a_out, f_out = bytearray(0x10000), bytearray(0x10000)
+        for index in range(0x10000):
+            cpu.A, cpu.F = index >> 8, index & 0xFF
+            handler(cpu)
+            a_out[index], f_out[index] = cpu.A, cpu.F
+        table = _ACCUMULATOR_TABLES[opcode] = (np.frombuffer(bytes(a_out), np.uint8).astype(np.int32),
+                                               np.frombuffer(bytes(f_out), np.uint8).astype(np.int32))
+    return table
+
+
+def instruction_size(opcode: int) -> int:
+    """Bytes taken by an instruction, opcode included"""
+    high, low = opcode >> 6, opcode & 7
+    if opcode in (0x22, 0x2A, 0x32, 0x3A, 0xC3, 0xCD) or (high == 0 and opcode & 0x0F == 0x01):
+        return 3
+    if high == 3 and low in (2, 4):
+        return 3
+    if (high in (0, 3) and low == 6) or opcode in (0xD3, 0xDB):
+        return 2
+    return 1
+
+
+SIZES = [instruction_size(opcode) for opcode in range(256)]
+
+
+class LockstepCPU:
+    """N copies of one machine stepped together, one NumPy operation per instruction
+
+    Registers, flags, PC, SP and cycle counts are arrays with one entry per
+    lane. Memory is the machine's 64 KB image shared by every lane plus a
+    column of per-lane bytes for each address any lane has written (or that
+    set_memory() gave per-lane values), so lanes cost a few bytes each rather
+    than 64 KB.
+
+    Each dispatch picks the lowest PC among the running lanes and executes
+    that instruction for every lane sitting on it; lanes that took the other
+    side of a branch wait until the group catches up, which brings loops with
+    different trip counts back into step when they exit. Instruction semantics
+    come from the ALU and from the CPU's own handlers (tables built once per
+    process), and the opcodes implemented are exactly those of the CPU.
+
+    Lanes that reach an opcode the CPU does not implement stop with
+    faulted set instead of raising, so one bad input does not end a sweep.
+    EI, DI, SIM and RIM keep per-lane interrupt state, but no interrupt is
+    ever raised, and SP and 16-bit addresses wrap instead of raising at the
+    ends of memory.
+    """
+
+    def __init__(self, cpu: CPU, lanes: int):
+        if np is None:
+            raise ImportError("The lockstep engine needs NumPy (pip install numpy)")
+        if lanes <= 0:
+            raise ValueError(f"Lane count must be positive: {lanes}")
+        if cpu.interrupt_pending or cpu.events.queue:
+            raise ValueError("Lockstep runs do not model interrupts; clear pending interrupts and events first")
+        self.lanes = lanes
+        (a, b, c, d, e, h, l, f, pc, sp, halted, interrupt_enabled, cycles, interrupt_mask,
+         _) = cpu.get_state()
+        self.registers = {name: np.full(lanes, value, np.int32)
+                          for name, value in zip(('A', 'B', 'C', 'D', 'E', 'H', 'L', 'F'), (a, b, c, d, e, h, l, f))}
+        self.PC = np.full(lanes, pc, np.int32)
+        self.SP = np.full(lanes, sp, np.int32)
+        self.halted = np.full(lanes, bool(halted))
+        self.interrupt_enabled = np.full(lanes, bool(interrupt_enabled))
+        self.interrupt_mask = np.full(lanes, interrupt_mask, np.int32)
+        self.serial_input = cpu.serial_input
+        self.faulted = np.zeros(lanes, bool)
+        self.cycles = np.full(lanes, cycles, np.int64)
+        self.instructions = np.zeros(lanes, np.int64)
+        self.base = np.frombuffer(bytes(cpu.memory.memory), np.uint8)
+        self.columns: Dict[int, Any] = {}
+        self.handlers = self._build_handlers()
+        # Opcodes after which a lane stops: HLT and the ones the CPU does not implement
+        self.stops = [opcode == 0x76 or handler == self._illegal for opcode, handler in enumerate(self.handlers)]
+
+    # Per-lane state
+
+    def set_register(self, name: str, values: Union[int, Sequence[int]]) -> None:
+        """Give a register (A-L, F, PC or SP) one value, or one value per lane"""
+        mask = 0xFFFF if name in ('PC', 'SP') else 0xFF
+        self._register(name)[:] = np.asarray(values, np.int64) & mask
+
+    def register(self, name: str):
+        """Array of a register's value in every lane"""
+        return self._register(name).copy()
+
+    def _register(self, name: str):
+        if name == 'PC':
+            return self.PC
+        if name == 'SP':
+            return self.SP
+        if name not in self.registers:
+            raise ValueError(f"Invalid register: {name}")
+        return self.registers[name]
+
+    def set_memory(self, address: int, values: Union[int, Sequence[int]]) -> None:
+        """Give the byte at address one value per lane (or the same in all)"""
+        if not 0 <= address <= 0xFFFF:
+            raise ValueError(f"Invalid memory address: {address:04X}")
+        values = np.asarray(values)
+        if values.ndim and len(values) != self.lanes:
+            raise ValueError(f"Expected {self.lanes} values for {address:04X}, got {len(values)}")
+        self._column(address)[:] = values & 0xFF
+
+    def read_memory(self, address: int):
+        """Array of the byte at address in every lane"""
+        column = self.columns.get(address)
+        if column is None:
+            return np.full(self.lanes, self.base[address], np.uint8)
+        return column.copy()
+
+    def get_state(self, lane: int) -> tuple:
+        """One lane's state in the layout of CPU.get_state()"""
+        registers = self.registers
+        return tuple(int(registers[name][lane]) for name in ('A', 'B', 'C', 'D', 'E', 'H', 'L', 'F')) + (
+            int(self.PC[lane]), int(self.SP[lane]), int(self.halted[lane]), int(self.interrupt_enabled[lane]),
+            int(self.cycles[lane]), int(self.interrupt_mask[lane]), 0)
+
+    def lane_memory(self, lane: int) -> bytes:
+        """One lane's full 64 KB memory image"""
+        image = bytearray(self.base.tobytes())
+        for address, column in self.columns.items():
+            image[address] = column[lane]
+        return bytes(image)
+
+    # Memory access for a group of lanes; an address is one int for the whole
+    # group or an array with one entry per lane of the group
+
+    def _column(self, address: int):
+        column = self.columns.get(address)
+        if column is None:
+            column = self.columns[address] = np.full(self.lanes, self.base[address], np.uint8)
+        return column
+
+    def _read(self, lanes, address):
+        if not isinstance(address, int):
+            if address[0] == address.min() == address.max():
+                address = int(address[0])
+            else:
+                values = self.base[address].astype(np.int32)
+                if self.columns:
+                    for value in np.unique(address):
+                        column = self.columns.get(int(value))
+                        if column is not None:
+                            selected = address == value
+                            values[selected] = column[lanes[selected]]
+                return values
+        column = self.columns.get(address)
+        if column is None:
+            return int(self.base[address])
+        return column[lanes].astype(np.int32)
+
+    def _write(self, lanes, address, value) -> None:
+        if not isinstance(address, int):
+            if address[0] == address.min() == address.max():
+                address = int(address[0])
+            else:
+                for target in np.unique(address):
+                    selected = address == target
+                    self._column(int(target))[lanes[selected]] = value if np.ndim(value) == 0 else value[selected]
+                return
+        self._column(address)[lanes] = value
+
+    def _word(self, lanes, pc: int):
+        return self._read(lanes, (pc + 1) & 0xFFFF) | (self._read(lanes, (pc + 2) & 0xFFFF) << 8)
+
+    def _hl(self, lanes):
+        return (self.registers['H'][lanes] << 8) | self.registers['L'][lanes]
+
+    def _push(self, lanes, value) -> None:
+        sp = (self.SP[lanes] - 2) & 0xFFFF
+        self.SP[lanes] = sp
+        self._write(lanes, sp, value & 0xFF)
+        self._write(lanes, (sp + 1) & 0xFFFF, value >> 8)
+
+    def _pop(self, lanes):
+        sp = self.SP[lanes]
+        value = self._read(lanes, sp) | (self._read(lanes, (sp + 1) & 0xFFFF) << 8)
+        self.SP[lanes] = (sp + 2) & 0xFFFF
+        return value
+
+    def _taken(self, lanes, condition: int):
+        flag, wanted = CONDITIONS[condition]
+        taken = (self.registers['F'][lanes] & flag) != 0
+        return taken if wanted else ~taken
+
+    # Opcode handlers: each takes the lanes (an index array) executing the
+    # instruction at pc, after PC has been moved past it
+
+    def _build_handlers(self) -> List[Callable]:
+        handlers = [self._illegal] * 256
+        for opcode in range(256):
+            if CPU.instruction_set[opcode] is not CPU._illegal_opcode:
+                handlers[opcode] = self._handler(opcode)
+        return handlers
+
+    def _handler(self, opcode: int) -> Callable:
+        high, mid, low = opcode >> 6, (opcode >> 3) & 7, opcode & 7
+        if opcode == 0x76:
+            return self._hlt
+        if high == 1:
+            return self._mov(REGISTER_FIELD[mid], REGISTER_FIELD[low])
+        if high == 2:
+            return self._alu(mid, REGISTER_FIELD[low], immediate=False)
+        if high == 3 and low == 6:
+            return self._alu(mid, None, immediate=True)
+        if opcode in ACCUMULATOR_OPCODES:
+            return self._accumulator(opcode)
+        if high == 0:
+            if low == 6:
+                return self._mvi(REGISTER_FIELD[mid])
+            if low in (4, 5):
+                return self._step(REGISTER_FIELD[mid], 'inr' if low == 4 else 'dcr')
+            if low == 1 and not mid & 1:
+                return self._lxi(mid >> 1)
+            if low == 3:
+                return self._inx(mid >> 1, -1 if mid & 1 else 1)
+        if opcode in (0x22, 0x2A, 0x32, 0x3A):
+            return self._direct(opcode)
+        if opcode == 0xC3 or (high == 3 and low == 2):
+            return self._jump(None if opcode == 0xC3 else mid)
+        if opcode == 0xCD or (high == 3 and low == 4):
+            return self._call(None if opcode == 0xCD else mid)
+        if opcode == 0xC9 or (high == 3 and low == 0):
+            return self._return(None if opcode == 0xC9 else mid)
+        if high == 3 and low in (1, 5):
+            return self._stack(mid >> 1, push=low == 5)
+        if high == 3 and low == 7:
+            return self._restart(mid)
+        if opcode in (0xF3, 0xFB):
+            def interrupts(lanes, pc, enabled=opcode == 0xFB):
+                self.interrupt_enabled[lanes] = enabled
+            return interrupts
+        if opcode == 0x20:
+            return self._rim
+        if opcode == 0x30:
+            return self._sim
+        if opcode == 0x00:
+            return lambda lanes, pc: None
+        raise ValueError(f"No lockstep handler for opcode {opcode:02X}")
+
+    def _get(self, name: Optional[str], lanes):
+        return self.registers[name][lanes] if name is not None else self._read(lanes, self._hl(lanes))
+
+    def _set(self, name: Optional[str], lanes, value) -> None:
+        if name is not None:
+            self.registers[name][lanes] = value
+        else:
+            self._write(lanes, self._hl(lanes), value)
+
+    def _mov(self, dest: Optional[str], source: Optional[str]) -> Callable:
+        def mov(lanes, pc):
+            self._set(dest, lanes, self._get(source, lanes))
+        return mov
+
+    def _mvi(self, dest: Optional[str]) -> Callable:
+        def mvi(lanes, pc):
+            self._set(dest, lanes, self._read(lanes, (pc + 1) & 0xFFFF))
+        return mvi
+
+    def _alu(self, group: int, source: Optional[str], immediate: bool) -> Callable:
+        name, with_carry, keep = ALU_GROUPS[group]
+        A, F = self.registers['A'], self.registers['F']
+
+        def alu(lanes, pc):
+            results, flags = _alu_table(name)
+            operand = self._read(lanes, (pc + 1) & 0xFFFF) if immediate else self._get(source, lanes)
+            index = (A[lanes] << 9) | (operand << 1)
+            if with_carry:
+                index |= F[lanes] & FLAG_C
+            if keep:
+                A[lanes] = results[index]
+            F[lanes] = flags[index]
+        return alu
+
+    def _step(self, name: Optional[str], operation: str) -> Callable:
+        F = self.registers['F']
+
+        def step(lanes, pc):
+            results, flags = _step_table(operation)
+            if name is None:
+                address = self._hl(lanes)
+                value = self._read(lanes, address)
+                self._write(lanes, address, results[value])
+            else:
+                value = self.registers[name][lanes]
+                self.registers[name][lanes] = results[value]
+            F[lanes] = flags[value] | (F[lanes] & FLAG_C)  # INR/DCR leave carry alone
+        return step
+
+    def _accumulator(self, opcode: int) -> Callable:
+        A, F = self.registers['A'], self.registers['F']
+
+        def accumulator(lanes, pc):
+            a_table, f_table = _accumulator_table(opcode)
+            index = (A[lanes] << 8) | F[lanes]
+            A[lanes], F[lanes] = a_table[index], f_table[index]
+        return accumulator
+
+    def _lxi(self, pair: int) -> Callable:
+        def lxi(lanes, pc):
+            word = self._word(lanes, pc)
+            if pair == 3:
+                self.SP[lanes] = word
+            else:
+                high, low = REGISTER_PAIRS[pair]
+                self.registers[high][lanes] = word >> 8
+                self.registers[low][lanes] = word & 0xFF
+        return lxi
+
+    def _inx(self, pair: int, delta: int) -> Callable:
+        def inx(lanes, pc):
+            if pair == 3:
+                self.SP[lanes] = (self.SP[lanes] + delta) & 0xFFFF
+            else:
+                high, low = (self.registers[name] for name in REGISTER_PAIRS[pair])
+                value = (((high[lanes] << 8) | low[lanes]) + delta) & 0xFFFF
+                high[lanes], low[lanes] = value >> 8, value & 0xFF
+        return inx
+
+    def _direct(self, opcode: int) -> Callable:
+        registers = self.registers
+
+        def direct(lanes, pc):
+            address = self._word(lanes, pc)
+            if opcode == 0x3A:    # LDA
+                registers['A'][lanes] = self._read(lanes, address)
+            elif opcode == 0x32:  # STA
+                self._write(lanes, address, registers['A'][lanes])
+            elif opcode == 0x2A:  # LHLD
+                registers['L'][lanes] = self._read(lanes, address)
+                registers['H'][lanes] = self._read(lanes, (address + 1) & 0xFFFF)
+            else:                 # SHLD
+                self._write(lanes, address, registers['L'][lanes])
+                self._write(lanes, (address + 1) & 0xFFFF, registers['H'][lanes])
+        return direct
+
+    def _branch(self, lanes, condition: Optional[int], extra: int):
+        """Lanes that take a conditional transfer, charged its extra T-states"""
+        if condition is None:
+            return lanes, None
+        taken = self._taken(lanes, condition)
+        lanes = lanes[taken]
+        self.cycles[lanes] += extra
+        return lanes, taken
+
+    def _jump(self, condition: Optional[int]) -> Callable:
+        def jump(lanes, pc):
+            target = self._word(lanes, pc)
+            lanes, taken = self._branch(lanes, condition, JUMP_TAKEN_CYCLES)
+            self.PC[lanes] = target if taken is None or isinstance(target, int) else target[taken]
+        return jump
+
+    def _call(self, condition: Optional[int]) -> Callable:
+        def call(lanes, pc):
+            target = self._word(lanes, pc)
+            lanes, taken = self._branch(lanes, condition, CALL_TAKEN_CYCLES)
+            if len(lanes):
+                self._push(lanes, (pc + 3) & 0xFFFF)
+                self.PC[lanes] = target if taken is None or isinstance(target, int) else target[taken]
+        return call
+
+    def _return(self, condition: Optional[int]) -> Callable:
+        def ret(lanes, pc):
+            lanes, _ = self._branch(lanes, condition, RETURN_TAKEN_CYCLES)
+            if len(lanes):
+                self.PC[lanes] = self._pop(lanes)
+        return ret
+
+    def _stack(self, pair: int, push: bool) -> Callable:
+        registers = self.registers
+        high, low = ('A', 'F') if pair == 3 else REGISTER_PAIRS[pair]
+
+        def stack(lanes, pc):
+            if push:
+                self._push(lanes, (registers[high][lanes] << 8) | registers[low][lanes])
+            else:
+                value = self._pop(lanes)
+                registers[high][lanes] = value >> 8
+                registers[low][lanes] = value & (PSW_FLAG_MASK if pair == 3 else 0xFF)
+        return stack
+
+    def _restart(self, number: int) -> Callable:
+        def restart(lanes, pc):
+            self._push(lanes, (pc + 1) & 0xFFFF)
+            self.PC[lanes] = number << 3
+        return restart
+
+    def _rim(self, lanes, pc) -> None:
+        # Nothing is ever pending in a lockstep run
+        self.registers['A'][lanes] = ((self.interrupt_mask[lanes] & MASK_ALL)
+                                      | (self.interrupt_enabled[lanes].astype(np.int32) << 3)
+                                      | (self.serial_input << 7))
+
+    def _sim(self, lanes, pc) -> None:
+        a = self.registers['A'][lanes]
+        mask = self.interrupt_mask[lanes]
+        mask = np.where(a & 0x08, (mask & ~MASK_ALL) | (a & MASK_ALL), mask)
+        self.interrupt_mask[lanes] = np.where(a & 0x40, (mask & ~SERIAL_OUTPUT) | (a & SERIAL_OUTPUT), mask)
+
+    def _hlt(self, lanes, pc) -> None:
+        self.halted[lanes] = True
+
+    def _illegal(self, lanes, pc) -> None:
+        self.faulted[lanes] = True
+
+    # Execution
+
+    def run(self, max_steps: Optional[int] = None) -> Dict[str, Any]:
+        """Run every lane until it halts, faults or has executed max_steps instructions
+
+        Returns a summary: lane counts by how they stopped, instructions
+        executed over all lanes, dispatches (one per group of lanes sharing a
+        PC) and utilization, the average fraction of lanes each dispatch ran.
+        """
+        start = time.perf_counter()
+        limit = sys.maxsize if max_steps is None else max_steps
+        PC, cycles, instructions = self.PC, self.cycles, self.instructions
+        base, columns, handlers, stops = self.base, self.columns, self.handlers, self.stops
+        start_instructions = instructions.copy()
+        running = ~(self.halted | self.faulted)
+        if limit <= 0:
+            running[:] = False
+        dispatches = 0
+        while running.any():
+            pc = int(np.where(running, PC, 0x10000).min())
+            lanes = np.flatnonzero(running & (PC == pc))
+            column = columns.get(pc)
+            if column is None:
+                opcode = int(base[pc])
+            else:
+                # Lanes whose code at pc was modified differently run one opcode at a time
+                opcodes = column[lanes]
+                opcode = int(opcodes[0])
+                lanes = lanes[opcodes == opcode]
+            PC[lanes] = (pc + SIZES[opcode]) & 0xFFFF
+            cycles[lanes] += CYCLES[opcode]
+            instructions[lanes] += 1
+            handlers[opcode](lanes, pc)
+            dispatches += 1
+            if stops[opcode]:
+                running[lanes] = False
+            elif max_steps is not None:
+                running[lanes[instructions[lanes] - start_instructions[lanes] >= limit]] = False
+
+        executed = int((instructions - start_instructions).sum())
+        elapsed = time.perf_counter() - start
+        halted, faulted = int(self.halted.sum()), int(self.faulted.sum())
+        logger.info(f"Lockstep run of {self.lanes} lanes: {executed} instructions in {dispatches} dispatches, "
+                    f"{elapsed:.6f}s")
+        return {
+            'lanes': self.lanes,
+            'halted': halted,
+            'faulted': faulted,
+            'max_steps': self.lanes - halted - faulted,
+            'instructions': executed,
+            'dispatches': dispatches,
+            'utilization': round(executed / (dispatches * self.lanes), 4) if dispatches else 0.0,
+            'elapsed': elapsed,
+        }
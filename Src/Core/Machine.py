@@ -0,0 +1,129 @@
+import struct
+import zlib
+from typing import Any, Dict, Optional, Tuple
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU, ENGINE_INTERPRETER
+from Src.Core.Interrupts import MASK_ALL
+from Src.Utils.Logger import logger
+
+# Save-state file layout: magic, format version, then the zlib-compressed state
+# (registers and control state followed by the 64 KB memory image)
+SNAPSHOT_MAGIC = b'8085SAVE'
+SNAPSHOT_VERSION = 2
+_HEADER = struct.Struct('<8sH')
+# A B C D E H L F, PC, SP, halted, interrupt_enabled, cycles, interrupt mask, pending interrupts
+_STATE = struct.Struct('<8B2H2BQ2B')
+# Version 1 had no interrupt mask or pending interrupts; they load as after reset
+_STATE_V1 = struct.Struct('<8B2H2BQ')
+_STATE_FIELDS = 15
+MEMORY_SIZE = 0x10000
+
+
+class Snapshot:
+    """Immutable copy of the full machine state, taken by Machine.snapshot()"""
+
+    __slots__ = ('state', 'image')
+
+    def __init__(self, state: Tuple[int, ...], image: bytes):
+        if len(state) != _STATE_FIELDS or len(image) != MEMORY_SIZE:
+            raise ValueError(f"Snapshot needs {_STATE_FIELDS} state fields and a 64 KB memory image")
+        self.state = state
+        self.image = image
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Snapshot) and self.state == other.state and self.image == other.image
+
+    def to_bytes(self, level: int = 6) -> bytes:
+        """Versioned, compressed save-state bytes"""
+        body = _STATE.pack(*self.state) + self.image
+        return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION) + zlib.compress(body, level)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Snapshot':
+        """Parse bytes written by to_bytes()"""
+        if len(data) < _HEADER.size:
+            raise ValueError("Save state is truncated")
+        magic, version = _HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not an 8085 save state")
+        if version not in (1, SNAPSHOT_VERSION):
+            raise ValueError(f"Unsupported save state version: {version} (expected {SNAPSHOT_VERSION})")
+        try:
+            body = zlib.decompress(data[_HEADER.size:])
+        except zlib.error as e:
+            raise ValueError(f"Corrupt save state: {e}")
+        layout = _STATE if version == SNAPSHOT_VERSION else _STATE_V1
+        if len(body) != layout.size + MEMORY_SIZE:
+            raise ValueError(f"Corrupt save state: {len(body)} bytes of state")
+        state = layout.unpack_from(body)
+        if version == 1:
+            state += (MASK_ALL, 0)
+        return cls(state, body[layout.size:])
+
+
+class Machine:
+    """A CPU and its memory, with snapshot/restore of the whole machine state"""
+
+    def __init__(self, memory: Optional[Memory] = None, cpu: Optional[CPU] = None,
+                 instrumentation: Optional[str] = None, engine: str = ENGINE_INTERPRETER):
+        if cpu is not None:
+            if memory is not None and cpu.memory is not memory:
+                raise ValueError("CPU is attached to a different memory")
+            memory = cpu.memory
+        self.memory = memory or Memory(instrumentation)
+        self.cpu = cpu or CPU(self.memory, instrumentation, engine)
+
+    def snapshot(self) -> Snapshot:
+        """Copy registers, flags, PC, SP, interrupt state, cycle count and memory"""
+        return Snapshot(self.cpu.get_state(), bytes(self.memory.memory))
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Put the machine back in a snapshot's state
+
+        The memory image goes back with one slice copy; compiled blocks whose
+        bytes it changed are dropped like after any other block write.
+        Snapshots do not hold scheduled events, so the CPU's are dropped
+        with the abandoned timeline; schedule them again after restoring.
+        """
+        # Its entries and events describe the abandoned timeline
+        self.cpu.events.clear()
+        if self.cpu.journal is not None:
+            self.cpu.journal.clear()
+        self.cpu.set_state(snapshot.state)
+        memory = self.memory
+        if self.cpu.blocks is not None and self.cpu.blocks.blocks and memory.memory != snapshot.image:
+            memory.write_block(0, snapshot.image)
+        else:
+            memory.memory[:] = snapshot.image
+
+    def fork(self) -> 'Machine':
+        """Child machine in the same state whose memory shares pages copy-on-write
+
+        See Memory.fork(); a child costs a CPU, a page table and the pages it
+        has written, before and after it runs. Children pickle compactly, so
+        they can be sent to worker processes.
+        """
+        child = Machine(self.memory.fork(), engine=self.cpu.engine)
+        child.cpu.set_state(self.cpu.get_state())
+        return child
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'memory': self.memory, 'state': self.cpu.get_state(), 'engine': self.cpu.engine}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.memory = state['memory']
+        self.cpu = CPU(self.memory, engine=state['engine'])
+        self.cpu.set_state(state['state'])
+
+    def save_state(self, path: str) -> None:
+        """Write a compressed save state file"""
+        with open(path, 'wb') as file:
+            file.write(self.snapshot().to_bytes())
+        logger.info(f"Saved machine state to {path}")
+
+    def load_state(self, path: str) -> None:
+        """Restore the machine from a file written by save_state()"""
+        with open(path, 'rb') as file:
+            snapshot = Snapshot.from_bytes(file.read())
+        self.restore(snapshot)
+        logger.info(f"Loaded machine state from {path}")
@@ -1,48 +1,474 @@
-from typing import List, Callable
-from Src.Utils.Logger import logger
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from Src.Core.Journal import UndoJournal
+from Src.Core.Conditions import Condition
+from Src.Utils.Logger import logger, INSTRUMENT_TRACE, check_instrumentation, default_instrumentation
+
+# Granularity at which forked memories share and own their contents
+PAGE_SIZE = 0x100
+PAGE_COUNT = 0x10000 // PAGE_SIZE
+
+# Watchpoint kinds, stored as bits of Memory.watch_flags; a change watchpoint only
+# fires on writes that store a different value
+WATCH_READ = 0x01
+WATCH_WRITE = 0x02
+WATCH_CHANGE = 0x04
+WATCH_KINDS = {'read': WATCH_READ, 'write': WATCH_WRITE, 'change': WATCH_CHANGE, 'access': WATCH_READ | WATCH_WRITE}
+
+# Shared all-zero map used until a breakpoint, watchpoint or compiled block is
+# first set, so memories (and their forks) only allocate 64 KB maps when they need them
+NO_ADDRESSES = bytes(0x10000)
+
+
+class AddressBitmap:
+    """Set of 16-bit addresses kept as a 64 KB map, so membership is one index
+
+    Run loops index bitmap[pc] directly; the set methods keep it and the
+    count in step.
+    """
+
+    __slots__ = ('bitmap', '_count')
+
+    def __init__(self, addresses: Iterable[int] = ()):
+        self.bitmap: Union[bytes, bytearray] = NO_ADDRESSES
+        self._count = 0
+        for address in addresses:
+            self.add(address)
+
+    def add(self, address: int) -> None:
+        self.add_range(address, address)
+
+    def add_range(self, start: int, end: int) -> None:
+        """Add every address from start to end (inclusive)"""
+        if not 0 <= start <= end <= 0xFFFF:
+            raise ValueError(f"Invalid address range: {start:04X}-{end:04X}")
+        if self.bitmap is NO_ADDRESSES:
+            self.bitmap = bytearray(NO_ADDRESSES)
+        self._count += end + 1 - start - self.bitmap.count(1, start, end + 1)
+        self.bitmap[start:end + 1] = b'\x01' * (end + 1 - start)
+
+    def discard(self, address: int) -> None:
+        self.discard_range(address, address)
+
+    def discard_range(self, start: int, end: int) -> None:
+        """Remove every address from start to end (inclusive)"""
+        if self._count and 0 <= start <= end <= 0xFFFF:
+            self._count -= self.bitmap.count(1, start, end + 1)
+            self.bitmap[start:end + 1] = bytes(end + 1 - start)
+
+    def clear(self) -> None:
+        self.bitmap = NO_ADDRESSES
+        self._count = 0
+
+    def __contains__(self, address: int) -> bool:
+        return 0 <= address <= 0xFFFF and self.bitmap[address] == 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        address = self.bitmap.find(1)
+        while address >= 0:
+            yield address
+            address = self.bitmap.find(1, address + 1)
+
+    def __repr__(self) -> str:
+        return f"AddressBitmap([{', '.join(f'0x{address:04X}' for address in self)}])"
+
+    def __reduce__(self):
+        return AddressBitmap, (list(self),)
+
+
+class PagedImage:
+    """64 KB memory image kept as 256 pages, shared with other forks until written
+
+    Each entry of pages is an immutable bytes page shared with the parent and
+    siblings, or a bytearray this image owns; owned has one byte per page,
+    set once the page was copied. The first write to a shared page copies
+    just that page. Indexing, slices, find() and count() behave like the flat
+    bytearray of an unforked Memory, so the CPU and block engine use either.
+    """
+
+    __slots__ = ('pages', 'owned')
+
+    def __init__(self, pages: List[Union[bytes, bytearray]], owned: Optional[bytearray] = None):
+        self.pages = pages
+        self.owned = owned if owned is not None else bytearray(PAGE_COUNT)
+
+    def __getitem__(self, index):
+        try:
+            return self.pages[index >> 8][index & 0xFF]
+        except TypeError:
+            start, stop, step = index.indices(0x10000)
+            if step != 1:
+                return bytearray(bytes(self)[index])
+            return bytearray(b''.join(self.pages[page][max(start - (page << 8), 0):stop - (page << 8)]
+                                      for page in range(start >> 8, ((stop - 1) >> 8) + 1))
+                             if start < stop else b'')
+
+    def __setitem__(self, index, value) -> None:
+        try:
+            page = index >> 8
+        except TypeError:
+            return self._set_slice(index, value)
+        if not self.owned[page]:
+            self._own(page)
+        self.pages[page][index & 0xFF] = value
+
+    def _own(self, page: int) -> None:
+        self.pages[page] = bytearray(self.pages[page])
+        self.owned[page] = 1
+
+    def _set_slice(self, index: slice, value) -> None:
+        start, stop, step = index.indices(0x10000)
+        if isinstance(value, int):
+            raise TypeError("can assign only bytes, buffers, or iterables of ints in range(0, 256)")
+        data = bytes(value)
+        if step != 1 or len(data) != max(stop - start, 0):
+            raise ValueError("A paged memory image cannot change size")
+        address = start
+        while address < stop:
+            page = address >> 8
+            low, high = address & 0xFF, min(stop - (page << 8), PAGE_SIZE)
+            piece = data[address - start:address - start + high - low]
+            # Pages that already hold the data stay shared (restoring a snapshot into a fork)
+            if self.pages[page][low:high] != piece:
+                if not self.owned[page]:
+                    self._own(page)
+                self.pages[page][low:high] = piece
+            address = (page + 1) << 8
+
+    def __len__(self) -> int:
+        return 0x10000
+
+    def __bytes__(self) -> bytes:
+        return b''.join(self.pages)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(bytes(self))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PagedImage):
+            other = bytes(other)
+        return isinstance(other, (bytes, bytearray, memoryview)) and bytes(self) == other
+
+    __hash__ = None
+
+    def find(self, sub, start: int = 0, end: int = 0x10000) -> int:
+        found = self[start:end].find(sub)
+        return found + start if found >= 0 else found
+
+    def count(self, sub, start: int = 0, end: int = 0x10000) -> int:
+        return self[start:end].count(sub)
+
 
 class Memory:
     """8085 Memory Management Unit - 64KB addressable space"""
-    
-    def __init__(self):
-        self.memory = [0x00] * 0x10000  # 64KB memory
-        self.breakpoints = set()
+
+    def __init__(self, instrumentation: Optional[str] = None):
+        # 64KB memory: a flat bytearray, or a PagedImage for memories made by fork()
+        self.memory: Union[bytearray, PagedImage] = bytearray(0x10000)
+        self.breakpoints = AddressBitmap()  # PC breakpoints checked by CPU.run()
+        # Conditions of conditional breakpoints, evaluated only when the PC reaches them
+        self.conditions: Dict[int, Condition] = {}
         self.on_memory_write: Callable[[int, int], None] = None  # Callback for memory writes
+        # Per-byte count of compiled blocks decoded from each address; writes to a
+        # marked byte call on_code_write(address, length) so stale blocks are dropped.
+        # Shared zeros until the block engine compiles its first block here
+        self.code_marks: Union[bytes, bytearray] = NO_ADDRESSES
+        self.on_code_write: Callable[[int, int], None] = None
+        # Immutable copies of the pages last handed to forks, reused while unchanged
+        self._shared: Optional[List[bytes]] = None
+        self.journal = None  # UndoJournal fed by CPU.enable_journal()
+        self._reset_watchpoints()
+        self.set_instrumentation(instrumentation or default_instrumentation())
         logger.info("Memory initialized with 64KB space")
-    
-    def read(self, address: int) -> int:
+
+    @property
+    def paged(self) -> bool:
+        """True for memories made by fork(), which share pages with their parent"""
+        return isinstance(self.memory, PagedImage)
+
+    def owned_pages(self) -> Dict[int, bytes]:
+        """Pages this memory holds its own copy of (every page of an unforked memory)"""
+        memory = self.memory
+        if isinstance(memory, PagedImage):
+            return {page: bytes(memory.pages[page]) for page in range(PAGE_COUNT) if memory.owned[page]}
+        return {page: bytes(memory[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]) for page in range(PAGE_COUNT)}
+
+    def _shared_pages(self) -> List[bytes]:
+        """Current contents as immutable pages, reusing those unchanged since the last fork"""
+        memory = self.memory
+        shared = self._shared
+        if isinstance(memory, PagedImage):
+            current = memory.pages
+        else:
+            view = memoryview(memory)
+            current = [view[page * PAGE_SIZE:(page + 1) * PAGE_SIZE] for page in range(PAGE_COUNT)]
+        pages = []
+        for page, data in enumerate(current):
+            if isinstance(data, bytes):
+                pages.append(data)  # Still shared, so unchanged
+            elif shared is not None and shared[page] == data:
+                pages.append(shared[page])
+            else:
+                pages.append(bytes(data))
+        self._shared = pages
+        return pages
+
+    def fork(self) -> 'Memory':
+        """New memory with the same contents, sharing unmodified pages copy-on-write
+
+        The child's image is a PagedImage over the parent's pages; a write to
+        a shared page copies that one page, so a child costs its page table
+        and the pages it has written, also while it runs. Later writes on
+        either side never show through to the other. Breakpoints are copied;
+        callbacks and watchpoints are not inherited.
+        """
+        child = Memory.__new__(Memory)
+        child.memory = PagedImage(self._shared_pages())
+        child.breakpoints = AddressBitmap(self.breakpoints)
+        child.conditions = {address: condition.copy() for address, condition in self.conditions.items()}
+        child.on_memory_write = None
+        child.code_marks = NO_ADDRESSES
+        child.on_code_write = None
+        child._shared = None
+        child.journal = None
+        child._reset_watchpoints()
+        child.set_instrumentation(self.instrumentation)
+        return child
+
+    def unshare(self) -> None:
+        """Give a forked memory its own flat 64 KB image again
+
+        Reads through the page table cost a method call, so a child that will
+        run for long may be worth the copy. Compiled blocks hold the old image
+        and are dropped.
+        """
+        if self.paged:
+            if self.code_marks is not NO_ADDRESSES and self.code_marks.count(0) != len(self.code_marks):
+                self.on_code_write(0, len(self.code_marks))
+            self.memory = bytearray(bytes(self.memory))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        owned = self.memory.owned if self.paged else b'\x01' * PAGE_COUNT
+        return {'pages': self._shared_pages(), 'owned': bytes(owned), 'breakpoints': self.breakpoints,
+                'conditions': self.conditions, 'instrumentation': self.instrumentation}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        owned = bytearray(state['owned'])
+        if owned.count(0):
+            self.memory = PagedImage([bytearray(page) if owned[number] else page
+                                      for number, page in enumerate(state['pages'])], owned)
+        else:
+            self.memory = bytearray(b''.join(state['pages']))
+        self.breakpoints = state['breakpoints']
+        self.conditions = state['conditions']
+        self.on_memory_write = None
+        self.code_marks = NO_ADDRESSES
+        self.on_code_write = None
+        self._shared = None
+        self.journal = None
+        self._reset_watchpoints()
+        self.set_instrumentation(state['instrumentation'])
+
+    def set_instrumentation(self, level: str) -> None:
+        """Select the read/write implementations for an instrumentation level
+
+        Only trace installs the logging versions; off and summary use ones
+        with no logging calls at all.
+        """
+        self.instrumentation = check_instrumentation(level)
+        if level == INSTRUMENT_TRACE:
+            self.read, self.write = self._read_traced, self._write_traced
+        else:
+            self.read, self.write = self._read_quiet, self._write_quiet
+        # Instruction and operand fetches never trigger read watchpoints
+        self.fetch = self.read
+        if self.journal is not None:
+            self._write_unjournaled, self.write = self.write, self._write_journaled
+        if self.watchpoints:
+            self._read_unwatched, self.read = self.read, self._read_watched
+            self._write_unwatched, self.write = self.write, self._write_watched
+
+    def set_journal(self, journal: Optional[UndoJournal]) -> None:
+        """Record the old value of every byte written into journal (None stops recording)"""
+        self.journal = journal
+        self.set_instrumentation(self.instrumentation)
+
+    def _write_journaled(self, address: int, value: int) -> None:
+        if 0 <= address <= 0xFFFF:
+            self.journal.note_write(address, self.memory[address])
+        self._write_unjournaled(address, value)
+
+    def _read_quiet(self, address: int) -> int:
         """Read byte from memory address"""
         if 0 <= address <= 0xFFFF:
-            value = self.memory[address]
-            logger.debug(f"Memory READ: Address={address:04X}, Value={value:02X}")
-            return value
+            return self.memory[address]
         logger.error(f"Invalid memory read address: {address:04X}")
         raise ValueError(f"Invalid memory address: {address:04X}")
-    
-    def write(self, address: int, value: int) -> None:
+
+    def _write_quiet(self, address: int, value: int) -> None:
         """Write byte to memory address"""
         if 0 <= address <= 0xFFFF and 0 <= value <= 0xFF:
             self.memory[address] = value
-            logger.debug(f"Memory WRITE: Address={address:04X}, Value={value:02X}")
+            if self.code_marks[address]:
+                self.on_code_write(address, 1)
             # Notify callback if registered
             if self.on_memory_write:
                 self.on_memory_write(address, value)
         else:
             logger.error(f"Invalid memory write: addr={address:04X}, val={value:02X}")
             raise ValueError(f"Invalid memory operation: addr={address:04X}, val={value:02X}")
-    
+
+    def _read_traced(self, address: int) -> int:
+        """Read byte from memory address and log the access"""
+        value = self._read_quiet(address)
+        logger.debug(f"Memory READ: Address={address:04X}, Value={value:02X}")
+        return value
+
+    def _write_traced(self, address: int, value: int) -> None:
+        """Write byte to memory address and log the access"""
+        if 0 <= address <= 0xFFFF and 0 <= value <= 0xFF:
+            logger.debug(f"Memory WRITE: Address={address:04X}, Value={value:02X}")
+        self._write_quiet(address, value)
+
+    def add_breakpoint(self, address: int, condition: Optional[str] = None) -> None:
+        """Stop CPU.run() before the instruction at address, only when condition holds if given
+
+        See Conditions.py for the condition syntax, e.g. 'B == 0 and flag.C' or
+        'hits == 0d10000'. The condition is compiled here, once.
+        """
+        if not 0 <= address <= 0xFFFF:
+            raise ValueError(f"Invalid breakpoint address: {address:04X}")
+        if condition is not None and condition.strip():
+            self.conditions[address] = Condition(condition)
+        else:
+            self.conditions.pop(address, None)
+        self.breakpoints.add(address)
+
+    def remove_breakpoint(self, address: int) -> None:
+        self.breakpoints.discard(address)
+        self.conditions.pop(address, None)
+
+    def clear_breakpoints(self) -> None:
+        self.breakpoints.clear()
+        self.conditions.clear()
+
+    def _reset_watchpoints(self) -> None:
+        # Kind bits per address, the number of watched addresses, and the first
+        # access that hit one since CPU.run() last collected it
+        self.watch_flags: Union[bytes, bytearray] = NO_ADDRESSES
+        self.watchpoints = 0
+        self.watch_hit: Optional[Dict[str, Any]] = None
+
+    def add_watchpoint(self, start: int, end: Optional[int] = None, kind: str = 'write') -> None:
+        """Stop CPU.run() after an instruction that reads, writes or changes start..end
+
+        kind is 'read', 'write', 'change' (a write that stores a different
+        value) or 'access' (read or write); end defaults to start.
+        """
+        end = start if end is None else end
+        bits = self._watch_bits(kind)
+        if not 0 <= start <= end <= 0xFFFF:
+            raise ValueError(f"Invalid watchpoint range: {start:04X}-{end:04X}")
+        if self.watch_flags is NO_ADDRESSES:
+            self.watch_flags = bytearray(NO_ADDRESSES)
+        flags = self.watch_flags
+        for address in range(start, end + 1):
+            flags[address] |= bits
+        self._count_watchpoints()
+
+    def remove_watchpoint(self, start: int, end: Optional[int] = None, kind: Optional[str] = None) -> None:
+        """Remove watchpoints of one kind (every kind by default) from start..end"""
+        end = start if end is None else end
+        keep = ~self._watch_bits(kind) & 0xFF if kind is not None else 0
+        if not self.watchpoints or not 0 <= start <= end <= 0xFFFF:
+            return
+        flags = self.watch_flags
+        for address in range(start, end + 1):
+            flags[address] &= keep
+        self._count_watchpoints()
+
+    def clear_watchpoints(self) -> None:
+        self._reset_watchpoints()
+        self.set_instrumentation(self.instrumentation)
+
+    @staticmethod
+    def _watch_bits(kind: str) -> int:
+        if kind not in WATCH_KINDS:
+            raise ValueError(f"Invalid watchpoint kind: {kind} (expected {', '.join(WATCH_KINDS)})")
+        return WATCH_KINDS[kind]
+
+    def _count_watchpoints(self) -> None:
+        self.watchpoints = len(self.watch_flags) - self.watch_flags.count(0)
+        if not self.watchpoints:
+            self.watch_flags = NO_ADDRESSES
+        self.set_instrumentation(self.instrumentation)
+
+    def _read_watched(self, address: int) -> int:
+        value = self._read_unwatched(address)
+        if self.watch_flags[address] & WATCH_READ and self.watch_hit is None:
+            self.watch_hit = {'kind': 'read', 'address': address, 'value': value}
+        return value
+
+    def _write_watched(self, address: int, value: int) -> None:
+        old = self.memory[address] if 0 <= address <= 0xFFFF else None
+        self._write_unwatched(address, value)
+        flags = self.watch_flags[address]
+        if self.watch_hit is None and (flags & WATCH_WRITE or flags & WATCH_CHANGE and old != value):
+            kind = 'write' if flags & WATCH_WRITE else 'change'
+            self.watch_hit = {'kind': kind, 'address': address, 'old': old, 'value': value}
+
     def read_word(self, address: int) -> int:
         """Read 16-bit word (little-endian)"""
         low = self.read(address)
         high = self.read(address + 1)
         return (high << 8) | low
-    
+
     def write_word(self, address: int, value: int) -> None:
         """Write 16-bit word (little-endian)"""
         self.write(address, value & 0xFF)
         self.write(address + 1, (value >> 8) & 0xFF)
-    
+
+    def read_block(self, address: int, length: int) -> memoryview:
+        """Zero-copy view of length bytes starting at address (a copy for forked memories)"""
+        if not (0 <= address <= 0xFFFF and 0 <= length <= 0x10000 - address):
+            logger.error(f"Invalid memory block read: addr={address:04X}, len={length}")
+            raise ValueError(f"Invalid memory block: addr={address:04X}, len={length}")
+        if self.paged:
+            return memoryview(self.memory[address:address + length])
+        return memoryview(self.memory)[address:address + length]
+
+    def write_block(self, address: int, data: Union[bytes, bytearray, memoryview, List[int]]) -> None:
+        """Copy a block of bytes into memory with a single slice assignment
+
+        Block writes do not call on_memory_write; callers refresh their views afterwards.
+        """
+        length = len(data)
+        if not (0 <= address <= 0xFFFF and length <= 0x10000 - address):
+            logger.error(f"Invalid memory block write: addr={address:04X}, len={length}")
+            raise ValueError(f"Invalid memory block: addr={address:04X}, len={length}")
+        try:
+            self.memory[address:address + length] = data
+        except (TypeError, ValueError):
+            logger.error(f"Invalid memory block data at {address:04X}")
+            raise ValueError(f"Invalid memory block data at {address:04X}: values must be bytes")
+        self._check_code_write(address, length)
+
+    def fill(self, start: int, end: int, value: int) -> None:
+        """Set every byte from start to end (inclusive) to value"""
+        if not (0 <= start <= end <= 0xFFFF and 0 <= value <= 0xFF):
+            logger.error(f"Invalid memory fill: {start:04X}-{end:04X}, val={value:02X}")
+            raise ValueError(f"Invalid memory fill: {start:04X}-{end:04X}, val={value:02X}")
+        self.memory[start:end + 1] = bytes((value,)) * (end - start + 1)
+        self._check_code_write(start, end - start + 1)
+
+    def _check_code_write(self, address: int, length: int) -> None:
+        """Report a block store that touched bytes compiled blocks were decoded from"""
+        if length and self.code_marks.count(0, address, address + length) != length:
+            self.on_code_write(address, length)
+
     def load_program(self, program: List[int], start_address: int = 0x8000):
         """Load program into memory"""
-        for i, byte in enumerate(program):
-            self.write(start_address + i, byte)
+        self.write_block(start_address, program)
+        logger.debug(f"Loaded {len(program)} bytes at {start_address:04X}")
@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Optional
+
+# Rows shown by format_report() unless asked for more
+DEFAULT_TOP = 10
+
+
+class Profiler:
+    """Exact per-address and per-opcode execution and T-state counts
+
+    Attach with CPU.set_profiler(); every instruction executed by run() or
+    execute_instruction() is then counted against its address and opcode,
+    including the extra T-states of taken branches. There is no sampling, so
+    counts are exact but runs go through the one-instruction-at-a-time loop.
+    """
+
+    def __init__(self):
+        self.counts = [0] * 0x10000
+        self.cycles = [0] * 0x10000
+        self.opcode_counts = [0] * 256
+        self.opcode_cycles = [0] * 256
+
+    def reset(self) -> None:
+        """Forget everything counted so far"""
+        self.__init__()
+
+    def count(self, pc: int, opcode: int, cycles: int) -> None:
+        """Add one execution of opcode at pc that took cycles T-states"""
+        self.counts[pc] += 1
+        self.cycles[pc] += cycles
+        self.opcode_counts[opcode] += 1
+        self.opcode_cycles[opcode] += cycles
+
+    @property
+    def total_instructions(self) -> int:
+        return sum(self.opcode_counts)
+
+    @property
+    def total_cycles(self) -> int:
+        return sum(self.opcode_cycles)
+
+    def hot_addresses(self, top: Optional[int] = None) -> List[Dict[str, int]]:
+        """Executed addresses, most T-states first"""
+        rows = [{'address': pc, 'executions': count, 'cycles': self.cycles[pc]}
+                for pc, count in enumerate(self.counts) if count]
+        rows.sort(key=lambda row: (-row['cycles'], row['address']))
+        return rows[:top]
+
+    def hot_opcodes(self, mnemonics: Optional[Dict[int, str]] = None,
+                    top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Executed opcodes, most T-states first"""
+        mnemonics = mnemonics or {}
+        rows = [{'opcode': f"{opcode:02X}", 'mnemonic': mnemonics.get(opcode, f"{opcode:02X}H"),
+                 'executions': count, 'cycles': self.opcode_cycles[opcode]}
+                for opcode, count in enumerate(self.opcode_counts) if count]
+        rows.sort(key=lambda row: (-row['cycles'], row['opcode']))
+        return rows[:top]
+
+    def hot_lines(self, source_map: Dict[int, int], source_lines: List[str], load_address: int = 0x8000,
+                  top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Executions and T-states per source line, most T-states first
+
+        source_map is Assembler.source_map (offset in the machine code -> line
+        number) for code loaded at load_address. Addresses that no line
+        assembled to are reported on their own with line None.
+        """
+        total = self.total_cycles or 1
+        lines: Dict[Any, Dict[str, Any]] = {}
+        for row in self.hot_addresses():
+            number = source_map.get(row['address'] - load_address)
+            key = number if number is not None else ('address', row['address'])
+            entry = lines.get(key)
+            if entry is None:
+                source = source_lines[number - 1].split(';')[0].strip() if number is not None else ''
+                entry = lines[key] = {'line': number, 'address': f"{row['address']:04X}", 'source': source,
+                                      'executions': 0, 'cycles': 0}
+            entry['executions'] += row['executions']
+            entry['cycles'] += row['cycles']
+        rows = sorted(lines.values(), key=lambda row: (-row['cycles'], row['address']))
+        for row in rows:
+            row['percent'] = round(100 * row['cycles'] / total, 2)
+        return rows[:top]
+
+    def report(self, source_map: Dict[int, int], source_lines: List[str], load_address: int = 0x8000,
+               mnemonics: Optional[Dict[int, str]] = None, top: Optional[int] = None) -> Dict[str, Any]:
+        """JSON-ready hot lines and hot opcodes"""
+        return {
+            'instructions': self.total_instructions,
+            'cycles': self.total_cycles,
+            'lines': self.hot_lines(source_map, source_lines, load_address, top),
+            'opcodes': self.hot_opcodes(mnemonics, top),
+        }
+
+
+def format_report(report: Dict[str, Any], title: str = '') -> str:
+    """Plain-text tables of a Profiler.report()"""
+    out = []
+    if title:
+        out.append(title)
+    out.append(f"{report['instructions']} instructions, {report['cycles']} T-states")
+    out.append('')
+    out.append(f"{'Line':>5}  {'Addr':4}  {'Execs':>9}  {'T-states':>10}  {'%':>6}  Source")
+    for row in report['lines']:
+        line = row['line'] if row['line'] is not None else '-'
+        out.append(f"{line:>5}  {row['address']:4}  {row['executions']:>9}  {row['cycles']:>10}  "
+                   f"{row['percent']:>6.2f}  {row['source']}")
+    out.append('')
+    out.append(f"{'Opcode':6}  {'Mnemonic':10}  {'Execs':>9}  {'T-states':>10}")
+    for row in report['opcodes']:
+        out.append(f"{row['opcode']:6}  {row['mnemonic']:10}  {row['executions']:>9}  {row['cycles']:>10}")
+    return '\n'.join(out)
@@ -0,0 +1,150 @@
+import struct
+import zlib
+from typing import BinaryIO, Iterator, Optional, Tuple
+from Src.Utils.Logger import logger
+
+# Trace file layout: a header, then either the raw records back to back (so the
+# file can be memory-mapped) or, when compressed, a sequence of chunks each
+# prefixed by its record count and compressed length
+TRACE_MAGIC = b'8085TRC\x00'
+TRACE_VERSION = 1
+_HEADER = struct.Struct('<8sHHB')  # magic, version, record size, compressed
+_CHUNK = struct.Struct('<II')      # records, compressed bytes
+
+# One record per executed instruction, taken before it runs: PC, opcode, the two
+# bytes after it (operands where the opcode has them), A, flags, SP and CPU.cycles
+RECORD = struct.Struct('<HBBBBBHQ')
+RECORD_FIELDS = (
+    ('pc', '<u2'), ('opcode', 'u1'), ('operand1', 'u1'), ('operand2', 'u1'),
+    ('a', 'u1'), ('flags', 'u1'), ('sp', '<u2'), ('cycles', '<u8'),
+)
+
+# Records buffered in memory before a chunk is written out
+DEFAULT_CHUNK_RECORDS = 65536
+
+
+class TraceRecorder:
+    """Streams fixed-width binary instruction records to a file
+
+    Attach with CPU.set_tracer(); runs then append one RECORD per instruction
+    to an in-memory buffer that is written out, optionally zlib-compressed, each
+    time it holds chunk_records records. Read the file back with read_trace()
+    (NumPy) or iter_trace().
+    """
+
+    def __init__(self, path: str, compress: bool = False, chunk_records: int = DEFAULT_CHUNK_RECORDS,
+                 level: int = 1):
+        if chunk_records <= 0:
+            raise ValueError(f"Chunk size must be positive: {chunk_records}")
+        self.path = path
+        self.compress = compress
+        self.level = level
+        self.chunk_bytes = chunk_records * RECORD.size
+        self.pack = RECORD.pack
+        # Records not yet written; flush() empties it in place so run loops can
+        # keep a reference to it
+        self.buffer = bytearray()
+        self.records = 0
+        self.file: Optional[BinaryIO] = open(path, 'wb')
+        self.file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD.size, compress))
+
+    def record(self, cpu, pc: int) -> None:
+        """Append the record of the instruction at pc, before it executes"""
+        memory = cpu.memory.memory
+        self.buffer += self.pack(pc, memory[pc], memory[(pc + 1) & 0xFFFF], memory[(pc + 2) & 0xFFFF],
+                                 cpu.A, cpu.F, cpu.SP, cpu.cycles)
+        if len(self.buffer) >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records out as one chunk"""
+        if not self.buffer:
+            return
+        count = len(self.buffer) // RECORD.size
+        if self.compress:
+            data = zlib.compress(self.buffer, self.level)
+            self.file.write(_CHUNK.pack(count, len(data)))
+            self.file.write(data)
+        else:
+            self.file.write(self.buffer)
+        self.records += count
+        del self.buffer[:]
+
+    def close(self) -> None:
+        """Flush the last chunk and close the file"""
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+            logger.info(f"Wrote {self.records} trace records to {self.path}")
+
+    def __enter__(self) -> 'TraceRecorder':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _read_header(file: BinaryIO, path: str) -> bool:
+    """Check a trace header and return whether the file is compressed"""
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"Trace file is truncated: {path}")
+    magic, version, record_size, compressed = _HEADER.unpack(header)
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"Not an 8085 trace file: {path}")
+    if version != TRACE_VERSION or record_size != RECORD.size:
+        raise ValueError(f"Unsupported trace version {version} with {record_size}-byte records: {path}")
+    return bool(compressed)
+
+
+def _chunks(file: BinaryIO, compressed: bool) -> Iterator[bytes]:
+    """Raw record bytes of the rest of a trace file, chunk by chunk"""
+    if not compressed:
+        while True:
+            data = file.read(DEFAULT_CHUNK_RECORDS * RECORD.size)
+            if not data:
+                return
+            yield data[:len(data) - len(data) % RECORD.size]
+    while True:
+        prefix = file.read(_CHUNK.size)
+        if len(prefix) < _CHUNK.size:
+            return
+        count, length = _CHUNK.unpack(prefix)
+        data = zlib.decompress(file.read(length))
+        if len(data) != count * RECORD.size:
+            raise ValueError(f"Corrupt trace chunk: {len(data)} bytes for {count} records")
+        yield data
+
+
+def iter_trace(path: str) -> Iterator[Tuple[int, ...]]:
+    """Records of a trace file as tuples in RECORD_FIELDS order, without NumPy"""
+    with open(path, 'rb') as file:
+        for data in _chunks(file, _read_header(file, path)):
+            yield from RECORD.iter_unpack(data)
+
+
+def trace_dtype():
+    """NumPy structured dtype of one trace record"""
+    import numpy as np  # Optional dependency, only needed for array access
+    return np.dtype(list(RECORD_FIELDS))
+
+
+def read_trace(path: str):
+    """A trace file as a NumPy structured array
+
+    Uncompressed traces are memory-mapped read-only, so traces larger than
+    memory can be sliced without loading them; compressed ones are
+    decompressed into a new array.
+    """
+    import numpy as np  # Optional dependency, only needed for array access
+    dtype = trace_dtype()
+    with open(path, 'rb') as file:
+        compressed = _read_header(file, path)
+        if compressed:
+            return np.frombuffer(b''.join(_chunks(file, True)), dtype=dtype)
+        file.seek(0, 2)
+        count = (file.tell() - _HEADER.size) // RECORD.size
+    if not count:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=_HEADER.size, shape=(count,))
@@ -0,0 +1,382 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional, Tuple
+
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU, ENGINES, ENGINE_INTERPRETER
+from Src.Core.Assembler import Assembler
+from Src.Core.Clock import ClockThrottle, DEFAULT_CLOCK_HZ, SPEED_MAX, parse_speed
+from Src.Core.Trace import TraceRecorder
+from Src.Core.Profiler import Profiler, DEFAULT_TOP, format_report
+from Src.Core.Conditions import compile_condition
+from Src.Interface.ResultCache import ResultCache, DEFAULT_CACHE_BYTES, cache_key
+from Src.Utils.Logger import logger, INSTRUMENT_OFF, INSTRUMENT_SUMMARY, INSTRUMENT_TRACE, set_worker_level
+
+DEFAULT_MAX_STEPS = 10_000_000
+
+
+def parse_hex(text: str) -> int:
+    """Parse a hex number written as 9000, #9000 or 0x9000"""
+    text = text.strip().lstrip('#')
+    return int(text, 16)
+
+
+def parse_preset(text: str) -> Tuple[int, List[int]]:
+    """Parse ADDR=VAL[,VAL...] into a start address and byte values"""
+    if '=' not in text:
+        raise argparse.ArgumentTypeError(f"Expected ADDR=VAL, got: {text}")
+    addr_str, values_str = text.split('=', 1)
+    try:
+        address = parse_hex(addr_str)
+        values = [parse_hex(value) for value in values_str.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid hex in preset: {text}")
+    if not 0 <= address <= 0xFFFF or address + len(values) > 0x10000:
+        raise argparse.ArgumentTypeError(f"Preset out of memory range: {text}")
+    if any(not 0 <= value <= 0xFF for value in values):
+        raise argparse.ArgumentTypeError(f"Preset values must be bytes: {text}")
+    return address, values
+
+
+def parse_range(text: str) -> Tuple[int, int]:
+    """Parse START:END (inclusive) or a single address into a memory range"""
+    try:
+        if ':' in text:
+            start_str, end_str = text.split(':', 1)
+            start, end = parse_hex(start_str), parse_hex(end_str)
+        else:
+            start = end = parse_hex(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid memory range: {text}")
+    if not 0 <= start <= end <= 0xFFFF:
+        raise argparse.ArgumentTypeError(f"Memory range out of order or bounds: {text}")
+    return start, end
+
+
+def parse_breakpoint(text: str) -> Tuple[int, Optional[str]]:
+    """Parse ADDR or ADDR:CONDITION into a breakpoint address and condition text"""
+    addr_str, _, condition = text.partition(':')
+    try:
+        address = parse_hex(addr_str)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid breakpoint address: {text}")
+    if not 0 <= address <= 0xFFFF:
+        raise argparse.ArgumentTypeError(f"Breakpoint out of memory range: {text}")
+    condition = condition.strip() or None
+    if condition is not None:
+        try:
+            compile_condition(condition)  # Report bad conditions before any program runs
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+    return address, condition
+
+
+def expand_programs(patterns: List[str]) -> List[str]:
+    """Expand file names and glob patterns into a sorted list of programs"""
+    programs = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if matches:
+            programs.extend(matches)
+        else:
+            # Keep unmatched names so they are reported as missing files
+            programs.append(pattern)
+    return programs
+
+
+def memory_dumps(data: bytes, dumps: List[Tuple[int, int]]) -> Dict[str, List[str]]:
+    """Hex bytes of each requested range of a 64 KB memory image"""
+    view = memoryview(data)
+    return {f"{start:04X}:{end:04X}": [f"{byte:02X}" for byte in view[start:end + 1]] for start, end in dumps}
+
+
+def machine_state(cpu: CPU, dumps: List[Tuple[int, int]]) -> Dict[str, Any]:
+    """Summarize registers, flags and requested memory ranges"""
+    return {
+        'registers': {reg: f"{value:02X}" for reg, value in cpu.registers.items()},
+        'flags': {flag: int(value) for flag, value in cpu.flags.items()},
+        'pc': f"{cpu.PC:04X}",
+        'sp': f"{cpu.SP:04X}",
+        'memory': memory_dumps(cpu.memory.read_block(0, 0x10000), dumps),
+    }
+
+
+def _cacheable(job: Dict[str, Any]) -> bool:
+    """Whether a job's whole output is its final state, so a stored result can stand in for it"""
+    return (bool(job.get('cache')) and not job.get('trace_path') and not job.get('profile')
+            and job.get('speed', SPEED_MAX) is SPEED_MAX and job.get('instrumentation') != INSTRUMENT_TRACE)
+
+
+def run_file(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Assemble, load and run one program file, returning its JSON-ready result
+
+    The job dictionary holds 'program' and optionally 'presets', 'dumps',
+    'max_steps', 'max_cycles', 'load_address', 'instrumentation', 'speed',
+    'clock_hz', 'engine', 'trace_path', 'trace_compress', 'profile' and
+    'breakpoints', 'cache' and 'cache_bytes'. Any speed other than max paces the run
+    to the emulated clock; a trace_path records a binary instruction trace, a true
+    'profile' adds the hot lines and opcodes of the run (the top 'profile_top' of
+    each), and breakpoints are (address, condition or None) pairs that stop the
+    run. A 'cache' file returns the stored result of an identical earlier run
+    (same machine code, presets, limits and breakpoints) instead of simulating.
+    """
+    path = job['program']
+    load_address = job.get('load_address', 0x8000)
+    tracer = None
+    cache = key = None
+    try:
+        with open(path, 'r') as file:
+            source = file.read()
+        assembler = Assembler()
+        machine_code = assembler.assemble(source)
+        max_steps, max_cycles = job.get('max_steps', DEFAULT_MAX_STEPS), job.get('max_cycles')
+        if _cacheable(job):
+            cache = ResultCache(job['cache'], job.get('cache_bytes', DEFAULT_CACHE_BYTES))
+            key = cache_key(machine_code, load_address, job.get('presets', []), max_steps, max_cycles,
+                            job.get('breakpoints', []), job.get('engine', ENGINE_INTERPRETER))
+            lookup = time.perf_counter()
+            stored = cache.get(key)
+            if stored is not None:
+                cache.close()
+                state, image = stored
+                # Timing is the lookup's own; the stored run's would look measured
+                return {'program': path, 'success': True, **state,
+                        'elapsed': round(time.perf_counter() - lookup, 6),
+                        'memory': memory_dumps(image, job.get('dumps', [])), 'cached': True}
+        memory = Memory(job.get('instrumentation', INSTRUMENT_OFF))
+        memory.load_program(machine_code, load_address)
+        for address, values in job.get('presets', []):
+            memory.write_block(address, values)
+        cpu = CPU(memory, engine=job.get('engine', ENGINE_INTERPRETER))
+        cpu.PC = load_address
+        for address, condition in job.get('breakpoints', []):
+            memory.add_breakpoint(address, condition)
+        if job.get('trace_path'):
+            tracer = TraceRecorder(job['trace_path'], compress=job.get('trace_compress', False))
+            cpu.set_tracer(tracer)
+        if job.get('profile'):
+            cpu.set_profiler(Profiler())
+        speed = job.get('speed', SPEED_MAX)
+        if speed is SPEED_MAX:
+            summary = cpu.run(max_steps=max_steps, max_cycles=max_cycles)
+        else:
+            throttle = ClockThrottle(cpu, job.get('clock_hz', DEFAULT_CLOCK_HZ), speed)
+            summary = throttle.run(max_steps=max_steps, max_cycles=max_cycles)
+    except Exception as e:
+        logger.error(f"Headless run of {path} failed: {str(e)}")
+        if cache is not None:
+            cache.close()
+        return {'program': path, 'success': False, 'error': str(e)}
+    finally:
+        if tracer is not None:
+            tracer.close()
+
+    result = {
+        'program': path,
+        'success': True,
+        'stop_reason': summary['stop_reason'],
+        'hit': summary['hit'],
+        'instructions': summary['instructions'],
+        'cycles': summary['cycles'],
+        'elapsed': round(summary['elapsed'], 6),
+        'fusions': cpu.fusion_stats(),
+        'fast_forwarded': cpu.fast_forward_steps,
+    }
+    if cpu.profiler is not None:
+        result['profile'] = cpu.profiler.report(assembler.source_map, source.split('\n'), load_address,
+                                                assembler.mnemonics(), job.get('profile_top', DEFAULT_TOP))
+    if tracer is not None:
+        result['trace'] = tracer.path
+        result['trace_records'] = tracer.records
+    result.update(machine_state(cpu, job.get('dumps', [])))
+    if cache is not None:
+        with cache:
+            state = {name: value for name, value in result.items()
+                     if name not in ('program', 'success', 'elapsed', 'memory')}
+            cache.put(key, state, cpu.memory.read_block(0, 0x10000))
+        result['cached'] = False
+    return result
+
+
+def trace_path(directory: str, program: str) -> str:
+    """Trace file for a program under --record-trace, or None without it"""
+    if not directory:
+        return None
+    return os.path.join(directory, os.path.splitext(os.path.basename(program))[0] + '.trace')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the command-line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog='python -m Src.cli',
+        description='Run 8085 assembly programs without the GUI'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Options shared by run and profile
+    run_parser = argparse.ArgumentParser(add_help=False)
+    run_parser.add_argument('programs', nargs='+', help='.asm files or glob patterns (e.g. "AssemblyPrograms/*.asm")')
+    run_parser.add_argument('--set', dest='presets', action='append', type=parse_preset, default=[],
+                            metavar='ADDR=VAL[,VAL...]', help='Preload memory bytes (hex) before running')
+    run_parser.add_argument('--dump', dest='dumps', action='append', type=parse_range, default=[],
+                            metavar='START:END', help='Memory range (hex, inclusive) to include in the output')
+    run_parser.add_argument('--break', dest='breakpoints', action='append', type=parse_breakpoint, default=[],
+                            metavar='ADDR[:CONDITION]',
+                            help='Stop before the instruction at ADDR (hex), only when CONDITION holds if given, '
+                                 'e.g. "8014:B==0 and flag.C" or "800C:hits==0d10000"')
+    run_parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS,
+                            help=f'Instruction budget per program (default {DEFAULT_MAX_STEPS})')
+    run_parser.add_argument('--max-cycles', type=int, default=None,
+                            help='T-state budget per program (default: unlimited)')
+    run_parser.add_argument('--load-address', type=parse_hex, default=0x8000,
+                            help='Address the program is loaded at and started from (hex, default 8000)')
+    run_parser.add_argument('--speed', type=parse_speed, default=SPEED_MAX,
+                            help='max (default), realtime, or a multiple of real time such as 2x or 0.5x')
+    run_parser.add_argument('--clock', dest='clock_hz', type=int, default=DEFAULT_CLOCK_HZ,
+                            help=f'Emulated clock in Hz for --speed (default {DEFAULT_CLOCK_HZ})')
+    run_parser.add_argument('--engine', choices=ENGINES, default=ENGINE_INTERPRETER,
+                            help='interpreter (default) or blocks, which compiles straight-line code once')
+    run_parser.add_argument('--record-trace', metavar='DIR', default=None,
+                            help='Write a binary instruction trace per program to DIR/<name>.trace')
+    run_parser.add_argument('--compress-trace', action='store_true', help='zlib-compress --record-trace chunks')
+    run_parser.add_argument('--cache', metavar='FILE', default=None,
+                            help='SQLite file of earlier results; identical runs are answered from it')
+    run_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                            help='Megabytes the cache may hold before evicting least recently used results')
+    run_parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes used when running several programs')
+    run_parser.add_argument('--pretty', action='store_true', help='Indent JSON output')
+    run_parser.add_argument('--verbose', '-v', action='store_true', help='Keep simulator INFO logging and run summaries')
+    run_parser.add_argument('--trace', action='store_true',
+                            help='Log every instruction and memory access at DEBUG level (slow)')
+
+    commands.add_parser('run', parents=[run_parser], help='Assemble and run programs, printing final state as JSON')
+    profile_parser = commands.add_parser('profile', parents=[run_parser],
+                                         help='Run programs counting executions and T-states per source line')
+    profile_parser.add_argument('--top', type=int, default=DEFAULT_TOP,
+                                help=f'Lines and opcodes to report (default {DEFAULT_TOP})')
+    profile_parser.add_argument('--json', action='store_true', help='Print the full JSON result instead of tables')
+
+    grade_parser = commands.add_parser('grade', help='Grade a batch of submissions against a test spec')
+    grade_parser.add_argument('submissions', nargs='+', help='Directories of .asm files, files or glob patterns')
+    grade_parser.add_argument('--spec', required=True, help='JSON or YAML test spec (presets and expected state)')
+    grade_parser.add_argument('--report', default=None,
+                              help='Write one row per (program, vector) as it completes; .csv for CSV, else JSON Lines')
+    grade_parser.add_argument('--max-steps', type=int, default=None,
+                              help='Instruction budget per job, overriding the spec')
+    grade_parser.add_argument('--timeout', type=float, default=None,
+                              help='Wall-clock seconds per job, overriding the spec; checked between '
+                                   'slices of instructions sized to end at the deadline')
+    grade_parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                              help='Worker processes running jobs')
+    grade_parser.add_argument('--verbose', '-v', action='store_true', help='Keep simulator INFO logging')
+    return parser
+
+
+def grade_main(args: argparse.Namespace) -> int:
+    """The grade command: one JSON line of totals per submission"""
+    from Src.Interface.Grading import grade, load_spec, ReportWriter, submission_files
+
+    logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+    try:
+        spec = load_spec(args.spec)
+    except (OSError, ValueError, ImportError) as e:
+        print(json.dumps({'spec': args.spec, 'success': False, 'error': str(e)}), flush=True)
+        return 1
+    for vector in spec['vectors']:
+        if args.max_steps is not None:
+            vector['max_steps'] = args.max_steps
+        if args.timeout is not None:
+            vector['timeout'] = args.timeout
+
+    programs = submission_files(args.submissions)
+    try:
+        report = open(args.report, 'w', newline='') if args.report else None
+    except OSError as e:
+        print(json.dumps({'report': args.report, 'success': False, 'error': str(e)}), flush=True)
+        return 1
+    try:
+        writer = ReportWriter(report, 'csv' if args.report.endswith('.csv') else 'jsonl') if report else None
+        totals = grade(programs, spec, args.jobs, writer.write if writer else None)
+    finally:
+        if report is not None:
+            report.close()
+    for total in totals.values():
+        total['score'] = round(total['passed'] / total['total'], 4)
+        print(json.dumps(total), flush=True)
+    return 0 if all(total['passed'] == total['total'] for total in totals.values()) else 1
+
+
+def main(argv: List[str] = None) -> int:
+    """Command-line entry point"""
+    args = build_parser().parse_args(argv)
+    if args.command == 'grade':
+        return grade_main(args)
+
+    if args.trace:
+        level, instrumentation = logging.DEBUG, INSTRUMENT_TRACE
+    elif args.verbose:
+        level, instrumentation = logging.INFO, INSTRUMENT_SUMMARY
+    else:
+        level, instrumentation = logging.WARNING, INSTRUMENT_OFF
+    logger.setLevel(level)
+
+    programs = expand_programs(args.programs)
+    if args.record_trace:
+        os.makedirs(args.record_trace, exist_ok=True)
+    jobs = [
+        {
+            'program': path,
+            'presets': args.presets,
+            'dumps': args.dumps,
+            'breakpoints': args.breakpoints,
+            'max_steps': args.max_steps,
+            'max_cycles': args.max_cycles,
+            'load_address': args.load_address,
+            'instrumentation': instrumentation,
+            'speed': args.speed,
+            'clock_hz': args.clock_hz,
+            'engine': args.engine,
+            'trace_path': trace_path(args.record_trace, path),
+            'trace_compress': args.compress_trace,
+            'profile': args.command == 'profile',
+            'profile_top': getattr(args, 'top', DEFAULT_TOP),
+            'cache': args.cache,
+            'cache_bytes': args.cache_size * 1024 * 1024,
+        }
+        for path in programs
+    ]
+    tables = args.command == 'profile' and not args.json
+    indent = 2 if args.pretty else None
+
+    failures = 0
+    if len(jobs) == 1 or args.jobs <= 1:
+        results = map(run_file, jobs)
+        pool = None
+    else:
+        pool = Pool(min(args.jobs, len(jobs)), initializer=set_worker_level, initargs=(level,))
+        results = pool.imap(run_file, jobs)
+    try:
+        for result in results:
+            if not result['success']:
+                failures += 1
+            if tables and result['success']:
+                print(format_report(result['profile'], f"{result['program']} ({result['stop_reason']})") + '\n',
+                      flush=True)
+            else:
+                print(json.dumps(result, indent=indent), flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
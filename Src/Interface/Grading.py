@@ -0,0 +1,251 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, IO, List, Optional
+
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU, REGISTER_NAMES, STOP_HALT, STOP_STEP_LIMIT
+from Src.Core.ALU import FLAG_BITS
+from Src.Core.Assembler import Assembler
+from Src.Interface.CLI import expand_programs, parse_hex
+from Src.Utils.Logger import logger, INSTRUMENT_OFF, set_worker_level
+
+# Per-job budgets used when neither the spec nor the caller sets one
+DEFAULT_GRADE_STEPS = 1_000_000
+DEFAULT_GRADE_SECONDS = 5.0
+# Instructions run between wall-clock checks: a short first slice measures the
+# job's speed, then slices are sized to end at the deadline, never past
+# GRADE_SLICE_STEPS, so a runaway loop overshoots its time budget by little
+GRADE_FIRST_SLICE_STEPS = 1_000
+GRADE_SLICE_STEPS = 50_000
+STOP_TIMEOUT = 'timeout'
+
+# Columns of a CSV report, in order
+REPORT_FIELDS = ('program', 'vector', 'passed', 'stop_reason', 'instructions', 'cycles', 'elapsed',
+                 'failures', 'error')
+
+
+def _byte_values(value: Any, where: str) -> List[int]:
+    """Bytes from a hex string ('0F' or '05,03'), a number or a list of either"""
+    items = value if isinstance(value, list) else [value]
+    values = []
+    for item in items:
+        try:
+            if isinstance(item, str):
+                values.extend(parse_hex(part) for part in item.split(','))
+            elif isinstance(item, int) and not isinstance(item, bool):
+                values.append(item)
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"Invalid byte value in {where}: {item!r}")
+    if any(not 0 <= byte <= 0xFF for byte in values):
+        raise ValueError(f"Byte value out of range in {where}: {value!r}")
+    return values
+
+
+def _memory_map(section: Dict[str, Any], where: str) -> List[tuple]:
+    """(address, bytes) pairs from a {hex address: values} mapping"""
+    pairs = []
+    for address_text, value in (section or {}).items():
+        try:
+            address = parse_hex(str(address_text))
+        except ValueError:
+            raise ValueError(f"Invalid address in {where}: {address_text!r}")
+        values = _byte_values(value, f"{where} {address_text}")
+        if not 0 <= address <= 0xFFFF or address + len(values) > 0x10000:
+            raise ValueError(f"Address out of memory range in {where}: {address_text!r}")
+        pairs.append((address, values))
+    return pairs
+
+
+def parse_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Check a test spec and normalize it for grade()
+
+    A spec has 'vectors', each with an optional 'name', 'set' (memory to
+    preload), 'expect' ('memory', 'registers' and 'flags' to check after the
+    run) and 'max_steps'/'timeout' overriding the spec-wide defaults; the spec
+    may also give 'load_address'. Addresses and string values are hex as in
+    the CLI ('9000': '05,03'); plain numbers are used as they are.
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get('vectors'), list) or not spec['vectors']:
+        raise ValueError("Test spec needs a non-empty 'vectors' list")
+    max_steps = int(spec.get('max_steps', DEFAULT_GRADE_STEPS))
+    timeout = float(spec.get('timeout', DEFAULT_GRADE_SECONDS))
+    vectors = []
+    for number, vector in enumerate(spec['vectors'], 1):
+        name = str(vector.get('name', f"vector {number}"))
+        expect = vector.get('expect') or {}
+        registers = {}
+        for register, value in (expect.get('registers') or {}).items():
+            register = register.upper()
+            if register not in REGISTER_NAMES:
+                raise ValueError(f"Unknown register in {name}: {register}")
+            registers[register] = _byte_values(value, f"{name} register {register}")[0]
+        flags = {}
+        for flag, value in (expect.get('flags') or {}).items():
+            flag = flag.upper()
+            if flag not in FLAG_BITS:
+                raise ValueError(f"Unknown flag in {name}: {flag}")
+            flags[flag] = bool(value)
+        vectors.append({
+            'name': name,
+            'presets': _memory_map(vector.get('set'), f"{name} set"),
+            'memory': _memory_map(expect.get('memory'), f"{name} expect"),
+            'registers': registers,
+            'flags': flags,
+            'max_steps': int(vector.get('max_steps', max_steps)),
+            'timeout': float(vector.get('timeout', timeout)),
+        })
+    return {'load_address': parse_hex(str(spec.get('load_address', '8000'))), 'vectors': vectors}
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """Read and check a JSON or YAML (.yaml/.yml, needs PyYAML) test spec"""
+    with open(path, 'r') as file:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml  # Optional dependency, only needed for YAML specs
+            spec = yaml.safe_load(file)
+        else:
+            spec = json.load(file)
+    return parse_spec(spec)
+
+
+def run_vector(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one (program, vector) job and check its expectations
+
+    The job holds 'program' (its path, for the report), 'code' (assembled
+    bytes), 'load_address' and a 'vector' from parse_spec(). The run goes in
+    slices and the time budget is checked between them, each slice sized from
+    the instructions per second so far to end about at the deadline; a slice
+    is never interrupted, so the budget can be overrun by the time of one
+    instruction. Only a run that halts can pass.
+    """
+    vector = job['vector']
+    row = {'program': job['program'], 'vector': vector['name'], 'passed': False, 'stop_reason': None,
+           'instructions': 0, 'cycles': 0, 'elapsed': 0.0, 'failures': '', 'error': ''}
+    start = time.perf_counter()
+    try:
+        memory = Memory(INSTRUMENT_OFF)
+        memory.load_program(job['code'], job['load_address'])
+        for address, values in vector['presets']:
+            memory.write_block(address, values)
+        cpu = CPU(memory)
+        cpu.PC = job['load_address']
+        deadline = start + vector['timeout']
+        slice_steps = GRADE_FIRST_SLICE_STEPS
+        reason = None
+        while reason is None:
+            steps = min(slice_steps, vector['max_steps'] - row['instructions'])
+            result = cpu.run(max_steps=steps, log_summary=False)
+            row['instructions'] += result['instructions']
+            now = time.perf_counter()
+            if result['stop_reason'] != STOP_STEP_LIMIT:
+                reason = result['stop_reason']
+            elif row['instructions'] >= vector['max_steps']:
+                reason = STOP_STEP_LIMIT
+            elif now >= deadline:
+                reason = STOP_TIMEOUT
+            else:
+                rate = row['instructions'] / max(now - start, 1e-9)
+                slice_steps = max(1, min(GRADE_SLICE_STEPS, int(rate * (deadline - now))))
+        row['stop_reason'] = reason
+        row['cycles'] = cpu.cycles
+        failures = [] if reason == STOP_HALT else [f"did not halt ({reason})"]
+        for address, expected in vector['memory']:
+            actual = list(memory.read_block(address, len(expected)))
+            if actual != expected:
+                failures.append(f"{address:04X}: expected {' '.join(f'{b:02X}' for b in expected)}, "
+                                f"got {' '.join(f'{b:02X}' for b in actual)}")
+        for register, expected in vector['registers'].items():
+            actual = getattr(cpu, register)
+            if actual != expected:
+                failures.append(f"{register}: expected {expected:02X}, got {actual:02X}")
+        for flag, expected in vector['flags'].items():
+            if cpu.flags[flag] != expected:
+                failures.append(f"flag {flag}: expected {int(expected)}, got {int(cpu.flags[flag])}")
+        row['passed'] = not failures
+        row['failures'] = '; '.join(failures)
+    except Exception as e:
+        row['error'] = str(e)
+    row['elapsed'] = round(time.perf_counter() - start, 6)
+    return row
+
+
+def grade(programs: List[str], spec: Dict[str, Any], workers: int = 1,
+          on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+    """Grade every program against every vector of a parse_spec() spec
+
+    Each program is assembled once; its (program, vector) jobs then run in a
+    process pool of workers (inline for one worker), and on_result receives
+    each row as it completes, in completion order. A vector's timeout is
+    checked between slices of its run (see run_vector()), not inside one.
+    Returns per-program totals.
+    """
+    load_address = spec['load_address']
+    totals: Dict[str, Dict[str, Any]] = {}
+    jobs = []
+    rows = []
+    for path in programs:
+        totals[path] = {'program': path, 'passed': 0, 'total': len(spec['vectors']), 'error': ''}
+        try:
+            with open(path, 'r') as file:
+                code = bytes(Assembler().assemble(file.read()))
+        except Exception as e:
+            # Every vector fails the same way; report them without running anything
+            totals[path]['error'] = str(e)
+            rows.extend({'program': path, 'vector': vector['name'], 'passed': False, 'stop_reason': None,
+                         'instructions': 0, 'cycles': 0, 'elapsed': 0.0, 'failures': '', 'error': str(e)}
+                        for vector in spec['vectors'])
+            continue
+        jobs.extend({'program': path, 'code': code, 'load_address': load_address, 'vector': vector}
+                    for vector in spec['vectors'])
+
+    def report(row: Dict[str, Any]) -> None:
+        if row['passed']:
+            totals[row['program']]['passed'] += 1
+        if on_result is not None:
+            on_result(row)
+
+    for row in rows:
+        report(row)
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            report(run_vector(job))
+    else:
+        with ProcessPoolExecutor(workers, initializer=set_worker_level, initargs=(logger.level,)) as pool:
+            for future in as_completed([pool.submit(run_vector, job) for job in jobs]):
+                report(future.result())
+    return totals
+
+
+class ReportWriter:
+    """Streams result rows to a CSV or JSON Lines file, flushing each row"""
+
+    def __init__(self, file: IO[str], format: str = 'jsonl'):
+        if format not in ('csv', 'jsonl'):
+            raise ValueError(f"Invalid report format: {format} (expected csv or jsonl)")
+        self.file = file
+        self.csv = csv.DictWriter(file, REPORT_FIELDS) if format == 'csv' else None
+        if self.csv is not None:
+            self.csv.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if self.csv is not None:
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+
+def submission_files(paths: List[str]) -> List[str]:
+    """.asm files of the given directories, files and glob patterns"""
+    programs = []
+    for path in paths:
+        if os.path.isdir(path):
+            programs.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.asm')))
+        else:
+            programs.extend(expand_programs([path]))
+    return programs
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from Src.Utils.Logger import logger
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# Bump when the stored result layout changes
+CACHE_FORMAT = 2
+_CORE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Core')
+_simulator_fingerprint: Optional[str] = None
+
+
+def simulator_fingerprint() -> str:
+    """Hash of the Src/Core sources, so results cached by another simulator build never match"""
+    global _simulator_fingerprint
+    if _simulator_fingerprint is None:
+        digest = hashlib.sha256(str(CACHE_FORMAT).encode())
+        for name in sorted(os.listdir(_CORE_DIRECTORY)):
+            if name.endswith('.py'):
+                digest.update(name.encode())
+                with open(os.path.join(_CORE_DIRECTORY, name), 'rb') as file:
+                    digest.update(file.read())
+        _simulator_fingerprint = digest.hexdigest()
+    return _simulator_fingerprint
+
+
+def cache_key(machine_code: bytes, load_address: int, presets: List[Tuple[int, List[int]]],
+              max_steps: Optional[int], max_cycles: Optional[int],
+              breakpoints: List[Tuple[int, Optional[str]]] = (), engine: str = '') -> str:
+    """Content hash of everything that decides a headless run's outcome"""
+    digest = hashlib.sha256(simulator_fingerprint().encode())
+    digest.update(hashlib.sha256(bytes(machine_code)).digest())
+    digest.update(json.dumps([load_address, [[address, list(values)] for address, values in presets],
+                              max_steps, max_cycles, [list(breakpoint) for breakpoint in breakpoints],
+                              engine]).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """SQLite store of finished runs keyed by cache_key(), evicting least recently used entries
+
+    A value is the run's JSON summary (everything but the memory dumps) and
+    its final 64 KB memory image, zlib-compressed, so any dump ranges can be
+    answered from one entry. The file can be shared by several processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS results '
+            '(key TEXT PRIMARY KEY, state TEXT, memory BLOB, size INTEGER, used REAL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """The stored (summary, memory image) for key, marking it recently used, or None"""
+        row = self.connection.execute('SELECT state, memory FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0]), zlib.decompress(row[1])
+
+    def put(self, key: str, state: Dict[str, Any], memory: bytes) -> None:
+        """Store a result, then evict the least recently used entries beyond max_bytes"""
+        text = json.dumps(state)
+        image = zlib.compress(bytes(memory))
+        size = len(text) + len(image)
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                                    (key, text, image, size, time.time()))
+            total = self.size()
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in self.connection.execute('SELECT key, size FROM results ORDER BY used').fetchall():
+                    if total <= self.max_bytes or old_key == key:
+                        break
+                    self.connection.execute('DELETE FROM results WHERE key = ?', (old_key,))
+                    total -= old_size
+                    evicted += 1
+                logger.debug(f"Result cache evicted {evicted} entries")
+
+    def size(self) -> int:
+        """Bytes of stored summaries and images"""
+        return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def clear(self) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM results')
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def __enter__(self) -> 'ResultCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -7,7 +7,8 @@ from dotenv import load_dotenv
 from typing import Tuple, List, Dict, Any
 
 from Src.Core.Memory import Memory
-from Src.Core.CPU import CPU
+from Src.Core.CPU import CPU, STOP_HALT, STOP_BREAKPOINT, STOP_WATCHPOINT
+from Src.Core.Clock import ClockThrottle, parse_speed, describe_speed
 from Src.Core.Assembler import Assembler
 from Src.Utils.Logger import logger
 from Src.Utils.AIFeatures import AIFeatures
@@ -102,6 +103,10 @@ class SimulatorGUI:
         # Control variables
         self.running = False
         self.step_mode = False
+        self.speed_var = tk.StringVar(value='realtime')  # Run speed: max, realtime or Nx
+        # Undo journal for Step Back and Back to Write; off by default, since
+        # recording makes Run interpret every instruction
+        self.record_var = tk.BooleanVar(value=False)
         
         self.create_widgets()
         self.update_display()
@@ -665,6 +670,25 @@ class SimulatorGUI:
         
         tk.Button(edit_controls, text="Write", command=self.write_memory_byte, bg=theme['btn2_bg'], fg=theme['btn2_fg'], font=('Arial', 11, 'bold')).pack(side=tk.LEFT, padx=5)
         tk.Button(edit_controls, text="Read", command=self.read_memory_byte, bg=theme['btn3_bg'], fg=theme['btn3_fg'], font=('Arial', 11, 'bold')).pack(side=tk.LEFT, padx=5)
+        tk.Button(edit_controls, text="Back to Write", command=self.reverse_to_write, bg=theme['btn3_bg'], fg=theme['btn3_fg'], font=('Arial', 11, 'bold')).pack(side=tk.LEFT, padx=5)
+        
+        # Breakpoints: an address plus an optional condition such as "B==0 and flag.C"
+        break_frame = tk.LabelFrame(self.left_panel, text="Breakpoints", bg=theme['bg_panel'], fg=theme['fg_title'], font=('Arial', 14, 'bold'))
+        break_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        break_controls = tk.Frame(break_frame, bg=theme['bg_panel'])
+        break_controls.pack(fill=tk.X, padx=5, pady=5)
+        
+        tk.Label(break_controls, text="Address:", bg=theme['bg_panel'], fg=theme['fg_label'], font=('Arial', 12)).pack(side=tk.LEFT)
+        self.break_addr_entry = tk.Entry(break_controls, width=6, font=('Consolas', 12), bg=theme['entry_bg'], fg=theme['entry_fg'], insertbackground=theme['insert_bg'])
+        self.break_addr_entry.pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(break_controls, text="If:", bg=theme['bg_panel'], fg=theme['fg_label'], font=('Arial', 12)).pack(side=tk.LEFT, padx=(10,0))
+        self.break_condition_entry = tk.Entry(break_controls, width=24, font=('Consolas', 12), bg=theme['entry_bg'], fg=theme['entry_fg'], insertbackground=theme['insert_bg'])
+        self.break_condition_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        
+        tk.Button(break_controls, text="Set", command=self.set_breakpoint, bg=theme['btn2_bg'], fg=theme['btn2_fg'], font=('Arial', 11, 'bold')).pack(side=tk.LEFT, padx=5)
+        tk.Button(break_controls, text="Remove", command=self.remove_breakpoint, bg=theme['btn3_bg'], fg=theme['btn3_fg'], font=('Arial', 11, 'bold')).pack(side=tk.LEFT, padx=5)
         
         # Control buttons
         control_frame = tk.Frame(self.left_panel, bg=theme['bg_panel'])
@@ -675,9 +699,18 @@ class SimulatorGUI:
         tk.Button(control_frame, text="Assemble", command=self.assemble_code, **btn_style).pack(side=tk.LEFT, padx=2)
         tk.Button(control_frame, text="Run", command=self.run_program, **btn_style).pack(side=tk.LEFT, padx=2)
         tk.Button(control_frame, text="Step", command=self.step_program, **btn_style).pack(side=tk.LEFT, padx=2)
+        tk.Button(control_frame, text="Step Back", command=self.step_back, **btn_style).pack(side=tk.LEFT, padx=2)
+        tk.Checkbutton(control_frame, text="Record", variable=self.record_var, command=self.toggle_recording,
+                       bg=theme['bg_panel'], fg=theme['fg_label'], selectcolor=theme['bg_panel'],
+                       font=('Arial', 11, 'bold')).pack(side=tk.LEFT, padx=2)
         tk.Button(control_frame, text="Reset", command=self.reset_cpu, **btn_style).pack(side=tk.LEFT, padx=2)
         tk.Button(control_frame, text="Stop", command=self.stop_program, bg=theme['btn_stop_bg'], fg=theme['btn_stop_fg'], font=('Arial', 12, 'bold')).pack(side=tk.LEFT, padx=2)
         
+        # Emulated clock speed used by Run (3.072 MHz real time, multiples of it, or max)
+        speed_menu = tk.OptionMenu(control_frame, self.speed_var, 'realtime', '0.001x', '0.1x', '2x', '10x', 'max')
+        speed_menu.config(bg=theme['btn2_bg'], fg=theme['btn2_fg'], font=('Arial', 11, 'bold'))
+        speed_menu.pack(side=tk.LEFT, padx=2)
+        
         # Add Load and Save buttons
         tk.Button(control_frame, text="Load .asm", command=self.load_asm_file, bg=theme['btn2_bg'], fg=theme['btn2_fg'], font=('Arial', 12, 'bold')).pack(side=tk.LEFT, padx=2)
         tk.Button(control_frame, text="Save .asm", command=self.save_asm_file, bg=theme['btn2_bg'], fg=theme['btn2_fg'], font=('Arial', 12, 'bold')).pack(side=tk.LEFT, padx=2)
@@ -712,14 +745,14 @@ class SimulatorGUI:
         reg16_frame = tk.LabelFrame(right_panel, text="16-bit Registers", bg=theme['bg_panel'], fg=theme['fg_title'], font=('Arial', 14, 'bold'))
         reg16_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        reg16_info = [('PC', 'Program Counter'), ('SP', 'Stack Pointer')]
+        reg16_info = [('PC', 'Program Counter'), ('SP', 'Stack Pointer'), ('T', 'T-states Executed')]
         
         for reg, desc in reg16_info:
             frame = tk.Frame(reg16_frame, bg=theme['bg_panel'])
             frame.pack(fill=tk.X, padx=5, pady=2)
             
             tk.Label(frame, text=f"{reg}:", bg=theme['bg_panel'], fg=theme['fg_label'], font=('Consolas', 12, 'bold')).pack(side=tk.LEFT)
-            self.reg_labels[reg] = tk.Label(frame, text="0000", bg='#181c2f', fg=theme['fg_reg'], font=('Consolas', 14, 'bold'), width=6)
+            self.reg_labels[reg] = tk.Label(frame, text="0000", bg='#181c2f', fg=theme['fg_reg'], font=('Consolas', 14, 'bold'), width=10 if reg == 'T' else 6)
             self.reg_labels[reg].pack(side=tk.LEFT, padx=5)
             tk.Label(frame, text=desc, bg=theme['bg_panel'], fg=theme['fg_desc'], font=('Arial', 11)).pack(side=tk.LEFT, padx=10)
         
@@ -790,6 +823,8 @@ class SimulatorGUI:
             
             # Load into memory
             self.memory.load_program(machine_code)
+            if self.cpu.journal is not None:
+                self.cpu.journal.clear()  # Undoing past a reload would mix old and new code
             
             logger.info(f"Assembly successful - {len(machine_code)} bytes loaded")
             self.status_bar.config(text=f"Assembly successful - {len(machine_code)} bytes loaded")
@@ -810,14 +845,34 @@ class SimulatorGUI:
             
             def execute_loop():
                 try:
-                    while self.running and not self.cpu.halted:
-                        self.cpu.execute_instruction()
-                        self.root.after(0, self.update_display)
-                        time.sleep(0.1)  # Slow down for visualization
+                    speed = parse_speed(self.speed_var.get())
+                    throttle = ClockThrottle(self.cpu, speed=speed)
+                    self.status_bar.config(text=f"Running at {describe_speed(speed)}...")
+                    last_refresh = [0.0]
+                    
+                    def refresh_display(_summary):
+                        # Slices are short; repaint at most ~30 times per second
+                        now = time.perf_counter()
+                        if now - last_refresh[0] >= 1 / 30:
+                            last_refresh[0] = now
+                            self.root.after(0, self.update_display)
                     
-                    if self.cpu.halted:
+                    result = throttle.run(should_continue=lambda: self.running, on_slice=refresh_display)
+                    self.root.after(0, self.update_display)
+                    
+                    if result['stop_reason'] == STOP_HALT:
                         logger.info("Program halted")
                         self.status_bar.config(text="Program halted")
+                    elif result['stop_reason'] == STOP_BREAKPOINT:
+                        hit = result['hit']
+                        detail = f" ({hit['condition']}, hit {hit['hits']})" if 'condition' in hit else ""
+                        logger.info(f"Breakpoint hit at {self.cpu.PC:04X}{detail}")
+                        self.status_bar.config(text=f"Breakpoint at {self.cpu.PC:04X}{detail}")
+                    elif result['stop_reason'] == STOP_WATCHPOINT:
+                        hit = result['hit']
+                        logger.info(f"Watchpoint hit: {hit['kind']} of {hit['address']:04X} at {hit['pc']:04X}")
+                        self.status_bar.config(text=f"Watchpoint: {hit['kind']} of {hit['address']:04X} "
+                                                    f"by {hit['pc']:04X}")
                     else:
                         logger.info("Execution stopped by user")
                         self.status_bar.config(text="Execution stopped")
@@ -847,6 +902,54 @@ class SimulatorGUI:
             messagebox.showerror("Runtime Error", str(e))
             self.status_bar.config(text="Runtime error")
     
+    def toggle_recording(self):
+        """Start or stop recording the undo journal that Step Back rewinds through"""
+        if self.running:
+            self.record_var.set(self.cpu.journal is not None)  # The run already chose its loop
+            return
+        if self.record_var.get():
+            self.cpu.enable_journal()
+            self.status_bar.config(text="Recording for Step Back (Run interprets every instruction)")
+        else:
+            self.cpu.disable_journal()
+            self.status_bar.config(text="Recording off")
+    
+    def step_back(self):
+        """Undo the last executed instruction"""
+        if self.running:
+            return
+        if self.cpu.journal is None:
+            self.status_bar.config(text="Turn on Record to step back")
+            return
+        if self.cpu.step_back():
+            self.update_display()
+            self.update_memory_view()
+            self.status_bar.config(text=f"Stepped back to {self.cpu.PC:04X}")
+        else:
+            self.status_bar.config(text="No earlier instruction recorded")
+    
+    def reverse_to_write(self):
+        """Rewind to just before the last instruction that wrote the address in the edit box"""
+        if self.running:
+            return
+        if self.cpu.journal is None:
+            self.status_bar.config(text="Turn on Record to rewind to a write")
+            return
+        try:
+            addr = int(self.edit_addr_entry.get(), 16)
+            if not 0 <= addr <= 0xFFFF:
+                raise ValueError("Address must be between 0000-FFFF")
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid input: {str(e)}")
+            return
+        if self.cpu.reverse_to_write(addr):
+            logger.info(f"Rewound to last write of {addr:04X} at {self.cpu.PC:04X}")
+            self.update_display()
+            self.update_memory_view()
+            self.status_bar.config(text=f"Last write to {addr:04X} is at {self.cpu.PC:04X}")
+        else:
+            self.status_bar.config(text=f"No recorded write to {addr:04X}")
+    
     def stop_program(self):
         """Stop program execution"""
         logger.info("Stopping program execution")
@@ -857,7 +960,9 @@ class SimulatorGUI:
         """Reset CPU to initial state"""
         logger.info("Resetting CPU")
         self.running = False
-        self.cpu = CPU(self.memory)
+        self.cpu.reset()
+        if self.cpu.journal is not None:
+            self.cpu.journal.clear()
         self.update_display()
         self.status_bar.config(text="CPU reset")
     
@@ -871,6 +976,7 @@ class SimulatorGUI:
         # Update 16-bit registers
         self.reg_labels['PC'].config(text=f"{self.cpu.PC:04X}")
         self.reg_labels['SP'].config(text=f"{self.cpu.SP:04X}")
+        self.reg_labels['T'].config(text=str(self.cpu.cycles))
         
         # Update flags
         for flag in ['S', 'Z', 'AC', 'P', 'C']:
@@ -888,11 +994,12 @@ class SimulatorGUI:
             for row in range(16):
                 addr = start_addr + (row * 16)
                 line = f"{addr:04X}: "
+                row_bytes = self.memory.read_block(addr, min(16, 0x10000 - addr)) if addr < 0x10000 else b''
                 
                 # Display bytes
                 for col in range(16):
-                    if addr + col < 0x10000:
-                        byte = self.memory.read(addr + col)
+                    if col < len(row_bytes):
+                        byte = row_bytes[col]
                         line += f"{byte:02X} "
                     else:
                         line += "   "
@@ -900,8 +1007,8 @@ class SimulatorGUI:
                 # Display ASCII representation
                 line += "  "
                 for col in range(16):
-                    if addr + col < 0x10000:
-                        byte = self.memory.read(addr + col)
+                    if col < len(row_bytes):
+                        byte = row_bytes[col]
                         # Only show printable ASCII
                         if 32 <= byte <= 126:
                             line += chr(byte)
@@ -990,11 +1097,35 @@ class SimulatorGUI:
             logger.error(f"Invalid memory read: {str(e)}")
             messagebox.showerror("Error", f"Invalid input: {str(e)}")
     
+    def set_breakpoint(self):
+        """Set a breakpoint at the address in the breakpoint box, with its optional condition"""
+        try:
+            addr = int(self.break_addr_entry.get(), 16)
+            condition = self.break_condition_entry.get().strip() or None
+            self.memory.add_breakpoint(addr, condition)  # Compiles the condition once, here
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid breakpoint: {str(e)}")
+            return
+        suffix = f" if {condition}" if condition else ""
+        logger.info(f"Breakpoint set at {addr:04X}{suffix}")
+        self.status_bar.config(text=f"Breakpoint set at {addr:04X}{suffix} ({len(self.memory.breakpoints)} set)")
+    
+    def remove_breakpoint(self):
+        """Remove the breakpoint at the address in the breakpoint box"""
+        try:
+            addr = int(self.break_addr_entry.get(), 16)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid input: {str(e)}")
+            return
+        self.memory.remove_breakpoint(addr)
+        self.status_bar.config(text=f"Breakpoint at {addr:04X} removed ({len(self.memory.breakpoints)} set)")
+    
     def reset_memory(self):
         """Reset all memory locations to zero"""
         try:
-            for addr in range(0x10000):  # Reset all 64KB of memory
-                self.memory.write(addr, 0)
+            self.memory.fill(0x0000, 0xFFFF, 0)  # Reset all 64KB of memory
+            if self.cpu.journal is not None:
+                self.cpu.journal.clear()
             logger.info("Memory reset to zero")
             self.status_bar.config(text="Memory reset to zero")
             self.update_memory_view()
@@ -1125,7 +1256,7 @@ class SimulatorGUI:
         self.memory_text.configure(bg=theme['mem_bg'], fg=theme['mem_fg'])
         # Update register and flag value labels directly
         for reg in self.reg_labels:
-            if reg in ['PC', 'SP']:
+            if reg in ['PC', 'SP', 'T']:
                 self.reg_labels[reg].configure(bg=theme['bg_code'], fg=theme['fg_reg'])
             elif reg in ['A', 'B', 'C', 'D', 'E', 'H', 'L']:
                 self.reg_labels[reg].configure(bg=theme['bg_code'], fg=theme['fg_reg'])
@@ -12,4 +12,23 @@ def setup_logger():
     )
     return logging.getLogger(__name__)
 
-logger = setup_logger() 
\ No newline at end of file
+logger = setup_logger() 
+# Instrumentation levels for Memory and CPU
+INSTRUMENT_OFF = 'off'          # No logging on the execution paths at all
+INSTRUMENT_SUMMARY = 'summary'  # Only per-run summaries
+INSTRUMENT_TRACE = 'trace'      # Per-instruction and per-access debug output
+INSTRUMENTATION_LEVELS = (INSTRUMENT_OFF, INSTRUMENT_SUMMARY, INSTRUMENT_TRACE)
+
+def default_instrumentation() -> str:
+    """Trace when the logger is at DEBUG, summaries otherwise"""
+    return INSTRUMENT_TRACE if logger.isEnabledFor(logging.DEBUG) else INSTRUMENT_SUMMARY
+
+def check_instrumentation(level: str) -> str:
+    """Validate an instrumentation level name"""
+    if level not in INSTRUMENTATION_LEVELS:
+        raise ValueError(f"Invalid instrumentation level: {level} (expected one of {', '.join(INSTRUMENTATION_LEVELS)})")
+    return level
+
+def set_worker_level(level: int) -> None:
+    """Process-pool initializer applying the parent's log level in each worker"""
+    logger.setLevel(level)
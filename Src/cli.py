@@ -0,0 +1,9 @@
+"""
+Headless command-line entry point: python -m Src.cli run program.asm
+"""
+import sys
+
+from Src.Interface.CLI import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for the table-driven ALU
+"""
+
+from Src.Core.ALU import ALU, FLAG_S, FLAG_Z, FLAG_AC, FLAG_P, FLAG_C
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU
+
+
+def reference_flags(a: int, b: int, carry: int, subtract: bool) -> int:
+    """Flags computed bit by bit, as the ALU did before the lookup tables"""
+    result = a - b - carry if subtract else a + b + carry
+    value = result & 0xFF
+    flags = 0
+    if subtract:
+        flags |= FLAG_C if a < b + carry else 0
+        flags |= FLAG_AC if (a & 0x0F) < (b & 0x0F) + carry else 0
+    else:
+        flags |= FLAG_C if result > 0xFF else 0
+        flags |= FLAG_AC if (a & 0x0F) + (b & 0x0F) + carry > 0x0F else 0
+    flags |= FLAG_Z if value == 0 else 0
+    flags |= FLAG_S if value & 0x80 else 0
+    flags |= FLAG_P if bin(value).count('1') % 2 == 0 else 0
+    return flags
+
+
+def test_add_sub_tables_match_reference():
+    """Packed flags from the tables match the bit-by-bit definitions"""
+    for a in range(0, 256, 7):
+        for b in range(256):
+            for carry in (0, 1):
+                assert ALU.add(a, b, carry) == ((a + b + carry) & 0xFF, reference_flags(a, b, carry, False))
+                assert ALU.sub(a, b, carry) == ((a - b - carry) & 0xFF, reference_flags(a, b, carry, True))
+
+
+def test_xra_clears_accumulator():
+    """XRA A zeroes A and sets Z and P"""
+    memory = Memory()
+    memory.load_program([0x3E, 0x5A, 0xAF, 0x76])  # MVI A,5A / XRA A / HLT
+    cpu = CPU(memory)
+    cpu.run()
+    assert cpu.registers['A'] == 0
+    assert cpu.flags['Z'] and cpu.flags['P'] and not cpu.flags['C']
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for the basic-block translation cache
+"""
+
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU, STOP_HALT, STOP_STEP_LIMIT, STOP_CYCLE_LIMIT
+from Src.Core.Assembler import Assembler
+
+
+def load_example(name: str, presets: dict, engine: str) -> CPU:
+    """Assemble an example program and preload its input bytes"""
+    with open(f"AssemblyPrograms/{name}", 'r') as file:
+        machine_code = Assembler().assemble(file.read())
+    memory = Memory()
+    memory.load_program(machine_code)
+    for address, value in presets.items():
+        memory.write(address, value)
+    return CPU(memory, engine=engine)
+
+
+def machine_state(cpu: CPU) -> tuple:
+    return (dict(cpu.registers), cpu.F, cpu.PC, cpu.SP, cpu.cycles, bytes(cpu.memory.memory))
+
+
+def test_examples_match_interpreter():
+    """Every example program ends in the same state with either engine"""
+    cases = [
+        ('bubble_sort.asm', {0x9000: 5, 0x9001: 5, 0x9002: 2, 0x9003: 4, 0x9004: 1, 0x9005: 3}),
+        ('factorial.asm', {0x9000: 5}),
+        ('multiplication_example.asm', {0x9000: 5, 0x9001: 3}),
+        ('fibonacci.asm', {0x9000: 10}),
+        ('array_sum.asm', {0x9000: 3, 0x9001: 0x10, 0x9002: 0x20, 0x9003: 0x30}),
+    ]
+    for name, presets in cases:
+        interpreted = load_example(name, presets, 'interpreter')
+        compiled = load_example(name, presets, 'blocks')
+        expected = interpreted.run(max_steps=100000)
+        result = compiled.run(max_steps=100000)
+        assert result['instructions'] == expected['instructions'], name
+        assert result['stop_reason'] == expected['stop_reason'], name
+        assert machine_state(compiled) == machine_state(interpreted), name
+        assert compiled.blocks.stats['compiled'] > 0
+
+
+def test_budgets_stop_on_same_instruction():
+    """Step and cycle budgets stop mid-block exactly where the interpreter stops"""
+    presets = {0x9000: 5, 0x9001: 5, 0x9002: 2, 0x9003: 4, 0x9004: 1, 0x9005: 3}
+    for budget in ({'max_steps': 37}, {'max_cycles': 251}):
+        interpreted = load_example('bubble_sort.asm', presets, 'interpreter')
+        compiled = load_example('bubble_sort.asm', presets, 'blocks')
+        expected = interpreted.run(**budget)
+        result = compiled.run(**budget)
+        assert result['stop_reason'] in (STOP_STEP_LIMIT, STOP_CYCLE_LIMIT)
+        assert (result['instructions'], result['cycles']) == (expected['instructions'], expected['cycles'])
+        assert machine_state(compiled) == machine_state(interpreted)
+        assert compiled.run()['stop_reason'] == STOP_HALT
+
+
+def test_self_modifying_code_invalidates_blocks():
+    """A store into compiled code drops the block so the new bytes run"""
+    memory = Memory()
+    # loop: INR B / MVI A,14 / STA 8000 / DCR E / JNZ loop / HLT
+    # The STA rewrites the first instruction to INR D after the first pass
+    memory.load_program([0x04, 0x3E, 0x14, 0x32, 0x00, 0x80, 0x1D, 0xC2, 0x00, 0x80, 0x76])
+    cpu = CPU(memory, engine='blocks')
+    cpu.E = 3
+    cpu.run()
+    assert (cpu.B, cpu.D) == (1, 2)
+    assert cpu.blocks.stats['invalidated'] >= 1
+
+    # Rewriting code from outside the CPU invalidates as well
+    cpu.reset()
+    memory.write_block(0x8000, [0x06, 0x07, 0x76])  # MVI B,07 / HLT
+    cpu.run()
+    assert cpu.B == 0x07 and cpu.halted
+
+
+def test_lazy_flags_match_interpreter():
+    """Flags read by branches, carry-in, PUSH PSW and DAA match the eager interpreter"""
+    program = [
+        0x3E, 0x99, 0xC6, 0x01, 0x27,  # MVI A,99 / ADI 01 / DAA (carry and AC out)
+        0x05, 0x88, 0xF5,              # DCR B (keeps carry) / ADC B / PUSH PSW
+        0x0E, 0x0F, 0xA1, 0x04,        # MVI C,0F / ANA C / INR B
+        0xDA, 0x13, 0x80,              # JC 8013 (carry from ANA is clear)
+        0xFE, 0x10, 0xF1, 0x17,        # CPI 10 / POP PSW / RAL
+        0x76,                          # HLT
+    ]
+    states = []
+    for engine in ('interpreter', 'blocks'):
+        memory = Memory()
+        memory.load_program(program)
+        cpu = CPU(memory, engine=engine)
+        cpu.SP = 0x9100
+        cpu.run()
+        states.append(machine_state(cpu))
+    assert states[0] == states[1]
+
+def test_bulk_loops_match_interpreter():
+    """Fill, sum and scan loops run in bulk and end in the interpreter's state"""
+    programs = [
+        # LXI H,9000 / MVI B,00 / loop: MVI M,AA / INX H / DCR B / JNZ loop / HLT
+        [0x21, 0x00, 0x90, 0x06, 0x00, 0x36, 0xAA, 0x23, 0x05, 0xC2, 0x05, 0x80, 0x76],
+        # LXI H,9000 / LXI B,0300 / loop: MOV M,E / INX H / DCX B / MOV A,B / ORA C / JNZ loop / HLT
+        [0x21, 0x00, 0x90, 0x01, 0x00, 0x03, 0x73, 0x23, 0x0B, 0x78, 0xB1, 0xC2, 0x06, 0x80, 0x76],
+        # LXI H,9000 / MVI C,C8 / XRA A / loop: ADD M / DCR C / INX H / JNZ loop / HLT
+        [0x21, 0x00, 0x90, 0x0E, 0xC8, 0xAF, 0x86, 0x0D, 0x23, 0xC2, 0x06, 0x80, 0x76],
+    ]
+    for program in programs:
+        states = []
+        for engine in ('interpreter', 'blocks'):
+            memory = Memory()
+            memory.load_program(program)
+            memory.write_block(0x9000, bytes(range(1, 201)))
+            cpu = CPU(memory, engine=engine)
+            cpu.E = 0x5A
+            result = cpu.run()
+            states.append((result['instructions'], machine_state(cpu)))
+        assert states[0] == states[1]
+        assert cpu.blocks.stats['bulk_loops'] == 1
+
+    presets = {0x9000 + index: byte for index, byte in enumerate(b'HELLO, WORLD')}
+    for budget in ({}, {'max_steps': 29}, {'max_cycles': 300}):
+        interpreted = load_example('string_length.asm', presets, 'interpreter')
+        compiled = load_example('string_length.asm', presets, 'blocks')
+        expected = interpreted.run(**budget)
+        result = compiled.run(**budget)
+        assert (result['instructions'], result['cycles']) == (expected['instructions'], expected['cycles'])
+        assert machine_state(compiled) == machine_state(interpreted)
+    assert compiled.run()['stop_reason'] == STOP_HALT
+    assert compiled.memory.read(0x9100) == 12
+
+
+def test_set_engine_rejects_unknown_names():
+    """Only the interpreter and block engines exist"""
+    cpu = CPU(Memory())
+    assert cpu.engine == 'interpreter' and cpu.blocks is None
+    cpu.set_engine('blocks')
+    assert cpu.blocks is not None
+    try:
+        cpu.set_engine('jit')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown engine was accepted")
+
+
+if __name__ == "__main__":
+    test_examples_match_interpreter()
+    test_budgets_stop_on_same_instruction()
+    test_self_modifying_code_invalidates_blocks()
+    test_lazy_flags_match_interpreter()
+    test_bulk_loops_match_interpreter()
+    test_set_engine_rejects_unknown_names()
+    print("✅ All block cache tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless command-line runner
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+
+from Src.Interface.CLI import main, parse_breakpoint, parse_preset, parse_range, run_file
+from Src.Interface.ResultCache import ResultCache
+
+
+def test_parse_arguments():
+    """Presets and dump ranges are parsed as hex"""
+    assert parse_preset('9000=05') == (0x9000, [0x05])
+    assert parse_preset('#9001=05,02,0A') == (0x9001, [0x05, 0x02, 0x0A])
+    assert parse_range('9001:9005') == (0x9001, 0x9005)
+    assert parse_range('9100') == (0x9100, 0x9100)
+    assert parse_breakpoint('800C') == (0x800C, None)
+    assert parse_breakpoint('#800C: C==1 and flag.Z==0') == (0x800C, 'C==1 and flag.Z==0')
+    with pytest.raises(Exception):
+        parse_breakpoint('800C:foo==1')
+
+
+def test_run_file_reports_state():
+    """A program runs to HLT and its memory range is reported"""
+    job = {
+        'program': 'AssemblyPrograms/multiplication_example.asm',
+        'presets': [(0x9000, [0x05, 0x03])],
+        'dumps': [(0x9002, 0x9002)],
+        'max_steps': 10000,
+    }
+    result = run_file(job)
+    assert result['success']
+    assert result['stop_reason'] == 'halt'
+    assert result['cycles'] > result['instructions']
+    assert run_file(dict(job, max_cycles=50))['stop_reason'] == 'max_cycles'
+    assert result['memory'] == {'9002:9002': ['0F']}
+
+
+def test_main_prints_json_lines(capsys):
+    """Several programs produce one JSON document per line"""
+    code = main(['run', 'AssemblyPrograms/factorial.asm', 'missing.asm', '--set', '9000=05', '--dump', '9001', '-j', '1'])
+    lines = capsys.readouterr().out.strip().splitlines()
+    results = [json.loads(line) for line in lines]
+    assert code == 1
+    assert results[0]['memory'] == {'9001:9001': ['78']}
+    assert not results[1]['success']
+
+
+def test_conditional_breakpoint(capsys):
+    """--break stops a run once its condition holds and reports the hit"""
+    assert main(['run', 'AssemblyPrograms/multiplication_example.asm', '--set', '9000=05,03',
+                 '--break', '800C:hits==0d3']) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['stop_reason'] == 'breakpoint'
+    assert result['hit'] == {'kind': 'breakpoint', 'address': 0x800C, 'condition': 'hits==0d3', 'hits': 3}
+    assert result['registers']['A'] == '0A' and result['registers']['C'] == '01'
+
+
+def test_result_cache():
+    """An identical run is answered from the cache; other inputs or limits run again"""
+    with tempfile.TemporaryDirectory() as directory:
+        job = {
+            'program': 'AssemblyPrograms/multiplication_example.asm',
+            'presets': [(0x9000, [0x05, 0x03])],
+            'dumps': [(0x9002, 0x9002)],
+            'max_steps': 10000,
+            'cache': os.path.join(directory, 'results.db'),
+        }
+        first = run_file(job)
+        assert not first['cached']
+        second = run_file(dict(job, dumps=[(0x9000, 0x9002)]))
+        assert second['cached'] and second['memory'] == {'9000:9002': ['05', '03', '0F']}
+        assert {k: v for k, v in second.items() if k not in ('cached', 'memory', 'elapsed')} == \
+            {k: v for k, v in first.items() if k not in ('cached', 'memory', 'elapsed')}
+        assert second['elapsed'] < 0.1
+        assert not run_file(dict(job, presets=[(0x9000, [0x05, 0x04])]))['cached']
+        assert not run_file(dict(job, max_steps=20))['cached']
+        assert 'cached' not in run_file(dict(job, cache=None))
+
+        # Least recently used entries go once the store is over its size
+        with ResultCache(os.path.join(directory, 'small.db'), max_bytes=600) as cache:
+            for key in ('a', 'b', 'c'):
+                cache.put(key, {'key': key}, bytes(range(256)) * 2)
+            assert cache.get('a') is None and cache.get('c') is not None
+            assert cache.size() <= 600
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for clock-rate throttled execution
+"""
+
+import time
+
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU, STOP_HALT
+from Src.Core.Clock import ClockThrottle, STOP_REQUESTED, SPEED_MAX, parse_speed
+
+
+def delay_loop_cpu(count: int) -> CPU:
+    """MVI B,count / loop: DCR B / JNZ loop / HLT"""
+    memory = Memory()
+    memory.load_program([0x06, count, 0x05, 0xC2, 0x02, 0x80, 0x76])
+    return CPU(memory)
+
+
+def test_parse_speed():
+    """Speeds are max, real time or a multiple of real time"""
+    assert parse_speed('max') is SPEED_MAX
+    assert parse_speed('realtime') == 1.0
+    assert parse_speed('2x') == 2.0 and parse_speed('0.5') == 0.5
+    for bad in ('fast', '0x', '-1'):
+        try:
+            parse_speed(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"invalid speed accepted: {bad}")
+
+
+def test_real_time_pacing():
+    """A delay loop takes the wall time its T-states need at the emulated clock"""
+    cpu = delay_loop_cpu(0xFF)  # 3579 T-states
+    start = time.perf_counter()
+    result = ClockThrottle(cpu, clock_hz=35_790, slice_seconds=0.01).run()
+    wall = time.perf_counter() - start
+    assert result['stop_reason'] == STOP_HALT
+    assert result['cycles'] == 3579
+    assert abs(result['emulated_seconds'] - 0.1) < 1e-9
+    assert 0.08 <= wall <= 0.3
+    assert result['slices'] >= 9
+
+
+def test_max_speed_and_stop_request():
+    """Max speed does not sleep and should_continue() ends a run between slices"""
+    cpu = delay_loop_cpu(0xFF)
+    result = ClockThrottle(cpu, speed=SPEED_MAX).run()
+    assert result['stop_reason'] == STOP_HALT and result['elapsed'] < 0.1
+    cpu.reset()
+    result = ClockThrottle(cpu, clock_hz=1000).run(should_continue=lambda: cpu.cycles < 50)
+    assert result['stop_reason'] == STOP_REQUESTED
+    assert not cpu.halted
+
+
+if __name__ == "__main__":
+    test_parse_speed()
+    test_real_time_pacing()
+    test_max_speed_and_stop_request()
+    print("✅ All clock tests passed!")
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Tests for headless program execution with CPU.run()
+"""
+
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU, CYCLES, STOP_HALT, STOP_STEP_LIMIT, STOP_BREAKPOINT, STOP_CYCLE_LIMIT, STOP_WATCHPOINT
+from Src.Core.Assembler import Assembler
+
+
+def load_example(name: str, presets: dict) -> CPU:
+    """Assemble an example program and preload its input bytes"""
+    with open(f"AssemblyPrograms/{name}", 'r') as file:
+        machine_code = Assembler().assemble(file.read())
+    memory = Memory()
+    memory.load_program(machine_code)
+    for address, value in presets.items():
+        memory.write(address, value)
+    return CPU(memory)
+
+
+def test_run_to_halt():
+    """Bubble sort runs to HLT and sorts the array"""
+    cpu = load_example('bubble_sort.asm', {0x9000: 5, 0x9001: 5, 0x9002: 2, 0x9003: 4, 0x9004: 1, 0x9005: 3})
+    result = cpu.run()
+    assert result['stop_reason'] == STOP_HALT
+    assert cpu.halted
+    assert [cpu.memory.read(0x9001 + i) for i in range(5)] == [1, 2, 3, 4, 5]
+
+
+def test_run_matches_single_stepping():
+    """run() leaves the machine in the same state as execute_instruction()"""
+    fast = load_example('factorial.asm', {0x9000: 5})
+    slow = load_example('factorial.asm', {0x9000: 5})
+    result = fast.run()
+    steps = 0
+    while slow.execute_instruction():
+        steps += 1
+    assert result['instructions'] == steps
+    assert fast.registers == slow.registers
+    assert fast.flags == slow.flags
+    assert fast.PC == slow.PC
+    assert fast.memory.read(0x9001) == 0x78
+
+
+def test_step_budget_and_resume():
+    """A step budget pauses the run and a second run() continues it"""
+    cpu = load_example('factorial.asm', {0x9000: 5})
+    first = cpu.run(max_steps=10)
+    assert first['stop_reason'] == STOP_STEP_LIMIT
+    assert first['instructions'] == 10
+    assert not cpu.halted
+    cpu.run()
+    assert cpu.memory.read(0x9001) == 0x78
+
+
+def test_breakpoint_stops_before_instruction():
+    """A breakpoint stops the run before the instruction at that address"""
+    cpu = load_example('multiplication_example.asm', {0x9000: 5, 0x9001: 3})
+    cpu.memory.breakpoints.add(0x800C)
+    result = cpu.run()
+    assert result['stop_reason'] == STOP_BREAKPOINT
+    assert cpu.PC == 0x800C
+    assert result['hit'] == {'kind': 'breakpoint', 'address': 0x800C}
+    # Continuing from the breakpoint executes it and stops on the next pass
+    result = cpu.run()
+    assert result['stop_reason'] == STOP_BREAKPOINT
+    assert result['instructions'] == 3
+    cpu.memory.breakpoints.clear()
+    assert cpu.run()['stop_reason'] == STOP_HALT
+    assert cpu.memory.read(0x9002) == 0x0F
+
+
+def test_conditional_breakpoints():
+    """A conditional breakpoint stops only when its condition holds, counting every arrival"""
+    cpu = load_example('multiplication_example.asm', {0x9000: 5, 0x9001: 3})
+    cpu.memory.add_breakpoint(0x800C, 'C == 1 and M[9000] == 5 and flag.Z == 0')
+    result = cpu.run()
+    assert result['stop_reason'] == STOP_BREAKPOINT and cpu.C == 1 and cpu.A == 10
+    assert result['hit'] == {'kind': 'breakpoint', 'address': 0x800C,
+                             'condition': 'C == 1 and M[9000] == 5 and flag.Z == 0', 'hits': 3}
+    assert cpu.run()['stop_reason'] == STOP_HALT
+
+    # Stop on the 200th pass of a loop without stepping through the first 199
+    cpu = load_example('multiplication_example.asm', {0x9000: 1, 0x9001: 0xFF})
+    cpu.memory.add_breakpoint(0x800D, 'hits == 0d200')
+    result = cpu.run()
+    assert result['hit']['hits'] == 200 and cpu.A == 200
+    cpu.memory.add_breakpoint(0x800D)  # Unconditional again
+    assert cpu.run()['instructions'] == 3
+    cpu.memory.remove_breakpoint(0x800D)
+    assert cpu.run()['stop_reason'] == STOP_HALT and not cpu.memory.conditions
+
+
+def test_watchpoints_stop_after_the_access():
+    """Read, write and change watchpoints stop after the instruction that hit them"""
+    cpu = load_example('multiplication_example.asm', {0x9000: 5, 0x9001: 3})
+    cpu.memory.add_watchpoint(0x9000, kind='read')
+    cpu.memory.add_watchpoint(0x9002, kind='change')
+    cpu.memory.add_watchpoint(0x8003, kind='access')  # LDA's operand: fetches never count
+    result = cpu.run()
+    assert result['stop_reason'] == STOP_WATCHPOINT
+    assert result['hit'] == {'kind': 'read', 'address': 0x9000, 'value': 5, 'pc': 0x8002}
+    assert cpu.PC == 0x8005 and cpu.A == 5
+    result = cpu.run()
+    assert result['hit'] == {'kind': 'change', 'address': 0x9002, 'old': 0, 'value': 0x0F, 'pc': 0x8011}
+    assert cpu.run()['stop_reason'] == STOP_HALT
+
+    # Storing the value already there is a write but not a change
+    cpu = load_example('multiplication_example.asm', {0x9000: 5, 0x9001: 3, 0x9002: 0x0F})
+    cpu.memory.add_watchpoint(0x9002, kind='change')
+    assert cpu.run()['stop_reason'] == STOP_HALT
+    cpu.reset()
+    cpu.memory.add_watchpoint(0x9002, kind='write')
+    assert cpu.run()['hit']['kind'] == 'write'
+
+    # A range catches the first swap; removing it lets the sort finish
+    cpu = load_example('bubble_sort.asm', {0x9000: 4, 0x9001: 1, 0x9002: 3, 0x9003: 2, 0x9004: 4})
+    cpu.memory.add_watchpoint(0x9001, 0x9004)
+    result = cpu.run()
+    assert result['hit']['address'] == 0x9003 and result['hit']['old'] == 2 and result['hit']['value'] == 3
+    cpu.memory.remove_watchpoint(0x9001, 0x9004)
+    assert not cpu.memory.watchpoints
+    assert cpu.run()['stop_reason'] == STOP_HALT
+    assert bytes(cpu.memory.read_block(0x9001, 4)) == bytes([1, 2, 3, 4])
+
+
+def test_unknown_opcode_and_reset():
+    """Unimplemented opcodes raise and reset() restores the power-on state"""
+    cpu = load_example('factorial.asm', {0x9000: 5})
+    cpu.run()
+    assert CPU.instruction_set is cpu.instruction_set
+    cpu.reset()
+    assert not cpu.halted
+    assert cpu.PC == 0x8000 and cpu.SP == 0xFFFF
+    assert set(cpu.registers.values()) == {0}
+    assert not any(cpu.flags.values())
+    cpu.memory.write(0x8000, 0xDD)  # Not an 8085 opcode
+    try:
+        cpu.run()
+    except ValueError as e:
+        assert 'DD' in str(e) and '8000' in str(e)
+    else:
+        raise AssertionError("unknown opcode was executed")
+
+
+def test_psw_round_trip_and_views():
+    """PUSH PSW/POP PSW move A and the packed flags as one word"""
+    memory = Memory()
+    # MVI A,80 / ADI 80 / PUSH PSW / MVI A,00 / ADI 01 / POP PSW / HLT
+    memory.load_program([0x3E, 0x80, 0xC6, 0x80, 0xF5, 0x3E, 0x00, 0xC6, 0x01, 0xF1, 0x76])
+    cpu = CPU(memory)
+    cpu.SP = 0x9100
+    cpu.run()
+    assert memory.read_word(0x90FE) == 0x0045  # A=00, flags Z P C
+    assert cpu.get_psw() == 0x0045
+    assert dict(cpu.flags) == {'S': False, 'Z': True, 'AC': False, 'P': True, 'C': True}
+    try:
+        cpu.registers['A'] = 1
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("register view accepted a write")
+    cpu.set_register('A', 0x42)
+    assert cpu.registers['A'] == 0x42
+
+
+def test_cycle_counting_and_budget():
+    """T-states follow the 8085 timing sheet, including taken/not-taken branches"""
+    memory = Memory()
+    # MVI B,05 / loop: DCR B / JNZ loop / HLT
+    memory.load_program([0x06, 0x05, 0x05, 0xC2, 0x02, 0x80, 0x76])
+    cpu = CPU(memory)
+    result = cpu.run()
+    assert result['cycles'] == cpu.cycles == 7 + 5 * 4 + 4 * 10 + 7 + 5
+    cpu.reset()
+    assert cpu.cycles == 0
+    result = cpu.run(max_cycles=20)
+    assert result['stop_reason'] == STOP_CYCLE_LIMIT
+    assert result['cycles'] == 21  # MVI, DCR, taken JNZ: first boundary past 20
+    steps = CPU(memory)
+    while steps.execute_instruction():
+        pass
+    assert steps.cycles == 79
+    assert (CYCLES[0xCD], CYCLES[0xC4], CYCLES[0xC0], CYCLES[0x7E], CYCLES[0x34]) == (18, 9, 6, 7, 10)
+
+
+def test_conditional_call_and_return():
+    """CZ/RNZ take the branch only when the condition holds and add its T-states"""
+    memory = Memory()
+    # XRA A / CNZ 8010 / CZ 8010 / HLT ... 8010: RNZ / RZ
+    memory.load_program([0xAF, 0xC4, 0x10, 0x80, 0xCC, 0x10, 0x80, 0x76])
+    memory.load_program([0xC0, 0xC8], 0x8010)
+    cpu = CPU(memory)
+    cpu.SP = 0x9100
+    cpu.run()
+    assert cpu.PC == 0x8008 and cpu.SP == 0x9100
+    assert cpu.cycles == 4 + 9 + 18 + 6 + 12 + 5
+
+
+def test_superinstructions_match_single_stepping():
+    """Fused pairs have the same effects as the two instructions and count as two steps"""
+    presets = {0x9000: 5, 0x9001: 5, 0x9002: 2, 0x9003: 4, 0x9004: 1, 0x9005: 3}
+    fast = load_example('bubble_sort.asm', presets)
+    slow = load_example('bubble_sort.asm', presets)
+    result = fast.run()
+    steps = 0
+    while slow.execute_instruction():
+        steps += 1
+    assert result['instructions'] == steps
+    assert (fast.registers, fast.F, fast.PC, fast.cycles) == (slow.registers, slow.F, slow.PC, slow.cycles)
+    stats = fast.fusion_stats()
+    assert stats['CMP M; JC'] > 0 and stats['MOV A,M; INX H'] > 0
+    assert not slow.fusion_stats()
+    # A budget that ends between the two halves of a pair stops on exactly that step
+    for budget in range(1, 30):
+        cpu = load_example('bubble_sort.asm', presets)
+        assert cpu.run(max_steps=budget)['instructions'] == budget
+        single = load_example('bubble_sort.asm', presets)
+        for _ in range(budget):
+            single.execute_instruction()
+        assert (cpu.registers, cpu.PC, cpu.cycles) == (single.registers, single.PC, single.cycles)
+    fast.reset()
+    assert not fast.fusion_stats()
+
+
+def test_delay_and_poll_loops_fast_forward():
+    """Delay loops finish in one step with exact T-states; polls spin up to the budget"""
+    memory = Memory()
+    # LXI B,FFFF / loop: DCX B / MOV A,B / ORA C / JNZ loop / HLT
+    memory.load_program([0x01, 0xFF, 0xFF, 0x0B, 0x78, 0xB1, 0xC2, 0x03, 0x80, 0x76])
+    cpu = CPU(memory)
+    result = cpu.run()
+    assert result['stop_reason'] == STOP_HALT
+    assert result['instructions'] == 2 + 4 * 0xFFFF
+    assert result['cycles'] == 10 + 0xFFFF * 24 - 3 + 5
+    assert cpu.fast_forward_steps > 0xFFFF and (cpu.B, cpu.C, cpu.A) == (0, 0, 0)
+    # A step budget inside the loop stops on the same instruction as single stepping
+    for budget in (7, 1000, 20001):
+        cpu.reset()
+        cpu.run(max_steps=budget)
+        single = CPU(memory)
+        for _ in range(budget):
+            single.execute_instruction()
+        assert (cpu.registers, cpu.F, cpu.PC, cpu.cycles) == (single.registers, single.F, single.PC, single.cycles)
+
+    # MVI C,00 (256 iterations) / loop: DCR C / JNZ loop / HLT
+    memory.load_program([0x0E, 0x00, 0x0D, 0xC2, 0x02, 0x80, 0x76])
+    cpu = CPU(memory)
+    assert cpu.run()['cycles'] == 7 + 256 * 14 - 3 + 5
+
+    # loop: LDA 9000 / ANA A / JZ loop, with 9000 clear: spins until the budget
+    memory.load_program([0x3A, 0x00, 0x90, 0xA7, 0xCA, 0x00, 0x80, 0x76])
+    cpu = CPU(memory)
+    result = cpu.run(max_steps=3_000_000)
+    assert result['stop_reason'] == STOP_STEP_LIMIT and result['cycles'] == 1_000_000 * 27
+    assert cpu.PC == 0x8000
+
+
+def test_instrumentation_levels(caplog):
+    """Trace logs every instruction and access; off and summary log nothing per step"""
+    import logging
+    cpu = load_example('factorial.asm', {0x9000: 5})
+    cpu.set_instrumentation('off')
+    assert cpu.memory.read == cpu.memory._read_quiet
+    with caplog.at_level(logging.DEBUG, logger='Src.Utils.Logger'):
+        cpu.run(max_steps=20)
+        assert not caplog.records
+        cpu.set_instrumentation('trace')
+        assert cpu.memory.instrumentation == 'trace'
+        cpu.run()
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith('Executing instruction at PC=') for message in messages)
+    assert any(message.startswith('Memory WRITE: Address=9001') for message in messages)
+    assert messages[-1].startswith('Run stopped (halt)')
+    assert cpu.memory.read(0x9001) == 0x78
+    try:
+        cpu.set_instrumentation('verbose')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown instrumentation level was accepted")
+
+def test_step_back_and_reverse_to_write():
+    """The undo journal rewinds registers, flags, cycles and memory writes"""
+    presets = {0x9000: 5, 0x9001: 5, 0x9002: 2, 0x9003: 4, 0x9004: 1, 0x9005: 3}
+    cpu = load_example('bubble_sort.asm', presets)
+    cpu.enable_journal(capacity=1000)
+    history = []
+    for _ in range(60):
+        history.append((cpu.get_state(), bytes(cpu.memory.memory)))
+        cpu.execute_instruction()
+    stepped = (cpu.get_state(), bytes(cpu.memory.memory))
+    cpu.run(max_steps=40)
+    assert len(cpu.journal) == 100
+
+    assert cpu.step_back(40) == 40
+    assert (cpu.get_state(), bytes(cpu.memory.memory)) == stepped
+    for state, image in reversed(history):
+        assert cpu.step_back() == 1
+        assert cpu.get_state() == state and bytes(cpu.memory.memory) == image
+    assert cpu.step_back(5) == 0
+
+    # Run to the end, then go back to the instruction that last stored into 9005
+    result = cpu.run()
+    assert result['stop_reason'] == STOP_HALT and cpu.memory.read(0x9005) == 5
+    assert cpu.reverse_to_write(0x9005)
+    assert not cpu.halted and cpu.memory.read(0x9005) != 5
+    cpu.execute_instruction()
+    assert cpu.memory.read(0x9005) == 5
+    assert not cpu.reverse_to_write(0x1234)
+
+    # A bounded journal keeps only the newest entries
+    cpu = load_example('bubble_sort.asm', presets)
+    cpu.enable_journal(capacity=10)
+    result = cpu.run()
+    assert len(cpu.journal) == 10 and cpu.step_back(50) == 10
+    assert cpu.PC != 0x8000
+
+
+if __name__ == "__main__":
+    test_run_to_halt()
+    test_run_matches_single_stepping()
+    test_step_budget_and_resume()
+    test_breakpoint_stops_before_instruction()
+    test_conditional_breakpoints()
+    test_watchpoints_stop_after_the_access()
+    test_unknown_opcode_and_reset()
+    test_psw_round_trip_and_views()
+    test_cycle_counting_and_budget()
+    test_conditional_call_and_return()
+    test_superinstructions_match_single_stepping()
+    test_delay_and_poll_loops_fast_forward()
+    test_step_back_and_reverse_to_write()
+    print("✅ All CPU.run tests passed!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for batch grading of submissions against a test spec
+"""
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+
+from Src.Core.Assembler import Assembler
+from Src.Interface.CLI import main
+from Src.Interface.Grading import grade, load_spec, parse_spec, run_vector, STOP_TIMEOUT
+
+SPEC = 'AssemblyPrograms/multiplication_tests.json'
+
+
+def make_submissions(directory: str) -> dict:
+    """A correct, a wrong, a looping and an unassemblable submission"""
+    with open('AssemblyPrograms/multiplication_example.asm', 'r') as file:
+        correct = file.read()
+    sources = {
+        'correct.asm': correct,
+        'wrong.asm': correct.replace('MVI A,#00    ; Initialize A register to 0 (800A)', 'MVI A,#01'),
+        'loops.asm': 'LOOP: JMP LOOP\nHLT\n',
+        'broken.asm': 'FOO A,B\n',
+    }
+    paths = {}
+    for name, source in sources.items():
+        paths[name] = os.path.join(directory, name)
+        with open(paths[name], 'w') as file:
+            file.write(source)
+    return paths
+
+
+def test_parse_spec():
+    """Spec addresses and strings are hex; bad specs are refused"""
+    spec = load_spec(SPEC)
+    assert spec['load_address'] == 0x8000
+    first = spec['vectors'][0]
+    assert first['presets'] == [(0x9000, [0x05, 0x03])]
+    assert first['memory'] == [(0x9002, [0x0F])] and first['registers'] == {'A': 0x0F}
+    assert first['max_steps'] == 100000 and first['timeout'] == 2
+    for bad in ({}, {'vectors': []}, {'vectors': [{'set': {'9000': 'XY'}}]},
+                {'vectors': [{'expect': {'registers': {'Q': 1}}}]}, {'vectors': [{'set': {'FFFF': '01,02'}}]}):
+        try:
+            parse_spec(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted bad spec {bad}")
+
+
+def test_budgets_stop_runaway_jobs():
+    """A loop that never halts stops at its step budget or its wall-clock budget"""
+    directory = tempfile.mkdtemp()
+    try:
+        paths = make_submissions(directory)
+        with open(paths['loops.asm'], 'r') as file:
+            code = bytes(Assembler().assemble(file.read()))
+        vector = parse_spec({'vectors': [{'max_steps': 1000}]})['vectors'][0]
+        job = {'program': paths['loops.asm'], 'code': code, 'load_address': 0x8000, 'vector': vector}
+        row = run_vector(job)
+        assert row['stop_reason'] == 'max_steps' and row['instructions'] == 1000 and not row['passed']
+        job['vector'] = dict(vector, max_steps=10 ** 12, timeout=0.05)
+        row = run_vector(job)
+        # Slices are sized to the remaining time, so the budget is barely overrun
+        assert row['stop_reason'] == STOP_TIMEOUT and 0.05 <= row['elapsed'] < 0.1
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_grade_batch():
+    """Every (program, vector) row is reported once and totals count the passes"""
+    directory = tempfile.mkdtemp()
+    try:
+        paths = make_submissions(directory)
+        spec = load_spec(SPEC)
+        for vector in spec['vectors']:
+            vector['timeout'] = 0.2
+        rows = []
+        totals = grade(sorted(paths.values()), spec, workers=2, on_result=rows.append)
+        assert len(rows) == 4 * len(spec['vectors'])
+        assert totals[paths['correct.asm']]['passed'] == 4
+        assert totals[paths['wrong.asm']]['passed'] == 0
+        assert totals[paths['loops.asm']]['passed'] == 0
+        assert totals[paths['broken.asm']]['error']
+        failed = [row for row in rows if row['program'] == paths['wrong.asm']]
+        assert all(row['stop_reason'] == 'halt' and '9002' in row['failures'] for row in failed)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_grade_command(capsys):
+    """The grade command streams a CSV report and prints one score per submission"""
+    directory = tempfile.mkdtemp()
+    try:
+        make_submissions(directory)
+        report = os.path.join(directory, 'report.csv')
+        status = main(['grade', directory, '--spec', SPEC, '--report', report, '--timeout', '0.2', '-j', '1'])
+        assert status == 1
+        totals = {os.path.basename(line['program']): line
+                  for line in map(json.loads, capsys.readouterr().out.splitlines())}
+        assert totals['correct.asm']['score'] == 1.0 and totals['loops.asm']['score'] == 0.0
+        with open(report, newline='') as file:
+            rows = list(csv.DictReader(file))
+        assert len(rows) == 16
+        assert {row['passed'] for row in rows if row['program'].endswith('correct.asm')} == {'True'}
+
+        # An unwritable report is reported like a bad spec, before anything runs
+        bad = os.path.join(directory, 'missing', 'report.csv')
+        assert main(['grade', directory, '--spec', SPEC, '--report', bad]) == 1
+        error = json.loads(capsys.readouterr().out)
+        assert error['report'] == bad and not error['success'] and error['error']
+    finally:
+        shutil.rmtree(directory)
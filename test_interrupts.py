@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Tests for interrupt masking, pending interrupts and the cycle-based event scheduler
+"""
+
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU, ENGINE_BLOCKS, STOP_HALT, STOP_STEP_LIMIT
+from Src.Core.Assembler import Assembler
+from Src.Core.Interrupts import INTERRUPT_CYCLES, MASK_ALL, RST_5_5, RST_6_5, RST_7_5, TRAP, INTR
+
+# RST 7.5 handler at 003C: PUSH PSW / LDA 9000 / INR A / STA 9000 / POP PSW / EI / RET
+TICK_HANDLER = [0xF5, 0x3A, 0x00, 0x90, 0x3C, 0x32, 0x00, 0x90, 0xF1, 0xFB, 0xC9]
+
+# Unmask RST 7.5, then poll the tick count until the handler has run five times
+POLLING_PROGRAM = """
+ORG #8000
+LXI SP,#A000
+MVI A,#0B
+SIM
+EI
+WAIT: LDA #9000
+CPI #05
+JNZ WAIT
+DI
+HLT
+"""
+
+# Sleep in HLT between ticks instead of polling
+SLEEPING_PROGRAM = """
+ORG #8000
+LXI SP,#A000
+MVI A,#0B
+SIM
+WAIT: EI
+HLT
+LDA #9000
+CPI #05
+JNZ WAIT
+DI
+HLT
+"""
+
+
+def load(source: str, engine: str = 'interpreter') -> CPU:
+    """Assemble a program at 8000 and install the tick handler"""
+    memory = Memory()
+    memory.load_program(Assembler().assemble(source))
+    memory.write_block(0x003C, TICK_HANDLER)
+    return CPU(memory, engine=engine)
+
+
+def enable_interrupts(cpu: CPU) -> None:
+    """EI without its one-instruction delay"""
+    cpu.interrupt_enabled = True
+    cpu.interrupt_due = cpu.cycles
+
+
+def test_timer_interrupts_a_polling_loop():
+    """A periodic RST 7.5 is taken while the program polls a count its handler updates"""
+    for engine in ('interpreter', ENGINE_BLOCKS):
+        cpu = load(POLLING_PROGRAM, engine)
+        cpu.events.every(1000, RST_7_5)
+        result = cpu.run(max_steps=100_000)
+        assert result['stop_reason'] == STOP_HALT
+        assert cpu.memory.read(0x9000) == 5
+        # The fifth tick is due at 5000 T-states; the loop notices it within one pass
+        assert 5000 < cpu.cycles < 5200
+        assert cpu.SP == 0xA000 and not cpu.interrupt_enabled
+
+
+def test_halted_cpu_waits_for_the_next_event():
+    """HLT with interrupts enabled skips ahead to the next tick instead of ending the run"""
+    cpu = load(SLEEPING_PROGRAM)
+    cpu.events.every(1000, RST_7_5)
+    result = cpu.run(max_steps=10_000)
+    assert result['stop_reason'] == STOP_HALT
+    assert cpu.memory.read(0x9000) == 5
+    # Asleep from the first HLT until 5000, then a few instructions to halt for good
+    assert 5000 + INTERRUPT_CYCLES < cpu.cycles < 5200
+
+    # Masked ticks never wake it; each wait counts as a step
+    cpu = load(SLEEPING_PROGRAM.replace('#0B', '#0F'))
+    cpu.events.every(1000, RST_7_5)
+    result = cpu.run(max_steps=50)
+    assert result['stop_reason'] == STOP_STEP_LIMIT and cpu.halted
+    assert cpu.memory.read(0x9000) == 0 and cpu.interrupt_pending
+
+    # TRAP wakes it even with interrupts disabled
+    memory = Memory()
+    memory.load_program([0xF3, 0x76])  # DI / HLT
+    memory.write_block(0x0024, [0x3E, 0x55, 0x76])  # MVI A,55 / HLT
+    cpu = CPU(memory)
+    cpu.events.after(100, TRAP)
+    result = cpu.run(max_steps=1000)
+    assert result['stop_reason'] == STOP_HALT and cpu.A == 0x55
+    assert cpu.PC == 0x0027 and cpu.cycles == 100 + INTERRUPT_CYCLES + 7 + 5
+    assert len(cpu.events) == 0
+
+
+def test_masks_priorities_and_rim():
+    """SIM masks and resets RST 7.5, RIM reports them, and TRAP > 7.5 > 6.5 > 5.5 > INTR"""
+    memory = Memory()
+    # LXI SP,A000 / RIM / MVI A,0E / SIM / RIM / MOV B,A / EI / NOP / NOP / HLT
+    memory.load_program([0x31, 0x00, 0xA0, 0x20, 0x3E, 0x0E, 0x30, 0x20, 0x47, 0xFB, 0x00, 0x00, 0x76])
+    cpu = CPU(memory)
+    assert cpu.interrupt_mask == MASK_ALL
+    cpu.run(max_steps=2)
+    assert cpu.A == 0x07  # All masked after reset, nothing pending
+    for line in (RST_5_5, RST_6_5, RST_7_5):
+        cpu.raise_interrupt(line)
+    cpu.run(max_steps=4)
+    assert cpu.B == 0x70 | 0x06  # 6.5 and 7.5 masked, all three pending
+    # Only RST 5.5 gets through, once the instruction after EI has run
+    cpu.run(max_steps=2)
+    assert cpu.PC == 0x800B and cpu.interrupt_pending == 0x70
+    cpu.run(max_steps=1)
+    assert cpu.PC == 0x002C + 1 and not cpu.interrupt_enabled
+    assert memory.read_word(cpu.SP) == 0x800B
+    assert cpu.interrupt_pending == 0x60
+
+    cpu.raise_interrupt(INTR, 5)
+    cpu.interrupt_mask = 0
+    enable_interrupts(cpu)
+    cpu.execute_instruction()
+    assert cpu.PC == 0x003C + 1  # RST 7.5 first, then its first instruction (a NOP) ran
+    enable_interrupts(cpu)
+    cpu.execute_instruction()
+    assert cpu.PC == 0x0034 + 1
+    enable_interrupts(cpu)
+    cpu.execute_instruction()
+    assert cpu.PC == 0x0028 + 1  # INTR with RST 5
+    # TRAP is taken with interrupts disabled
+    cpu.raise_interrupt(TRAP)
+    cpu.execute_instruction()
+    assert cpu.PC == 0x0024 + 1 and cpu.interrupt_pending == 0
+
+    # SIM bit 4 resets a pending RST 7.5; bits 6-7 drive SOD
+    cpu.raise_interrupt(RST_7_5)
+    cpu.A = 0xD0
+    cpu._sim()
+    assert cpu.interrupt_pending == 0 and cpu.serial_output == 1
+
+
+def test_events_and_state():
+    """Events fire in cycle order, can be cancelled, and interrupt state survives undo and snapshots"""
+    cpu = load(POLLING_PROGRAM)
+    fired = []
+    cpu.events.at(300, lambda c: fired.append(('once', c.cycles)))
+    tick = cpu.events.every(100, lambda c: fired.append(('tick', c.cycles)), start=150)
+    cpu.run(max_cycles=420)
+    assert [name for name, _ in fired] == ['tick', 'tick', 'once', 'tick']
+    assert all(0 <= at - due < 20 for (_, at), due in zip(fired, (150, 250, 300, 350)))
+    assert cpu.events.cancel(tick) and not cpu.events.cancel(tick)
+    assert len(cpu.events) == 0
+
+    # Undo takes back a taken interrupt
+    cpu = load(POLLING_PROGRAM)
+    cpu.enable_journal()
+    cpu.run(max_steps=10)
+    cpu.raise_interrupt(RST_7_5)
+    before = (cpu.get_state(), bytes(cpu.memory.memory))
+    cpu.run(max_steps=1)
+    assert cpu.PC == 0x003D
+    cpu.step_back(2)
+    assert (cpu.get_state(), bytes(cpu.memory.memory)) == before
+
+    from Src.Core.Machine import Machine, Snapshot
+    machine = Machine(cpu=cpu)
+    cpu.interrupt_mask = 0x03
+    snapshot = Snapshot.from_bytes(machine.snapshot().to_bytes())
+    assert snapshot.state[-2:] == (0x03, 0x40)
+
+    # Restoring drops events scheduled on the abandoned timeline
+    start = machine.snapshot()
+    cpu.events.after(50, RST_7_5)
+    machine.restore(start)
+    assert len(cpu.events) == 0 and cpu.interrupt_due == cpu.cycles
+    cpu.clear_interrupt(RST_7_5)
+    machine.restore(machine.snapshot())
+    assert cpu.interrupt_due > cpu.cycles
+
+
+def test_single_steps_undo_interrupts():
+    """execute_instruction() journals a taken interrupt as a step of its own, like run()"""
+    memory = Memory()
+    memory.load_program([0x31, 0x00, 0xA0, 0xFB, 0x00, 0x00])  # LXI SP,A000 / EI / NOP / NOP
+    cpu = CPU(memory)
+    cpu.enable_journal()
+    for _ in range(3):
+        cpu.execute_instruction()
+    cpu.raise_interrupt(TRAP)
+    before = (cpu.get_state(), bytes(memory.memory))
+    assert cpu.PC == 0x8005
+    cpu.execute_instruction()
+    assert cpu.PC == 0x0025 and memory.read_word(0x9FFE) == 0x8005
+    cpu.step_back(1)
+    assert cpu.PC == 0x0024
+    cpu.step_back(1)
+    assert (cpu.get_state(), bytes(memory.memory)) == before
+    cpu.step_back(1)
+    assert cpu.PC == 0x8004
+
+
+if __name__ == "__main__":
+    test_timer_interrupts_a_polling_loop()
+    test_halted_cpu_waits_for_the_next_event()
+    test_masks_priorities_and_rim()
+    test_events_and_state()
+    test_single_steps_undo_interrupts()
+    print("✅ All interrupt tests passed!")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy lockstep engine that runs many copies of a program at once
+"""
+
+import pytest
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU
+from Src.Core.Assembler import Assembler
+
+try:
+    import numpy as np
+    from Src.Core.Lockstep import LockstepCPU
+except ImportError:  # The engine is optional
+    np = None
+
+needs_numpy = pytest.mark.skipif(np is None, reason="NumPy is not installed")
+
+
+def load_example(name: str, presets: dict) -> CPU:
+    """Assemble an example program and preload its input bytes"""
+    with open(f"AssemblyPrograms/{name}", 'r') as file:
+        machine_code = Assembler().assemble(file.read())
+    memory = Memory()
+    memory.load_program(machine_code)
+    for address, value in presets.items():
+        memory.write(address, value)
+    return CPU(memory)
+
+
+@needs_numpy
+def test_multiplication_sweep_matches_cpu():
+    """Every operand pair multiplies correctly, in the same state and T-states as the CPU"""
+    pairs = [(a, b) for a in range(0, 256, 5) for b in range(0, 256, 3)]
+    sweep = LockstepCPU(load_example('multiplication_example.asm', {}), len(pairs))
+    sweep.set_memory(0x9000, [a for a, _ in pairs])
+    sweep.set_memory(0x9001, [b for _, b in pairs])
+    result = sweep.run()
+    assert result['halted'] == len(pairs) and result['faulted'] == 0
+    assert list(sweep.read_memory(0x9002)) == [(a * b) & 0xFF for a, b in pairs]
+    # Loops of different lengths still share most dispatches
+    assert result['dispatches'] < 800 and 0 < result['utilization'] <= 1
+
+    for lane in range(0, len(pairs), 97):
+        a, b = pairs[lane]
+        cpu = load_example('multiplication_example.asm', {0x9000: a, 0x9001: b})
+        run = cpu.run()
+        assert sweep.get_state(lane) == cpu.get_state()
+        assert sweep.instructions[lane] == run['instructions']
+
+
+@needs_numpy
+def test_divergent_lanes_match_cpu():
+    """Lanes sorting different arrays keep their own memory, stack and budgets"""
+    arrays = [[5, 2, 4, 1, 3], [1, 2, 3, 4, 5], [9, 9, 0, 200, 7], [255, 128, 1, 0, 64]]
+    template = load_example('bubble_sort.asm', {0x9000: 5})
+    sweep = LockstepCPU(template, len(arrays))
+    for offset in range(5):
+        sweep.set_memory(0x9001 + offset, [values[offset] for values in arrays])
+    sweep.run()
+    for lane, values in enumerate(arrays):
+        presets = {0x9001 + offset: value for offset, value in enumerate(values)}
+        cpu = load_example('bubble_sort.asm', {0x9000: 5, **presets})
+        cpu.run()
+        assert sweep.get_state(lane) == cpu.get_state()
+        assert sweep.lane_memory(lane) == bytes(cpu.memory.memory)
+
+    # A step budget stops every lane exactly where CPU.run(max_steps) would
+    sweep = LockstepCPU(template, 2)
+    sweep.set_memory(0x9001, [3, 1])
+    summary = sweep.run(max_steps=40)
+    assert summary['max_steps'] == 2 and summary['instructions'] == 80
+    cpu = load_example('bubble_sort.asm', {0x9000: 5, 0x9001: 3})
+    cpu.run(max_steps=40)
+    assert sweep.get_state(0) == cpu.get_state()
+
+
+@needs_numpy
+def test_calls_and_faults():
+    """Calls, pushes and pops use per-lane stacks; unknown opcodes stop only their lane"""
+    # MVI A,(lane) / CPI 02 / JZ bad / CALL sub / HLT / sub: PUSH PSW / INR A / POP B / RET / bad: DB 08
+    program = [0x3E, 0x00, 0xFE, 0x02, 0xCA, 0x11, 0x80, 0xCD, 0x0B, 0x80, 0x76,
+               0xF5, 0x3C, 0xC1, 0xC9, 0x00, 0x00, 0x08]
+    memory = Memory()
+    memory.load_program(program)
+    sweep = LockstepCPU(CPU(memory), 4)
+    sweep.set_memory(0x8001, [0, 1, 2, 3])
+    summary = sweep.run()
+    assert summary['halted'] == 3 and summary['faulted'] == 1
+    assert list(sweep.faulted) == [False, False, True, False]
+    for lane in (0, 1, 3):
+        memory = Memory()
+        memory.load_program(program)
+        memory.write(0x8001, lane)
+        cpu = CPU(memory)
+        cpu.run()
+        assert sweep.get_state(lane) == cpu.get_state()
+        assert sweep.lane_memory(lane) == bytes(cpu.memory.memory)
+
+
+if __name__ == "__main__":
+    if np is None:
+        print("NumPy is not installed; skipping lockstep tests")
+    else:
+        test_multiplication_sweep_matches_cpu()
+        test_divergent_lanes_match_cpu()
+        test_calls_and_faults()
+        print("✅ All lockstep engine tests passed!")
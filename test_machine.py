@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for machine snapshots and save-state files
+"""
+
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+from Src.Core.Machine import Machine, Snapshot
+from Src.Core.Memory import NO_ADDRESSES
+from Src.Core.Assembler import Assembler
+
+
+def load_example(name: str, presets: dict, engine: str = 'interpreter') -> Machine:
+    """Assemble an example program into a new machine and preload its input bytes"""
+    with open(f"AssemblyPrograms/{name}", 'r') as file:
+        machine_code = Assembler().assemble(file.read())
+    machine = Machine(engine=engine)
+    machine.memory.load_program(machine_code)
+    for address, value in presets.items():
+        machine.memory.write(address, value)
+    return machine
+
+
+def test_restore_rewinds_a_run():
+    """Restoring a snapshot replays a program to the same result"""
+    for engine in ('interpreter', 'blocks'):
+        machine = load_example('factorial.asm', {0x9000: 5}, engine)
+        start = machine.snapshot()
+        first = machine.cpu.run()
+        finished = machine.snapshot()
+        assert finished != start
+
+        machine.restore(start)
+        assert machine.snapshot() == start and not machine.cpu.halted
+        machine.memory.write(0x9000, 4)
+        machine.cpu.run()
+        assert machine.snapshot() != finished
+
+        machine.restore(start)
+        assert machine.cpu.run()['instructions'] == first['instructions']
+        assert machine.snapshot() == finished
+
+
+def test_restore_drops_stale_blocks():
+    """Code changed by a restore is recompiled rather than run from the cache"""
+    machine = Machine(engine='blocks')
+    machine.memory.load_program([0x06, 0x07, 0x76])  # MVI B,07 / HLT
+    before = machine.snapshot()
+    machine.memory.load_program([0x06, 0x09, 0x76])  # MVI B,09 / HLT
+    machine.cpu.run()
+    assert machine.cpu.B == 0x09
+    machine.restore(before)
+    machine.cpu.run()
+    assert machine.cpu.B == 0x07
+
+
+def test_save_state_round_trip():
+    """Save states are compressed and load back to an equal snapshot"""
+    machine = load_example('bubble_sort.asm', {0x9000: 5, 0x9001: 5, 0x9002: 2, 0x9003: 4, 0x9004: 1, 0x9005: 3})
+    machine.cpu.run(max_steps=40)
+    machine.cpu.interrupt_enabled = True
+    snapshot = machine.snapshot()
+    data = snapshot.to_bytes()
+    assert len(data) < 1024
+    assert Snapshot.from_bytes(data) == snapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sort.sav')
+        machine.save_state(path)
+        other = Machine()
+        other.load_state(path)
+    assert other.snapshot() == snapshot and other.cpu.interrupt_enabled
+
+    for bad in (b'', b'NOTSAVED' + data[8:], data[:10] + b'garbage', data[:8] + b'\x63\x00' + data[10:]):
+        try:
+            Snapshot.from_bytes(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("invalid save state was accepted")
+
+    # Version 1 save states had no interrupt fields; they load with RST 5.5-7.5 masked
+    old = struct.pack('<8B2H2BQ', *snapshot.state[:13]) + snapshot.image
+    data = b'8085SAVE' + struct.pack('<H', 1) + zlib.compress(old)
+    assert Snapshot.from_bytes(data).state == snapshot.state[:13] + (0x07, 0)
+
+
+def test_forks_share_pages_copy_on_write():
+    """Forked children diverge independently and only own the pages they wrote"""
+    parent = load_example('factorial.asm', {})
+    loaded = parent.snapshot()
+    children = [parent.fork() for _ in range(200)]
+    assert all(child.memory.paged and not child.memory.owned_pages() for child in children)
+    assert len({id(child.memory.memory.pages[0x80]) for child in children}) == 1
+
+    for value, child in enumerate(children[:8], start=1):
+        child.memory.write(0x9000, value)  # The input preset copies one page
+        assert set(child.memory.owned_pages()) == {0x90}
+        child.cpu.run()
+        assert child.memory.paged and set(child.memory.owned_pages()) == {0x90}
+        assert child.memory.code_marks is NO_ADDRESSES
+    assert parent.snapshot() == loaded
+    assert children[0].memory.memory.pages[0x80] is children[7].memory.memory.pages[0x80]
+
+    child = children[5]
+    result = child.memory.read(0x9001)
+    assert result == 0x2D0 & 0xFF  # 6! = 720
+
+    grandchild = pickle.loads(pickle.dumps(child.fork()))
+    assert grandchild.memory.read(0x9001) == result and grandchild.cpu.halted
+    assert not grandchild.memory.owned_pages()
+    grandchild.memory.write(0x9001, 0)
+    assert child.memory.read(0x9001) == result
+
+    # The block engine runs on a fork too, marking code only once it compiles
+    child = Machine(engine='blocks')
+    child.memory.load_program(parent.memory.read_block(0x8000, 0x100))
+    child = child.fork()
+    child.memory.write(0x9000, 5)
+    child.cpu.run()
+    assert child.memory.read(0x9001) == 120 and set(child.memory.owned_pages()) == {0x90}
+    assert child.memory.code_marks is not NO_ADDRESSES
+    child.memory.unshare()
+    assert not child.memory.paged and len(child.memory.owned_pages()) == 256
+    child.cpu.reset()
+    child.cpu.run()
+    assert child.memory.read(0x9001) == 120
+
+
+if __name__ == "__main__":
+    test_restore_rewinds_a_run()
+    test_restore_drops_stale_blocks()
+    test_save_state_round_trip()
+    test_forks_share_pages_copy_on_write()
+    print("✅ All machine snapshot tests passed!")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for the bytearray-backed Memory block operations
+"""
+
+from Src.Core.Memory import Memory
+
+
+def test_block_round_trip():
+    """write_block and read_block move whole ranges without copying per byte"""
+    memory = Memory()
+    memory.write_block(0x9000, [1, 2, 3, 4])
+    view = memory.read_block(0x9000, 4)
+    assert bytes(view) == b'\x01\x02\x03\x04'
+    memory.write(0x9001, 0xAA)
+    assert view[1] == 0xAA  # The view shares storage with memory
+    memory.write_block(0xFFFE, b'\x10\x20')
+    assert memory.read_word(0xFFFE) == 0x2010
+
+
+def test_fill_and_validation():
+    """fill() covers an inclusive range and bad ranges raise ValueError"""
+    memory = Memory()
+    memory.fill(0x8000, 0x80FF, 0x76)
+    assert memory.read(0x80FF) == 0x76 and memory.read(0x8100) == 0
+    memory.fill(0x0000, 0xFFFF, 0)
+    assert not any(memory.read_block(0, 0x10000))
+    for bad in (lambda: memory.write_block(0xFFFF, [1, 2]),
+                lambda: memory.write_block(0x9000, [256]),
+                lambda: memory.read_block(0xFFF0, 0x20),
+                lambda: memory.fill(0x10, 0x0F, 0)):
+        try:
+            bad()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("invalid block operation was accepted")
+
+
+if __name__ == "__main__":
+    test_block_round_trip()
+    test_fill_and_validation()
+    print("✅ All memory tests passed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-address profiler and its source-line reports
+"""
+
+import json
+from Src.Core.Memory import Memory
+from Src.Core.CPU import CPU
+from Src.Core.Assembler import Assembler
+from Src.Core.Profiler import Profiler
+from Src.Interface.CLI import main
+
+SOURCE = """
+; Count C down from 3 with a 16-iteration inner loop
+        MVI C,#03
+OUTER:  MVI B,#10
+INNER:  DCR B        ; hot
+        JNZ INNER
+        DCR C
+        JNZ OUTER
+        HLT
+"""
+
+
+def profiled_run() -> tuple:
+    assembler = Assembler()
+    machine_code = assembler.assemble(SOURCE)
+    memory = Memory()
+    memory.load_program(machine_code, 0x0000)
+    cpu = CPU(memory)
+    cpu.PC = 0x0000
+    profiler = Profiler()
+    cpu.set_profiler(profiler)
+    cpu.execute_instruction()
+    result = cpu.run()
+    return assembler, profiler, cpu, result
+
+
+def test_counts_match_the_run():
+    """Per-address and per-opcode totals add up to the run's instructions and T-states"""
+    assembler, profiler, cpu, result = profiled_run()
+    assert profiler.total_instructions == result['instructions'] + 1
+    assert profiler.total_cycles == cpu.cycles
+    assert sum(profiler.cycles) == cpu.cycles
+    assert profiler.counts[0x0004] == 48 and profiler.cycles[0x0004] == 48 * 4
+    # JNZ INNER: 45 taken (10 T-states) and 3 not taken (7)
+    assert profiler.counts[0x0005] == 48 and profiler.cycles[0x0005] == 45 * 10 + 3 * 7
+    assert profiler.opcode_counts[0xC2] == 51
+
+
+def test_hot_lines_follow_the_source_map():
+    """Hot lines name the source line and text each address was assembled from"""
+    assembler, profiler, cpu, result = profiled_run()
+    assert assembler.source_map == {0: 3, 2: 4, 4: 5, 5: 6, 8: 7, 9: 8, 12: 9}
+    report = profiler.report(assembler.source_map, SOURCE.split('\n'), 0x0000, assembler.mnemonics(), top=2)
+    assert [(row['line'], row['source']) for row in report['lines']] == [(6, 'JNZ INNER'), (5, 'INNER:  DCR B')]
+    assert report['opcodes'][0]['mnemonic'] == 'JNZ'
+    assert sum(row['percent'] for row in profiler.hot_lines(assembler.source_map, SOURCE.split('\n'), 0)) > 99.9
+
+
+def test_profile_command(capsys):
+    """The profile command prints tables, or the JSON result with --json"""
+    assert main(['profile', 'AssemblyPrograms/factorial.asm', '--set', '9000=05', '--top', '3']) == 0
+    out = capsys.readouterr().out
+    assert 'JNZ #800B' in out and 'T-states' in out
+    assert main(['profile', 'AssemblyPrograms/factorial.asm', '--set', '9000=05', '--json']) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['profile']['cycles'] == result['cycles']
+    assert result['profile']['lines'][0]['source'] == 'JNZ #800B'
+